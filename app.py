@@ -1,206 +1,1163 @@
-from flask import Flask, jsonify, make_response
-from figures import Bishop, King, Knight, Pawn, Queen, Rook
+from flask import (
+    Blueprint,
+    Flask,
+    current_app,
+    g,
+    jsonify,
+    make_response,
+    request,
+    stream_with_context,
+)
+from attack_maps import build_attack_map
+from bitboard import (
+    FIELDS,
+    bitboard_from_fields,
+    fields_from_bitboard,
+    square_from_field,
+)
+from coalescing import Coalescer
+from distance_tables import DISTANCE_TABLES, PAWN_DISTANCE_TABLES, DistanceTable
+from fen import STARTING_POSITION, get_occupancy_from_fen
+from metrics import Histogram, MetricsRegistry
+from move_responses import (
+    build_batch_query_response,
+    build_list_available_moves_response,
+    build_validate_move_response,
+    get_figure_label,
+)
+from figures import FIGURE_CLASSES, Pawn, get_figure, get_figure_class
+from jobs import DONE, FAILED, JobManager, parse_job_request
+from job_pool import JobCancelled, JobPool, JobRejected, is_client_disconnected
+from profiling import install_profiling
+from perft import compare_perft_speedup, perft_divide, perft_divide_parallel
+from position import Position, move_to_uci
+from response_cache import CachedResponse, ResponseCache, make_cached_response
+from search import MAX_PLY, search_best_move
+from table_store import ensure_table_store, get_table_store_path
+from transposition import TranspositionTable
+from typing import Callable, Iterator, Optional, Tuple
+import io
+import itertools
+import json
+import os
+import threading
+import time
 
+ATTACKS_MAX_PIECES = 64
+BATCH_SIZE_LIMIT = 10000
 
-def create_app():
+
+class AppMetrics:
+    # Created per app, so that each app reports only its own requests next
+    # to its own pool metrics.
+    def __init__(self, registry: MetricsRegistry):
+        self.request_duration = registry.histogram(
+            "chess_http_request_duration_seconds",
+            "HTTP request latency by route and figure.",
+            ("route", "figure"),
+        )
+        self.responses = registry.counter(
+            "chess_http_responses_total",
+            "HTTP responses by route and status code.",
+            ("route", "status"),
+        )
+        self.move_generation_duration = registry.histogram(
+            "chess_move_generation_seconds",
+            "Time spent listing or validating moves, excluding serialization.",
+            ("figure",),
+        )
+        self.serialization_duration = registry.histogram(
+            "chess_serialization_seconds",
+            "Time spent serializing JSON payloads by route.",
+            ("route",),
+        )
+        self.response_cache_entries = registry.gauge(
+            "chess_response_cache_entries", "Entries held in the response cache."
+        )
+        self.response_cache_hits = registry.gauge(
+            "chess_response_cache_hits", "Response cache hits since start."
+        )
+        self.response_cache_misses = registry.gauge(
+            "chess_response_cache_misses", "Response cache misses since start."
+        )
+        self.validate_stream_lines = registry.counter(
+            "chess_validate_stream_lines_total",
+            "Lines answered by the validation stream, by status.",
+            ("status",),
+        )
+        self.validate_stream_throughput = registry.histogram(
+            "chess_validate_stream_lines_per_second",
+            "Lines per second over each validation stream.",
+            buckets=(100, 1000, 5000, 10000, 25000, 50000, 100000, 250000, 1000000),
+        )
+
+
+def create_app(config: Optional[dict] = None):
     new_app = Flask(__name__)
+    new_app.config["BATCH_MAX_SIZE"] = 500
+    new_app.config["BATCH_STREAM_MAX_SIZE"] = BATCH_SIZE_LIMIT
+    new_app.config["VALIDATE_STREAM_MAX_LINE_BYTES"] = 4096
+    new_app.config["VALIDATE_STREAM_BUFFER_BYTES"] = 65536
+    new_app.config["PERFT_MAX_DEPTH"] = 5
+    new_app.config["PERFT_MAX_WORKERS"] = os.cpu_count() or 1
+    new_app.config["PERFT_MAX_HASH_MB"] = 256
+    # compare=true runs perft twice more, so it gets a lower depth limit.
+    new_app.config["PERFT_COMPARE_MAX_DEPTH"] = 4
+    new_app.config["SEARCH_DEFAULT_MOVETIME"] = 1000
+    new_app.config["SEARCH_MAX_MOVETIME"] = 10000
+    new_app.config["SEARCH_HASH_MB"] = 4
+    new_app.config["JOB_POOL_WORKERS"] = 4
+    new_app.config["JOB_QUEUE_SIZE"] = 16
+    new_app.config["JOB_TIMEOUT"] = 30
+    new_app.config["STREAM_TIMEOUT"] = 600
+    new_app.config["STREAM_MAX_JOBS"] = 2
+    new_app.config["STREAM_IDLE_TIMEOUT"] = 10
+    new_app.config["COALESCING_CACHE_SIZE"] = 1024
+    new_app.config["COALESCING_CACHE_TTL"] = 5.0
+    new_app.config["JOBS_DATABASE_PATH"] = os.path.join(
+        new_app.instance_path, "jobs.sqlite3"
+    )
+    new_app.config["JOBS_MAX_WORKERS"] = 2
+    new_app.config["JOBS_TTL"] = 86400
+    new_app.config["JOBS_STALE_TIMEOUT"] = 60
+    new_app.config["JOBS_HEARTBEAT_INTERVAL"] = 5
+    new_app.config["JOBS_PERFT_MAX_DEPTH"] = 8
+    new_app.config["JOBS_BATCH_MAX_SIZE"] = 1000000
+    new_app.config["RESPONSE_CACHE_SIZE"] = 65536
+    new_app.config["RESPONSE_CACHE_MAX_AGE"] = 86400
+    new_app.config["PROFILING_ENABLED"] = os.environ.get("CHESS_PROFILING") == "1"
+    new_app.config["PROFILING_DIRECTORY"] = os.path.join(
+        new_app.instance_path, "profiles"
+    )
+    new_app.config["PROFILING_MAX_FILES"] = 100
+    new_app.config["PROFILING_SAMPLE_RATE"] = 1.0
+    new_app.config["TABLE_STORE_PATH"] = get_table_store_path()
+    if config:
+        new_app.config.update(config)
+    new_app.extensions["response_cache"] = ResponseCache(
+        new_app.config["RESPONSE_CACHE_SIZE"]
+    )
+    new_app.extensions["metrics"] = MetricsRegistry()
+    new_app.extensions["job_pool"] = JobPool(
+        new_app.config["JOB_POOL_WORKERS"],
+        new_app.config["JOB_QUEUE_SIZE"],
+        new_app.extensions["metrics"],
+        new_app.config["STREAM_MAX_JOBS"],
+    )
+    new_app.extensions["job_manager"] = JobManager(
+        new_app.config["JOBS_DATABASE_PATH"],
+        new_app.config["JOBS_MAX_WORKERS"],
+        new_app.config["JOBS_TTL"],
+        new_app.config["JOBS_STALE_TIMEOUT"],
+        new_app.config["JOBS_HEARTBEAT_INTERVAL"],
+    )
+    new_app.extensions["coalescer"] = Coalescer(
+        new_app.config["COALESCING_CACHE_SIZE"],
+        new_app.config["COALESCING_CACHE_TTL"],
+        new_app.extensions["metrics"],
+    )
+    new_app.extensions["app_metrics"] = AppMetrics(new_app.extensions["metrics"])
+    # The tables were already mapped from this file when their modules were
+    # imported; a missing or stale file was rebuilt in memory and is written
+    # here so that the next start can map it.
+    if new_app.config["TABLE_STORE_PATH"]:
+        try:
+            new_app.extensions["table_store"] = ensure_table_store(
+                new_app.config["TABLE_STORE_PATH"]
+            )
+        except OSError as e:
+            new_app.logger.warning("table store not written: %s", e)
+    # Profiling hooks are only installed when enabled, so requests pay
+    # nothing for them otherwise.
+    if new_app.config["PROFILING_ENABLED"]:
+        install_profiling(new_app)
+    new_app.register_blueprint(api)
     return new_app
 
 
-app = create_app()
+# The routes are collected on a blueprint, so that every app made by
+# create_app serves them with its own settings.
+api = Blueprint("api", __name__)
+
+
+def get_app_metrics() -> AppMetrics:
+    return current_app.extensions["app_metrics"]
+
+
+def get_route_label() -> str:
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+@api.before_app_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@api.after_app_request
+def record_request_metrics(response):
+    request_start = g.pop("request_start", None)
+    if request_start is not None:
+        route = get_route_label()
+        view_args = request.view_args or {}
+        app_metrics = get_app_metrics()
+        app_metrics.request_duration.observe(
+            time.perf_counter() - request_start,
+            (route, get_figure_label(view_args.get("chess_figure"))),
+        )
+        app_metrics.responses.inc((route, str(response.status_code)))
+    return response
+
+
+def serialize_payload(payload) -> bytes:
+    start = time.perf_counter()
+    body = jsonify(payload).get_data()
+    get_app_metrics().serialization_duration.observe(
+        time.perf_counter() - start, (get_route_label(),)
+    )
+    return body
+
+
+def json_response(payload, status_code: int):
+    return current_app.response_class(
+        serialize_payload(payload), status=status_code, mimetype="application/json"
+    )
 
 
 def get_chess_figure_class(chess_figure: str):
-    figure_classes = {
-        "bishop": Bishop,
-        "king": King,
-        "knight": Knight,
-        "pawn": Pawn,
-        "queen": Queen,
-        "rook": Rook,
-    }
+    return get_figure_class(chess_figure)
+
+
+def get_cached_response(
+    cache_key: tuple, build_response: Callable[[], Tuple[dict, int]]
+) -> CachedResponse:
+    # Payloads echo the raw path segments, so the cache is keyed on them as
+    # given; the LRU bound keeps odd spellings from crowding it out.
+    response_cache = current_app.extensions["response_cache"]
+    cached_response = response_cache.get(cache_key)
+    if cached_response is None:
+        payload, status_code = build_response()
+        cached_response = response_cache.put(
+            cache_key,
+            make_cached_response(serialize_payload(payload), status_code),
+        )
+    return cached_response
+
 
-    figure_class = figure_classes.get(chess_figure.lower())
-    if figure_class:
-        return figure_class
+def serve_cached_response(
+    cache_key: tuple, build_response: Callable[[], Tuple[dict, int]]
+):
+    cached_response = get_cached_response(cache_key, build_response)
+    response = current_app.response_class(
+        cached_response.body,
+        status=cached_response.status_code,
+        mimetype="application/json",
+    )
+    if cached_response.status_code == 200:
+        response.set_etag(cached_response.etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config["RESPONSE_CACHE_MAX_AGE"]
+        response.make_conditional(request)
+    return response
 
 
-@app.route("/api/v1/<chess_figure>/<current_field>", methods=["GET"])
+@api.route("/api/v1/<chess_figure>/<current_field>", methods=["GET"])
 def get_list_available_moves(chess_figure: str, current_field: str):
-    figure_class = get_chess_figure_class(chess_figure)
-    if not figure_class:
-        return (
-            jsonify(
-                {
-                    "availableMoves": [],
-                    "error": "invalid figure",
-                    "figure": chess_figure,
-                    "currentField": current_field,
-                }
-            ),
-            404,
+    move_generation_duration = get_app_metrics().move_generation_duration
+    return serve_cached_response(
+        ("list", chess_figure, current_field),
+        lambda: build_list_available_moves_response(
+            get_figure_class(chess_figure),
+            chess_figure,
+            current_field,
+            move_generation_duration,
+        ),
+    )
+
+
+@api.route("/api/v1/<chess_figure>/<current_field>/<dest_field>", methods=["GET"])
+def validate_move(chess_figure: str, current_field: str, dest_field: str):
+    move_generation_duration = get_app_metrics().move_generation_duration
+    return serve_cached_response(
+        ("validate", chess_figure, current_field, dest_field),
+        lambda: build_validate_move_response(
+            get_figure_class(chess_figure),
+            chess_figure,
+            current_field,
+            dest_field,
+            move_generation_duration,
+        ),
+    )
+
+
+PAWN_COLORS = (("whites", "forWhites"), ("blacks", "forBlacks"))
+
+
+def get_path_result(
+    distance_table: DistanceTable, source: int, dest: int
+) -> Tuple[Optional[int], list, Optional[str]]:
+    if not distance_table.is_valid_source(source):
+        return None, [], "invalid field for figure"
+    path = distance_table.get_path(source, dest)
+    if path is None:
+        return None, [], "destination field is not reachable"
+    return len(path) - 1, [FIELDS[square] for square in path], None
+
+
+def build_path_response(
+    chess_figure: str, current_field: str, dest_field: str
+) -> Tuple[dict, int]:
+    payload = {
+        "distance": None,
+        "path": [],
+        "error": None,
+        "figure": chess_figure,
+        "currentField": current_field,
+        "destField": dest_field,
+    }
+    figure = chess_figure.lower()
+    source = square_from_field(current_field)
+    dest = square_from_field(dest_field)
+    if figure not in FIGURE_CLASSES:
+        payload["error"] = "invalid figure"
+        return payload, 404
+    if source is None:
+        payload["error"] = "current field does not exist"
+        return payload, 409
+    if dest is None:
+        payload["error"] = "destination field does not exist"
+        return payload, 409
+
+    if figure == "pawn":
+        payload["distance"], payload["path"], payload["error"] = {}, {}, {}
+        for color, key in PAWN_COLORS:
+            (
+                payload["distance"][key],
+                payload["path"][key],
+                payload["error"][key],
+            ) = get_path_result(PAWN_DISTANCE_TABLES[color], source, dest)
+    else:
+        payload["distance"], payload["path"], payload["error"] = get_path_result(
+            DISTANCE_TABLES[figure], source, dest
         )
+    return payload, 200
 
-    figure_instance = figure_class(current_field)
+
+def get_reachable_result(
+    distance_table: DistanceTable, source: int, moves: int
+) -> Tuple[list, Optional[str]]:
+    if not distance_table.is_valid_source(source):
+        return [], "invalid field for figure"
+    return fields_from_bitboard(distance_table.get_reachable(source, moves)), None
+
+
+def build_reachable_response(
+    chess_figure: str, current_field: str, moves: Optional[int]
+) -> Tuple[dict, int]:
+    payload = {
+        "reachableFields": [],
+        "moves": moves,
+        "error": None,
+        "figure": chess_figure,
+        "currentField": current_field,
+    }
+    figure = chess_figure.lower()
+    source = square_from_field(current_field)
+    if figure not in FIGURE_CLASSES:
+        payload["error"] = "invalid figure"
+        return payload, 404
+    if source is None:
+        payload["error"] = "current field does not exist"
+        return payload, 409
+    if moves is None or moves < 0:
+        payload["error"] = "invalid moves"
+        return payload, 400
+
+    if figure == "pawn":
+        payload["reachableFields"], payload["error"] = {}, {}
+        for color, key in PAWN_COLORS:
+            (
+                payload["reachableFields"][key],
+                payload["error"][key],
+            ) = get_reachable_result(PAWN_DISTANCE_TABLES[color], source, moves)
+    else:
+        payload["reachableFields"], payload["error"] = get_reachable_result(
+            DISTANCE_TABLES[figure], source, moves
+        )
+    return payload, 200
+
+
+@api.route("/api/v1/<chess_figure>/<current_field>/path/<dest_field>", methods=["GET"])
+def get_path(chess_figure: str, current_field: str, dest_field: str):
+    return serve_cached_response(
+        ("path", chess_figure, current_field, dest_field),
+        lambda: build_path_response(chess_figure, current_field, dest_field),
+    )
+
+
+@api.route("/api/v1/<chess_figure>/<current_field>/board/reachable", methods=["GET"])
+def get_reachable(chess_figure: str, current_field: str):
+    return serve_cached_response(
+        ("reachable", chess_figure, current_field, request.args.get("moves")),
+        lambda: build_reachable_response(
+            chess_figure, current_field, request.args.get("moves", type=int)
+        ),
+    )
+
+
+def get_board_occupancy(
+    fen: Optional[str], occupied_fields: Optional[str]
+) -> Tuple[int, int, int]:
+    if fen is not None and occupied_fields is not None:
+        raise ValueError("provide either fen or occupied fields")
+    if fen is not None:
+        return get_occupancy_from_fen(fen)
+    if occupied_fields:
+        try:
+            return bitboard_from_fields(occupied_fields.split(",")), 0, 0
+        except ValueError:
+            raise ValueError("invalid occupied fields")
+    return 0, 0, 0
+
+
+def build_list_available_moves_on_board_response(
+    figure_class,
+    chess_figure: str,
+    current_field: str,
+    fen: Optional[str],
+    occupied_fields: Optional[str],
+    move_generation_duration: Optional[Histogram] = None,
+) -> Tuple[dict, int]:
+    payload, status_code = build_list_available_moves_response(
+        figure_class, chess_figure, current_field, move_generation_duration
+    )
+    if status_code != 200:
+        return payload, status_code
 
     try:
-        available_moves = figure_instance.list_available_moves()
+        occupied, white_pieces, black_pieces = get_board_occupancy(fen, occupied_fields)
     except ValueError as e:
         return (
-            jsonify(
-                {
-                    "availableMoves": [],
-                    "error": str(e),
-                    "figure": chess_figure,
-                    "currentField": current_field,
-                }
-            ),
-            409,
+            {
+                "availableMoves": [],
+                "error": str(e),
+                "figure": chess_figure,
+                "currentField": current_field,
+            },
+            400,
         )
+
+    figure_instance = get_figure(figure_class, current_field)
+    if figure_class is Pawn:
+        available_moves = figure_instance.list_available_moves_on_board(
+            occupied, white_pieces, black_pieces
+        )[0]
+        for color, key in (("whites", "forWhites"), ("blacks", "forBlacks")):
+            if available_moves[color] is not None:
+                payload["availableMoves"][key] = available_moves[color]
     else:
-        if chess_figure.lower() == "pawn":
-            whites_moves = available_moves[0]["whites"]
-            blacks_moves = available_moves[0]["blacks"]
-            return (
-                jsonify(
-                    {
-                        "availableMoves": {
-                            "forWhites": whites_moves
-                            if whites_moves is not None
-                            else [],
-                            "forBlacks": blacks_moves
-                            if blacks_moves is not None
-                            else [],
-                        },
-                        "error": {
-                            "forWhites": "invalid field for figure"
-                            if whites_moves is None
-                            else None,
-                            "forBlacks": "invalid field for figure"
-                            if blacks_moves is None
-                            else None,
-                        },
-                        "figure": chess_figure,
-                        "currentField": current_field,
-                    }
-                ),
-                200,
-            )
-        else:
-            return (
-                jsonify(
-                    {
-                        "availableMoves": available_moves,
-                        "error": None,
-                        "figure": chess_figure,
-                        "currentField": current_field,
-                    }
-                ),
-                200,
-            )
+        # The figure standing on its own field in the FEN decides which
+        # pieces are friendly; without colors every blocker can be captured.
+        own_pieces = 0
+        for pieces in (white_pieces, black_pieces):
+            if pieces >> figure_instance.current_square & 1:
+                own_pieces = pieces
+        payload["availableMoves"] = figure_instance.list_available_moves_on_board(
+            occupied, own_pieces
+        )
+    return payload, status_code
 
 
-@app.route("/api/v1/<chess_figure>/<current_field>/<dest_field>", methods=["GET"])
-def validate_move(chess_figure: str, current_field: str, dest_field: str):
-    figure_class = get_chess_figure_class(chess_figure)
-    if not figure_class:
+@api.route("/api/v1/<chess_figure>/<current_field>/board/occupancy", methods=["GET"])
+def get_list_available_moves_on_board(chess_figure: str, current_field: str):
+    figure_class = get_figure_class(chess_figure)
+    payload, status_code = build_list_available_moves_on_board_response(
+        figure_class,
+        chess_figure,
+        current_field,
+        request.args.get("fen"),
+        request.args.get("occupied"),
+        get_app_metrics().move_generation_duration,
+    )
+    return json_response(payload, status_code)
+
+
+def build_position_moves_response(fen: str) -> Tuple[dict, int]:
+    try:
+        position = Position(fen)
+    except ValueError as e:
+        return {"moves": [], "error": str(e), "fen": fen}, 400
+
+    moves = sorted(move_to_uci(move) for move in position.generate_legal_moves())
+    return (
+        {
+            "moves": moves,
+            "count": len(moves),
+            "check": position.is_in_check(),
+            "error": None,
+            "fen": fen,
+        },
+        200,
+    )
+
+
+def build_perft_response(
+    fen: str,
+    depth: Optional[int],
+    max_depth: int,
+    workers: Optional[int] = None,
+    compare: bool = False,
+    hash_size_mb: Optional[float] = None,
+    cancelled: Optional[threading.Event] = None,
+    on_move: Optional[Callable[[str, int], None]] = None,
+    compare_max_depth: Optional[int] = None,
+    pool_size: Optional[int] = None,
+) -> Tuple[dict, int]:
+    if depth is None or depth < 0:
+        return {"nodes": 0, "error": "invalid depth", "fen": fen}, 400
+    if workers is not None and workers < 1:
+        return {"nodes": 0, "error": "invalid workers", "fen": fen}, 400
+    if hash_size_mb is not None and not hash_size_mb > 0:
+        return {"nodes": 0, "error": "invalid hash size", "fen": fen}, 400
+    if depth > max_depth:
+        return (
+            {
+                "nodes": 0,
+                "error": f"depth exceeds limit of {max_depth}",
+                "fen": fen,
+            },
+            400,
+        )
+    if compare and compare_max_depth is not None and depth > compare_max_depth:
         return (
-            jsonify(
-                {
-                    "move": "invalid",
-                    "error": "invalid figure",
-                    "figure": chess_figure,
-                    "currentField": current_field,
-                    "destField": dest_field,
-                }
+            {
+                "nodes": 0,
+                "error": f"compare depth exceeds limit of {compare_max_depth}",
+                "fen": fen,
+            },
+            400,
+        )
+    try:
+        position = Position(fen)
+    except ValueError as e:
+        return {"nodes": 0, "error": str(e), "fen": fen}, 400
+
+    table = None
+    start = time.perf_counter()
+    if workers is None:
+        if hash_size_mb is not None:
+            table = TranspositionTable(hash_size_mb)
+        divide = perft_divide(position, depth, table, cancelled, on_move)
+    else:
+        divide = perft_divide_parallel(
+            position,
+            depth,
+            workers,
+            hash_size_mb=hash_size_mb,
+            cancelled=cancelled,
+            pool_size=pool_size,
+        )
+    elapsed = time.perf_counter() - start
+    nodes = sum(divide.values()) if depth else 1
+    payload = {
+        "nodes": nodes,
+        "divide": divide,
+        "depth": depth,
+        "workers": workers or 1,
+        "elapsedSeconds": elapsed,
+        "nodesPerSecond": int(nodes / elapsed) if elapsed else None,
+        "error": None,
+        "fen": fen,
+    }
+    if table is not None:
+        payload["hashTable"] = table.get_stats()
+    if compare:
+        payload["comparison"] = compare_perft_speedup(
+            fen, depth, workers, cancelled, pool_size
+        )
+    return payload, 200
+
+
+def get_query_key(args) -> tuple:
+    # Spellings of the same query (argument order, case, FEN whitespace and
+    # the default position) map to one key.
+    fen = args.get("fen", STARTING_POSITION)
+    try:
+        fen = Position(fen).get_fen()
+    except ValueError:
+        pass
+    return (fen,) + tuple(
+        sorted(
+            (name, value.strip().lower())
+            for name, value in args.items(multi=True)
+            if name != "fen"
+        )
+    )
+
+
+def run_job(
+    name: str,
+    key: tuple,
+    build_response: Callable[[threading.Event], Tuple[dict, int]],
+):
+    # Expensive responses are built on the bounded job pool, so that a burst
+    # of them cannot take every request thread from the cheap routes, and
+    # identical concurrent requests share one job.
+    environ = request.environ
+    job_pool = current_app.extensions["job_pool"]
+    timeout = current_app.config["JOB_TIMEOUT"]
+    try:
+        payload, status_code = current_app.extensions["coalescer"].run(
+            name,
+            (name,) + key,
+            lambda is_abandoned: job_pool.run(
+                name, build_response, timeout, is_abandoned
             ),
-            404,
+            lambda: is_client_disconnected(environ),
+        )
+    except JobRejected as e:
+        response = json_response({"error": "server busy"}, 503)
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+    except JobCancelled as e:
+        return json_response({"error": str(e)}, 503)
+    return json_response(payload, status_code)
+
+
+def format_event(event: str, payload) -> str:
+    data = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def stream_job(
+    name: str,
+    item_event: str,
+    produce: Callable[[threading.Event, Callable], Tuple[dict, int]],
+):
+    # Streams what produce emits as Server-Sent Events named item_event,
+    # followed by a "done" event with the response it returns. The job runs
+    # on the job pool and the response is produced as the client reads it.
+    try:
+        events = current_app.extensions["job_pool"].iterate(
+            name,
+            produce,
+            current_app.config["STREAM_TIMEOUT"],
+            current_app.config["STREAM_IDLE_TIMEOUT"],
+        )
+    except JobRejected as e:
+        response = json_response({"error": "server busy"}, 503)
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+    # Invalid requests fail before emitting anything and get a plain error
+    # response with its status code.
+    try:
+        first = next(events)
+    except JobCancelled as e:
+        return json_response({"error": str(e)}, 503)
+    if first[0] == "result" and first[1][1] != 200:
+        return json_response(*first[1])
+
+    def generate_events():
+        try:
+            for kind, value in itertools.chain([first], events):
+                if kind == "item":
+                    yield format_event(item_event, value)
+                else:
+                    yield format_event("done", value[0])
+        except JobCancelled as e:
+            yield format_event("error", {"error": str(e)})
+        finally:
+            events.close()
+
+    return event_stream_response(generate_events())
+
+
+def event_stream_response(events: Iterator[str]):
+    response = current_app.response_class(events, mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Keeps proxies from buffering the stream.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@api.route("/api/v1/position/moves", methods=["GET"])
+def get_position_moves():
+    payload, status_code = build_position_moves_response(
+        request.args.get("fen", STARTING_POSITION)
+    )
+    return json_response(payload, status_code)
+
+
+def build_perft_args_response(
+    args,
+    config,
+    cancelled: Optional[threading.Event] = None,
+    on_move: Optional[Callable[[str, int], None]] = None,
+) -> Tuple[dict, int]:
+    workers = args.get("workers", type=int)
+    if workers is not None:
+        workers = min(workers, config["PERFT_MAX_WORKERS"])
+    hash_size_mb = args.get("hash", type=float)
+    if hash_size_mb is not None:
+        hash_size_mb = min(hash_size_mb, config["PERFT_MAX_HASH_MB"])
+    return build_perft_response(
+        args.get("fen", STARTING_POSITION),
+        args.get("depth", type=int),
+        config["PERFT_MAX_DEPTH"],
+        workers,
+        args.get("compare", "false").lower() in ("1", "true"),
+        hash_size_mb,
+        cancelled,
+        on_move,
+        config["PERFT_COMPARE_MAX_DEPTH"],
+        config["PERFT_MAX_WORKERS"],
+    )
+
+
+@api.route("/api/v1/perft", methods=["GET"])
+def get_perft():
+    args = request.args
+    config = current_app.config
+    return run_job(
+        "perft",
+        get_query_key(args),
+        lambda cancelled: build_perft_args_response(args, config, cancelled),
+    )
+
+
+@api.route("/api/v1/perft/stream", methods=["GET"])
+def stream_perft():
+    args = request.args
+    config = current_app.config
+    return stream_job(
+        "perft",
+        "move",
+        lambda cancelled, emit: build_perft_args_response(
+            args,
+            config,
+            cancelled,
+            lambda move, nodes: emit({"move": move, "nodes": nodes}),
+        ),
+    )
+
+
+def build_bestmove_response(
+    fen: str,
+    movetime: Optional[int],
+    max_movetime: int,
+    depth: Optional[int] = None,
+    hash_size_mb: float = 4,
+    start: Optional[float] = None,
+    cancelled: Optional[threading.Event] = None,
+    on_iteration: Optional[Callable[[dict], None]] = None,
+) -> Tuple[dict, int]:
+    # The budget runs from when the request arrived (time spent waiting for
+    # an executor counts too), so the search only gets what is left of it.
+    if start is None:
+        start = time.monotonic()
+    if movetime is None or movetime <= 0:
+        return {"bestMove": None, "error": "invalid movetime", "fen": fen}, 400
+    if movetime > max_movetime:
+        return (
+            {
+                "bestMove": None,
+                "error": f"movetime exceeds limit of {max_movetime}",
+                "fen": fen,
+            },
+            400,
+        )
+    if depth is not None and not 1 <= depth <= MAX_PLY:
+        return {"bestMove": None, "error": "invalid depth", "fen": fen}, 400
+    try:
+        position = Position(fen)
+    except ValueError as e:
+        return {"bestMove": None, "error": str(e), "fen": fen}, 400
+
+    result = search_best_move(
+        position,
+        start + movetime / 1000 - time.monotonic(),
+        depth or MAX_PLY,
+        TranspositionTable(hash_size_mb),
+        cancelled,
+        on_iteration,
+    )
+    return dict(result, movetime=movetime, error=None, fen=fen), 200
+
+
+def build_bestmove_args_response(
+    args,
+    config,
+    start: Optional[float] = None,
+    cancelled: Optional[threading.Event] = None,
+    on_iteration: Optional[Callable[[dict], None]] = None,
+) -> Tuple[dict, int]:
+    return build_bestmove_response(
+        args.get("fen", STARTING_POSITION),
+        (
+            args.get("movetime", type=int)
+            if "movetime" in args
+            else config["SEARCH_DEFAULT_MOVETIME"]
+        ),
+        config["SEARCH_MAX_MOVETIME"],
+        args.get("depth", type=int),
+        config["SEARCH_HASH_MB"],
+        start,
+        cancelled,
+        on_iteration,
+    )
+
+
+@api.route("/api/v1/position/bestmove", methods=["GET"])
+def get_bestmove():
+    args = request.args
+    config = current_app.config
+    start = time.monotonic()
+    return run_job(
+        "bestmove",
+        get_query_key(args),
+        lambda cancelled: build_bestmove_args_response(args, config, start, cancelled),
+    )
+
+
+@api.route("/api/v1/position/bestmove/stream", methods=["GET"])
+def stream_bestmove():
+    args = request.args
+    config = current_app.config
+    start = time.monotonic()
+    return stream_job(
+        "bestmove",
+        "depth",
+        lambda cancelled, emit: build_bestmove_args_response(
+            args, config, start, cancelled, emit
+        ),
+    )
+
+
+def get_batch_queries(data, batch_max_size: int) -> Tuple[Optional[list], str, int]:
+    # Returns the queries of a batch body, or None with an error and status.
+    # The whole body is parsed up front, so no setting lifts the size above
+    # BATCH_SIZE_LIMIT.
+    queries = data.get("queries") if isinstance(data, dict) else None
+    if not isinstance(queries, list):
+        return None, "invalid batch", 400
+    batch_max_size = min(batch_max_size, BATCH_SIZE_LIMIT)
+    if len(queries) > batch_max_size:
+        return None, f"batch size exceeds limit of {batch_max_size}", 413
+    return queries, "", 200
+
+
+def build_batch_response(
+    data, batch_max_size: int, move_generation_duration: Optional[Histogram] = None
+) -> Tuple[dict, int]:
+    queries, error, status_code = get_batch_queries(data, batch_max_size)
+    if queries is None:
+        return {"results": [], "error": error}, status_code
+
+    figure_classes = {}
+    results = [
+        build_batch_query_response(query, figure_classes, move_generation_duration)
+        for query in queries
+    ]
+    return {"results": results, "error": None}, 200
+
+
+def generate_batch_events(
+    queries: list, move_generation_duration: Optional[Histogram] = None
+) -> Iterator[str]:
+    figure_classes = {}
+    for index, query in enumerate(queries):
+        result = build_batch_query_response(
+            query, figure_classes, move_generation_duration
+        )
+        yield format_event("result", dict(result, index=index))
+    yield format_event("done", {"count": len(queries), "error": None})
+
+
+@api.route("/api/v1/batch/stream", methods=["POST"])
+def stream_batch_queries():
+    # Each query is cheap, so they are answered on the request thread as the
+    # client reads the stream, and a stalled client holds no job worker.
+    queries, error, status_code = get_batch_queries(
+        request.get_json(silent=True), current_app.config["BATCH_STREAM_MAX_SIZE"]
+    )
+    if queries is None:
+        return json_response({"count": 0, "error": error}, status_code)
+    return event_stream_response(
+        generate_batch_events(queries, get_app_metrics().move_generation_duration)
+    )
+
+
+@api.route("/api/v1/batch", methods=["POST"])
+def batch_queries():
+    payload, status_code = build_batch_response(
+        request.get_json(silent=True),
+        current_app.config["BATCH_MAX_SIZE"],
+        get_app_metrics().move_generation_duration,
+    )
+    return json_response(payload, status_code)
+
+
+def format_stream_line(body: bytes, status_code: int) -> bytes:
+    # Wraps an already serialized payload, so that cached bodies are written
+    # out as they are.
+    return b'{"status":%d,"response":%s}\n' % (status_code, body.rstrip(b"\n"))
+
+
+def build_validate_stream_line(line: bytes) -> Tuple[bytes, int]:
+    try:
+        query = json.loads(line)
+    except ValueError:
+        query = None
+    if not isinstance(query, dict) or not all(
+        isinstance(query.get(name), str)
+        for name in ("figure", "currentField", "destField")
+    ):
+        return (
+            format_stream_line(serialize_payload({"error": "invalid query"}), 400),
+            400,
         )
 
-    figure_instance = figure_class(current_field)
+    chess_figure = query["figure"]
+    current_field = query["currentField"]
+    dest_field = query["destField"]
+    move_generation_duration = get_app_metrics().move_generation_duration
+    # Shares its cache entries with the single move validation route.
+    cached_response = get_cached_response(
+        ("validate", chess_figure, current_field, dest_field),
+        lambda: build_validate_move_response(
+            get_figure_class(chess_figure),
+            chess_figure,
+            current_field,
+            dest_field,
+            move_generation_duration,
+        ),
+    )
+    return (
+        format_stream_line(cached_response.body, cached_response.status_code),
+        cached_response.status_code,
+    )
 
+
+def generate_validate_stream(stream, max_line_bytes: int, buffer_bytes: int):
+    # Reads one line at a time and answers it before reading on, so memory
+    # does not depend on the size of the body and a client that reads slowly
+    # also slows down how fast its input is consumed. Answers are written in
+    # blocks of about buffer_bytes, as a write per line costs more than the
+    # validation itself.
+    if isinstance(stream, io.RawIOBase):
+        # Werkzeug's input streams are unbuffered, and a line read from them
+        # costs a read per byte.
+        stream = io.BufferedReader(stream)
+    app_metrics = get_app_metrics()
+    lines = 0
+    buffer = []
+    buffered = 0
+    start = time.perf_counter()
     try:
-        is_move_valid = figure_instance.validate_move(dest_field)
+        while True:
+            line = stream.readline(max_line_bytes + 1)
+            if not line:
+                break
+            if len(line) > max_line_bytes and not line.endswith(b"\n"):
+                while line and not line.endswith(b"\n"):
+                    line = stream.readline(max_line_bytes + 1)
+                status_code = 413
+                output = format_stream_line(
+                    serialize_payload(
+                        {"error": f"line exceeds limit of {max_line_bytes} bytes"}
+                    ),
+                    status_code,
+                )
+            elif not line.strip():
+                continue
+            else:
+                output, status_code = build_validate_stream_line(line)
+            app_metrics.validate_stream_lines.inc((str(status_code),))
+            lines += 1
+            buffer.append(output)
+            buffered += len(output)
+            if buffered >= buffer_bytes:
+                yield b"".join(buffer)
+                buffer = []
+                buffered = 0
+        if buffer:
+            yield b"".join(buffer)
+    finally:
+        elapsed = time.perf_counter() - start
+        if lines and elapsed:
+            app_metrics.validate_stream_throughput.observe(lines / elapsed)
+
+
+@api.route("/api/v1/validate/stream", methods=["POST"])
+def stream_validate_moves():
+    response = current_app.response_class(
+        stream_with_context(
+            generate_validate_stream(
+                request.stream,
+                current_app.config["VALIDATE_STREAM_MAX_LINE_BYTES"],
+                current_app.config["VALIDATE_STREAM_BUFFER_BYTES"],
+            )
+        ),
+        mimetype="application/x-ndjson",
+    )
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def get_job_status(job) -> dict:
+    return {
+        "id": job["id"],
+        "type": job["type"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "error": job["error"],
+        "createdAt": job["created_at"],
+        "startedAt": job["started_at"],
+        "finishedAt": job["finished_at"],
+        "expiresAt": job["expires_at"],
+        "statusUrl": f"/api/v1/jobs/{job['id']}",
+        "resultUrl": f"/api/v1/jobs/{job['id']}/result",
+    }
+
+
+def build_submit_job_response(
+    data, job_manager: JobManager, config
+) -> Tuple[dict, int]:
+    try:
+        job_type, params = parse_job_request(
+            data, config["JOBS_PERFT_MAX_DEPTH"], config["JOBS_BATCH_MAX_SIZE"]
+        )
     except ValueError as e:
+        return {"id": None, "error": str(e)}, 400
+    job, created = job_manager.submit(job_type, params)
+    # An identical job that is still known is returned instead of a new one.
+    return dict(get_job_status(job), deduplicated=not created), 202 if created else 200
+
+
+def build_job_status_response(job_id: str, job_manager: JobManager) -> Tuple[dict, int]:
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"id": job_id, "error": "job not found"}, 404
+    return get_job_status(job), 200
+
+
+def build_job_result_response(job_id: str, job_manager: JobManager) -> Tuple[dict, int]:
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"id": job_id, "error": "job not found"}, 404
+    if job["status"] == FAILED:
+        return {"id": job_id, "status": job["status"], "error": job["error"]}, 409
+    if job["status"] != DONE:
         return (
-            jsonify(
-                {
-                    "move": "invalid",
-                    "figure": chess_figure,
-                    "error": str(e),
-                    "currentField": current_field,
-                    "destField": dest_field,
-                }
-            ),
+            {"id": job_id, "status": job["status"], "error": "job is not finished"},
             409,
         )
-    else:
-        if chess_figure.lower() == "pawn":
-            (
-                is_move_valid_for_whites,
-                is_move_valid_for_blacks,
-            ) = figure_instance.validate_move(dest_field)
-            return (
-                jsonify(
-                    {
-                        "move": {
-                            "forWhites": "valid"
-                            if is_move_valid_for_whites
-                            else "invalid",
-                            "forBlacks": "valid"
-                            if is_move_valid_for_blacks
-                            else "invalid",
-                        },
-                        "figure": chess_figure,
-                        "error": {
-                            "forWhites": None
-                            if is_move_valid_for_whites
-                            else (
-                                "invalid field for figure"
-                                if is_move_valid_for_whites is None
-                                else "current move is not permitted"
-                            ),
-                            "forBlacks": None
-                            if is_move_valid_for_blacks
-                            else (
-                                "invalid field for figure"
-                                if is_move_valid_for_blacks is None
-                                else "current move is not permitted"
-                            ),
-                        },
-                        "currentField": current_field,
-                        "destField": dest_field,
-                    }
-                ),
-                200,
-            )
+    return {"id": job_id, "type": job["type"], "result": json.loads(job["result"])}, 200
 
-        else:
-            return (
-                jsonify(
-                    {
-                        "move": "valid" if is_move_valid else "invalid",
-                        "figure": chess_figure,
-                        "error": None
-                        if is_move_valid
-                        else "current move is not permitted",
-                        "currentField": current_field,
-                        "destField": dest_field,
-                    }
-                ),
-                200,
-            )
 
+@api.route("/api/v1/jobs", methods=["POST"])
+def submit_job():
+    payload, status_code = build_submit_job_response(
+        request.get_json(silent=True),
+        current_app.extensions["job_manager"],
+        current_app.config,
+    )
+    response = json_response(payload, status_code)
+    if payload["id"] is not None:
+        response.headers["Location"] = payload["statusUrl"]
+    return response
+
+
+@api.route("/api/v1/jobs/<job_id>", methods=["GET"])
+def get_job(job_id: str):
+    payload, status_code = build_job_status_response(
+        job_id, current_app.extensions["job_manager"]
+    )
+    return json_response(payload, status_code)
+
+
+@api.route("/api/v1/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id: str):
+    payload, status_code = build_job_result_response(
+        job_id, current_app.extensions["job_manager"]
+    )
+    return json_response(payload, status_code)
+
+
+def build_attacks_response(data) -> Tuple[dict, int]:
+    pieces = data.get("pieces") if isinstance(data, dict) else None
+    blockers = data.get("blockers", []) if isinstance(data, dict) else None
+    if (
+        not isinstance(pieces, list)
+        or not isinstance(blockers, list)
+        or not all(isinstance(blocker, str) for blocker in blockers)
+    ):
+        return {"attacks": {}, "error": "invalid attacks query"}, 400
+    if len(pieces) > ATTACKS_MAX_PIECES:
+        return (
+            {
+                "attacks": {},
+                "error": f"pieces exceed limit of {ATTACKS_MAX_PIECES}",
+            },
+            413,
+        )
+
+    parsed_pieces = []
+    for piece in pieces:
+        if (
+            not isinstance(piece, dict)
+            or not isinstance(piece.get("figure"), str)
+            or not isinstance(piece.get("field"), str)
+            or not isinstance(piece.get("color"), (str, type(None)))
+        ):
+            return {"attacks": {}, "error": "invalid piece"}, 400
+        parsed_pieces.append((piece["figure"], piece["field"], piece.get("color")))
 
-@app.errorhandler(500)
+    try:
+        counts, union = build_attack_map(parsed_pieces, blockers)
+    except ValueError as e:
+        return {"attacks": {}, "error": str(e)}, 400
+    return (
+        {
+            "attacks": dict(zip(FIELDS, counts)),
+            "controlledFields": fields_from_bitboard(union),
+            "mask": f"{union:#018x}",
+            "error": None,
+        },
+        200,
+    )
+
+
+@api.route("/api/v1/attacks", methods=["POST"])
+def get_attacks():
+    payload, status_code = build_attacks_response(request.get_json(silent=True))
+    return json_response(payload, status_code)
+
+
+@api.route("/metrics", methods=["GET"])
+def get_metrics():
+    response_cache_stats = current_app.extensions["response_cache"].get_stats()
+    app_metrics = get_app_metrics()
+    app_metrics.response_cache_entries.set(value=response_cache_stats["size"])
+    app_metrics.response_cache_hits.set(value=response_cache_stats["hits"])
+    app_metrics.response_cache_misses.set(value=response_cache_stats["misses"])
+    return current_app.response_class(
+        current_app.extensions["metrics"].render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@api.app_errorhandler(500)
 def handle_internal_server_error_500(e):
     return jsonify({"error": "Internal Server Error", "message": str(e)}), 500
 
 
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def handle_not_found_error_404(error):
     return make_response(jsonify({"error": "Not found"}), 404)
 
 
+app = create_app()
+
+
 if __name__ == "__main__":
     app.run(debug=False)
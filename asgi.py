@@ -0,0 +1,521 @@
+import argparse
+import asyncio
+import functools
+import json
+import sys
+import time
+from app import (
+    app as flask_app,
+    build_attacks_response,
+    build_batch_response,
+    build_bestmove_args_response,
+    build_job_result_response,
+    build_job_status_response,
+    build_list_available_moves_on_board_response,
+    build_list_available_moves_response,
+    build_path_response,
+    build_perft_args_response,
+    build_position_moves_response,
+    build_reachable_response,
+    build_submit_job_response,
+    build_validate_move_response,
+    get_query_key,
+)
+from concurrent.futures import Executor, ThreadPoolExecutor
+from email.utils import formatdate
+from fen import STARTING_POSITION
+from figures import get_figure_class
+from http import HTTPStatus
+from job_pool import JobCancelled, JobRejected
+from response_cache import ResponseCache, make_cached_response
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import InternalServerError
+
+KEEPALIVE_TIMEOUT = 75.0
+MAX_HEADERS = 100
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+Headers = List[Tuple[bytes, bytes]]
+Response = Tuple[int, Headers, bytes]
+
+
+def dumps_json(payload) -> bytes:
+    # The same settings as Flask's default JSON provider, so both apps send
+    # byte-identical bodies.
+    return (
+        json.dumps(payload, ensure_ascii=True, sort_keys=True, separators=(",", ":"))
+        + "\n"
+    ).encode()
+
+
+def json_response(payload, status_code: int) -> Response:
+    return status_code, [(b"content-type", b"application/json")], dumps_json(payload)
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in ("*", f'"{etag}"'):
+            return True
+    return False
+
+
+class AsgiApp:
+    def __init__(
+        self,
+        config: Optional[dict] = None,
+        executor: Optional[Executor] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ):
+        # Limits and cache settings come from the Flask app, so that both
+        # serving modes enforce the same contracts.
+        self.config = dict(flask_app.config)
+        if config:
+            self.config.update(config)
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=self.config["PERFT_MAX_WORKERS"]
+        )
+        self.response_cache = response_cache or ResponseCache(
+            self.config["RESPONSE_CACHE_SIZE"]
+        )
+        # Jobs live in the Flask app's store, so both apps see the same ones.
+        self.job_manager = flask_app.extensions["job_manager"]
+        # Perft and searches share the Flask app's job pool and coalescer, so
+        # both apps admit, deduplicate and time out expensive work alike.
+        self.job_pool = flask_app.extensions["job_pool"]
+        self.coalescer = flask_app.extensions["coalescer"]
+        # Threads that wait for pool jobs; one per job the pool can hold.
+        self.job_waiters = ThreadPoolExecutor(
+            max_workers=self.config["JOB_POOL_WORKERS"] + self.config["JOB_QUEUE_SIZE"]
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.handle_lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        try:
+            status_code, headers, body = await self.handle_request(scope, receive)
+        except Exception:
+            # The same log line and body as the Flask app's 500 handler.
+            flask_app.logger.exception(
+                "Exception on %s [%s]", scope["path"], scope["method"]
+            )
+            status_code, headers, body = json_response(
+                {
+                    "error": "Internal Server Error",
+                    "message": str(InternalServerError()),
+                },
+                500,
+            )
+        if status_code != 304:
+            headers.append((b"content-length", str(len(body)).encode()))
+        if scope["method"] == "HEAD":
+            body = b""
+        await send(
+            {"type": "http.response.start", "status": status_code, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                self.job_waiters.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def read_body(self, receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        return b"".join(chunks)
+
+    async def run_in_executor(self, function: Callable, *args):
+        # Perft, searches and batches can take seconds of CPU, which would stall every
+        # other connection if run on the event loop.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(function, *args)
+        )
+
+    async def run_job(
+        self,
+        name: str,
+        key: tuple,
+        build_response: Callable[..., Tuple[dict, int]],
+    ) -> Response:
+        # The ASGI counterpart of app.run_job. Clients that go away are not
+        # noticed here, so their jobs run until the deadline at most.
+        job_pool = self.job_pool
+        coalescer_key = (name,) + key
+        loop = asyncio.get_running_loop()
+        result = self.coalescer.get_result(name, coalescer_key)
+        if result is not None:
+            return json_response(*result)
+        try:
+            # Checked before taking a waiter thread, so that a full pool
+            # answers at once instead of queueing in the executor. Requests
+            # that join an identical job in flight submit nothing and are
+            # let through; the pool still rejects a job it cannot hold.
+            if not self.coalescer.is_in_flight(coalescer_key):
+                job_pool.check_capacity(name)
+            payload, status_code = await loop.run_in_executor(
+                self.job_waiters,
+                functools.partial(
+                    self.coalescer.run,
+                    name,
+                    coalescer_key,
+                    lambda is_abandoned: job_pool.run(
+                        name, build_response, self.config["JOB_TIMEOUT"], is_abandoned
+                    ),
+                ),
+            )
+        except JobRejected as e:
+            return self.busy_response(e.retry_after)
+        except JobCancelled as e:
+            return json_response({"error": str(e)}, 503)
+        return json_response(payload, status_code)
+
+    def busy_response(self, retry_after: int) -> Response:
+        status_code, headers, body = json_response({"error": "server busy"}, 503)
+        headers.append((b"retry-after", str(retry_after).encode()))
+        return status_code, headers, body
+
+    def serve_cached_response(
+        self,
+        cache_key: tuple,
+        build_response: Callable[[], Tuple[dict, int]],
+        if_none_match: Optional[str],
+    ) -> Response:
+        cached_response = self.response_cache.get(cache_key)
+        if cached_response is None:
+            payload, status_code = build_response()
+            cached_response = self.response_cache.put(
+                cache_key, make_cached_response(dumps_json(payload), status_code)
+            )
+        if cached_response.status_code != 200:
+            return (
+                cached_response.status_code,
+                [(b"content-type", b"application/json")],
+                cached_response.body,
+            )
+
+        headers = [
+            (b"etag", f'"{cached_response.etag}"'.encode()),
+            (
+                b"cache-control",
+                f"public, max-age={self.config['RESPONSE_CACHE_MAX_AGE']}".encode(),
+            ),
+            (b"date", formatdate(usegmt=True).encode()),
+        ]
+        if etag_matches(cached_response.etag, if_none_match):
+            return 304, headers, b""
+        headers.insert(0, (b"content-type", b"application/json"))
+        return 200, headers, cached_response.body
+
+    async def handle_request(self, scope, receive) -> Response:
+        segments = scope["path"].split("/")[1:]
+        if segments[:2] != ["api", "v1"] or not all(segments[2:]):
+            return json_response({"error": "Not found"}, 404)
+        segments = segments[2:]
+        # A MultiDict gives the payload builders the same view as request.args.
+        query = MultiDict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        headers = dict(scope["headers"])
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1")
+        method = "GET" if scope["method"] == "HEAD" else scope["method"]
+
+        if method == "POST" and segments in (["batch"], ["attacks"], ["jobs"]):
+            try:
+                data = json.loads(await self.read_body(receive))
+            except ValueError:
+                data = None
+            if segments == ["batch"]:
+                return json_response(
+                    *await self.run_in_executor(
+                        build_batch_response, data, self.config["BATCH_MAX_SIZE"]
+                    )
+                )
+            if segments == ["jobs"]:
+                payload, status_code = await self.run_in_executor(
+                    build_submit_job_response, data, self.job_manager, self.config
+                )
+                status_code, headers, body = json_response(payload, status_code)
+                if payload["id"] is not None:
+                    headers.append((b"location", payload["statusUrl"].encode()))
+                return status_code, headers, body
+            return json_response(*build_attacks_response(data))
+
+        if method != "GET":
+            return json_response({"error": "Method not allowed"}, 405)
+
+        if segments == ["perft"]:
+            return await self.run_job(
+                "perft",
+                get_query_key(query),
+                lambda cancelled: build_perft_args_response(
+                    query, self.config, cancelled
+                ),
+            )
+        if segments == ["position", "bestmove"]:
+            start = time.monotonic()
+            return await self.run_job(
+                "bestmove",
+                get_query_key(query),
+                lambda cancelled: build_bestmove_args_response(
+                    query, self.config, start, cancelled
+                ),
+            )
+        if segments[:1] == ["jobs"] and len(segments) == 2:
+            return json_response(
+                *await self.run_in_executor(
+                    build_job_status_response, segments[1], self.job_manager
+                )
+            )
+        if segments[:1] == ["jobs"] and segments[2:] == ["result"]:
+            return json_response(
+                *await self.run_in_executor(
+                    build_job_result_response, segments[1], self.job_manager
+                )
+            )
+        if segments == ["position", "moves"]:
+            return json_response(
+                *build_position_moves_response(query.get("fen", STARTING_POSITION))
+            )
+        if len(segments) == 2:
+            chess_figure, current_field = segments
+            return self.serve_cached_response(
+                ("list", chess_figure, current_field),
+                lambda: build_list_available_moves_response(
+                    get_figure_class(chess_figure), chess_figure, current_field
+                ),
+                if_none_match,
+            )
+        if len(segments) == 4 and segments[2:] == ["board", "occupancy"]:
+            chess_figure, current_field, _, _ = segments
+            return json_response(
+                *build_list_available_moves_on_board_response(
+                    get_figure_class(chess_figure),
+                    chess_figure,
+                    current_field,
+                    query.get("fen"),
+                    query.get("occupied"),
+                )
+            )
+        if len(segments) == 4 and segments[2:] == ["board", "reachable"]:
+            chess_figure, current_field, _, _ = segments
+            return self.serve_cached_response(
+                ("reachable", chess_figure, current_field, query.get("moves")),
+                lambda: build_reachable_response(
+                    chess_figure,
+                    current_field,
+                    query.get("moves", type=int),
+                ),
+                if_none_match,
+            )
+        if len(segments) == 3:
+            chess_figure, current_field, dest_field = segments
+            return self.serve_cached_response(
+                ("validate", chess_figure, current_field, dest_field),
+                lambda: build_validate_move_response(
+                    get_figure_class(chess_figure),
+                    chess_figure,
+                    current_field,
+                    dest_field,
+                ),
+                if_none_match,
+            )
+        if len(segments) == 4 and segments[2] == "path":
+            chess_figure, current_field, _, dest_field = segments
+            return self.serve_cached_response(
+                ("path", chess_figure, current_field, dest_field),
+                lambda: build_path_response(chess_figure, current_field, dest_field),
+                if_none_match,
+            )
+        return json_response({"error": "Not found"}, 404)
+
+
+async def write_response_head(writer, status_code: int, headers: Headers):
+    phrase = HTTPStatus(status_code).phrase
+    lines = [f"HTTP/1.1 {status_code} {phrase}\r\n".encode()]
+    lines += [name + b": " + value + b"\r\n" for name, value in headers]
+    writer.write(b"".join(lines) + b"\r\n")
+
+
+async def handle_connection(asgi_app, reader, writer):
+    client = writer.get_extra_info("peername")
+    server = writer.get_extra_info("sockname")
+    try:
+        while True:
+            try:
+                request_line = await asyncio.wait_for(
+                    reader.readline(), KEEPALIVE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                break
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+                headers = []
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    if len(headers) >= MAX_HEADERS:
+                        raise ValueError("too many headers")
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers.append(
+                        (name.strip().lower().encode("latin-1"), value.strip().encode())
+                    )
+                content_length = int(dict(headers).get(b"content-length", 0))
+                if not 0 <= content_length <= MAX_BODY_SIZE:
+                    raise ValueError("invalid content length")
+                body = await reader.readexactly(content_length)
+            except (ValueError, asyncio.IncompleteReadError):
+                await write_response_head(
+                    writer, 400, [(b"content-length", b"0"), (b"connection", b"close")]
+                )
+                break
+
+            path, _, query_string = target.partition("?")
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": version.partition("/")[2],
+                "method": method.upper(),
+                "scheme": "http",
+                "path": unquote(path),
+                "raw_path": path.encode("latin-1"),
+                "query_string": query_string.encode("latin-1"),
+                "root_path": "",
+                "headers": headers,
+                "client": client,
+                "server": server,
+            }
+            keep_alive = (
+                version == "HTTP/1.1"
+                and dict(headers).get(b"connection", b"").lower() != b"close"
+            )
+            request_messages = [
+                {"type": "http.request", "body": body, "more_body": False}
+            ]
+
+            async def receive():
+                if request_messages:
+                    return request_messages.pop()
+                return {"type": "http.disconnect"}
+
+            response_start = {}
+            chunked = False
+            head_written = False
+
+            async def send(message):
+                nonlocal chunked, head_written
+                if message["type"] == "http.response.start":
+                    response_start.update(message)
+                    return
+                headers = list(response_start.get("headers", []))
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                if response_start:
+                    # Without a length the body is streamed in chunks.
+                    names = {name.lower() for name, _ in headers}
+                    if b"content-length" not in names and response_start[
+                        "status"
+                    ] not in (204, 304):
+                        if more_body:
+                            chunked = True
+                            headers.append((b"transfer-encoding", b"chunked"))
+                        else:
+                            headers.append((b"content-length", str(len(body)).encode()))
+                    if not keep_alive:
+                        headers.append((b"connection", b"close"))
+                    await write_response_head(writer, response_start["status"], headers)
+                    response_start.clear()
+                    head_written = True
+                if chunked:
+                    if body:
+                        writer.write(b"%x\r\n%s\r\n" % (len(body), body))
+                    if not more_body:
+                        writer.write(b"0\r\n\r\n")
+                else:
+                    writer.write(body)
+                await writer.drain()
+
+            try:
+                await asgi_app(scope, receive, send)
+            except Exception:
+                # Applications other than AsgiApp may fail without a response;
+                # the client still gets one, unless the head was already sent.
+                if not head_written:
+                    await write_response_head(
+                        writer,
+                        500,
+                        [(b"content-length", b"0"), (b"connection", b"close")],
+                    )
+                break
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(asgi_app, host: str, port: int, ready: Optional[Callable] = None):
+    server = await asyncio.start_server(
+        functools.partial(handle_connection, asgi_app), host, port
+    )
+    if ready is not None:
+        ready(server.sockets[0].getsockname())
+    async with server:
+        await server.serve_forever()
+
+
+application = AsgiApp()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Serve the API from the bundled asyncio HTTP server."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(
+            serve(
+                application,
+                args.host,
+                args.port,
+                lambda address: print(
+                    f"listening on http://{address[0]}:{address[1]}",
+                    file=sys.stderr,
+                    flush=True,
+                ),
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+from bitboard import bitboard_from_fields, square_from_field
+from magic_bitboards import get_bishop_attacks, get_queen_attacks, get_rook_attacks
+from position import BLACK, KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS, WHITE
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+COLORS = {"white": WHITE, "black": BLACK}
+
+SLIDING_ATTACKS = {
+    "bishop": get_bishop_attacks,
+    "queen": get_queen_attacks,
+    "rook": get_rook_attacks,
+}
+LEAPING_ATTACKS = {"king": KING_ATTACKS, "knight": KNIGHT_ATTACKS}
+
+
+def get_piece_attacks(
+    figure: str, square: int, color: Optional[int], occupied: int
+) -> int:
+    if figure in SLIDING_ATTACKS:
+        return SLIDING_ATTACKS[figure](square, occupied)
+    if figure in LEAPING_ATTACKS:
+        return LEAPING_ATTACKS[figure][square]
+    if figure == "pawn":
+        if color is None:
+            raise ValueError("pawn requires color")
+        return PAWN_ATTACKS[color][square]
+    raise ValueError("invalid figure")
+
+
+def add_to_counters(counters: List[int], attacks: int):
+    # Bit-sliced counters: counters[i] holds bit i of every square's count,
+    # so adding a bitboard is a ripple-carry add over whole bitboards.
+    for index, counter in enumerate(counters):
+        carry = counter & attacks
+        counters[index] = counter ^ attacks
+        attacks = carry
+        if not attacks:
+            return
+    counters.append(attacks)
+
+
+def counts_from_counters(counters: Sequence[int]) -> List[int]:
+    return [
+        sum((counter >> square & 1) << index for index, counter in enumerate(counters))
+        for square in range(64)
+    ]
+
+
+def build_attack_map(
+    pieces: Iterable[Tuple[str, str, Optional[str]]], blockers: Iterable[str] = ()
+) -> Tuple[List[int], int]:
+    parsed_pieces = []
+    for figure, field, color in pieces:
+        square = square_from_field(field)
+        if square is None:
+            raise ValueError("current field does not exist")
+        if color is not None:
+            if color.lower() not in COLORS:
+                raise ValueError("invalid color")
+            color = COLORS[color.lower()]
+        parsed_pieces.append((figure.lower(), square, color))
+
+    try:
+        occupied = bitboard_from_fields(blockers)
+    except ValueError:
+        raise ValueError("invalid blockers")
+    # The pieces stand on the board too, so they block each other's rays.
+    for _, square, _ in parsed_pieces:
+        occupied |= 1 << square
+
+    counters: List[int] = []
+    union = 0
+    for figure, square, color in parsed_pieces:
+        attacks = get_piece_attacks(figure, square, color, occupied)
+        add_to_counters(counters, attacks)
+        union |= attacks
+    return counts_from_counters(counters), union
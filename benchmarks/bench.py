@@ -0,0 +1,168 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+
+def get_benchmarks() -> Dict[str, Callable[[], object]]:
+    import numpy as np
+    from app import app
+    from chessboard import Chessboard
+    from figures import Bishop, King, Knight, Pawn, Queen, Rook, get_figure
+    from vectorized import validate_many
+
+    client = app.test_client()
+    benchmarks = {
+        "chessboard.check_if_field_in_chessboard": lambda: (
+            Chessboard.check_if_field_in_chessboard("e4")
+        ),
+        "chessboard.get_field_after_move": lambda: (
+            Chessboard.get_field_after_move("C3", -1, 2)
+        ),
+    }
+    for figure_class in (Bishop, King, Knight, Pawn, Queen, Rook):
+        name = figure_class.__name__.lower()
+        benchmarks[
+            f"figures.{name}.list_available_moves"
+        ] = lambda figure_class=figure_class: figure_class("D4").list_available_moves()
+        benchmarks[
+            f"figures.{name}.validate_move"
+        ] = lambda figure_class=figure_class: figure_class("D4").validate_move("E5")
+    benchmarks["figures.get_figure.validate_move"] = lambda: get_figure(
+        Queen, "D4"
+    ).validate_move("E5")
+    benchmarks["app.get_list_available_moves"] = lambda: client.get("/api/v1/queen/d4")
+    benchmarks["app.validate_move"] = lambda: client.get("/api/v1/queen/d4/e5")
+    random_state = np.random.default_rng(0)
+    figures = random_state.integers(1, 6, 10000)
+    sources = random_state.integers(0, 64, 10000)
+    destinations = random_state.integers(0, 64, 10000)
+    benchmarks["vectorized.validate_many_10000"] = lambda: validate_many(
+        figures, sources, destinations
+    )
+    return benchmarks
+
+
+def percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def time_benchmark(
+    function: Callable[[], object], warmup: int, repetitions: int, number: int
+) -> Dict[str, float]:
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "repetitions": repetitions,
+        "number": number,
+        "min": min(timings),
+        "mean": statistics.mean(timings),
+        "median": statistics.median(timings),
+        "p90": percentile(timings, 90),
+        "p99": percentile(timings, 99),
+        "max": max(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def run_benchmarks(
+    warmup: int = 100,
+    repetitions: int = 30,
+    number: int = 200,
+    only: Optional[str] = None,
+) -> dict:
+    results = {}
+    for name, function in get_benchmarks().items():
+        if only and only not in name:
+            continue
+        results[name] = time_benchmark(function, warmup, repetitions, number)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    comparison = []
+    for name, current_stats in current["results"].items():
+        baseline_stats = baseline["results"].get(name)
+        if baseline_stats is None:
+            continue
+        ratio = current_stats["median"] / baseline_stats["median"]
+        comparison.append(
+            {
+                "name": name,
+                "baselineMedian": baseline_stats["median"],
+                "currentMedian": current_stats["median"],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+            }
+        )
+    return comparison
+
+
+def format_comparison(comparison: List[dict]) -> str:
+    lines = []
+    for row in comparison:
+        flag = "!!" if row["regression"] else "  "
+        lines.append(
+            f"{flag} {row['name']:<48} {row['baselineMedian'] * 1e6:>10.2f}us "
+            f"{row['currentMedian'] * 1e6:>10.2f}us {row['ratio']:>6.2f}x"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks.")
+    parser.add_argument("mode", choices=["run", "compare"])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--repetitions", type=int, default=30)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--only", help="run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.warmup, args.repetitions, args.number, args.only)
+    if args.mode == "run":
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(current, baseline_file, indent=2, sort_keys=True)
+        for name, stats in current["results"].items():
+            print(f"{name:<48} median {stats['median'] * 1e6:>10.2f}us")
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    comparison = compare_results(baseline, current, args.threshold)
+    print(format_comparison(comparison))
+    regressions = [row["name"] for row in comparison if row["regression"]]
+    if regressions:
+        print(
+            f"{len(regressions)} benchmark(s) slower than baseline by more than "
+            f"{args.threshold:.0%}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+from app import app
+response = app.test_client().get("/api/v1/queen/d4")
+assert response.status_code == 200
+print(time.perf_counter() - start)
+"""
+
+
+def measure_cold_start(table_store_path: str, runs: int) -> dict:
+    environment = dict(os.environ, CHESS_TABLE_STORE=table_store_path)
+    process_timings = []
+    import_timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT],
+            cwd=ROOT_DIRECTORY,
+            env=environment,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        process_timings.append(time.perf_counter() - start)
+        import_timings.append(float(completed.stdout))
+    return {
+        "runs": runs,
+        "processSeconds": statistics.median(process_timings),
+        "importToFirstResponseSeconds": statistics.median(import_timings),
+    }
+
+
+def compare_cold_start(runs: int) -> dict:
+    from table_store import collect_tables, write_table_store
+
+    with tempfile.TemporaryDirectory() as directory:
+        table_store_path = os.path.join(directory, "tables.bin")
+        write_table_store(table_store_path, collect_tables())
+        with_table_store = measure_cold_start(table_store_path, runs)
+    # An empty path disables the table store, so every table is built in
+    # Python as before.
+    without_table_store = measure_cold_start("", runs)
+    return {
+        "withTableStore": with_table_store,
+        "withoutTableStore": without_table_store,
+        "speedup": without_table_store["importToFirstResponseSeconds"]
+        / with_table_store["importToFirstResponseSeconds"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure cold start to the first served request."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+    print(json.dumps(compare_cold_start(args.runs), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
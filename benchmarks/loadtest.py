@@ -0,0 +1,175 @@
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from benchmarks.bench import percentile
+from collections import Counter
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+FIGURES = ["bishop", "king", "knight", "pawn", "queen", "rook"]
+FIELDS = [f"{col}{row}" for row in range(1, 9) for col in "abcdefgh"]
+
+
+def start_local_server():
+    from app import app
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server(
+        "127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def generate_path(rng: random.Random, validate_ratio: float) -> str:
+    path = f"/api/v1/{rng.choice(FIGURES)}/{rng.choice(FIELDS)}"
+    if rng.random() < validate_ratio:
+        path += f"/{rng.choice(FIELDS)}"
+    return path
+
+
+def run_worker(
+    host: str,
+    port: int,
+    deadline: float,
+    validate_ratio: float,
+    seed: int,
+    latencies: List[float],
+    status_codes: Counter,
+    lock: threading.Lock,
+):
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    worker_latencies = []
+    worker_status_codes = Counter()
+    while time.perf_counter() < deadline:
+        path = generate_path(rng, validate_ratio)
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            worker_status_codes[response.status] += 1
+        except (OSError, http.client.HTTPException):
+            worker_status_codes["error"] += 1
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+        worker_latencies.append(time.perf_counter() - start)
+    connection.close()
+    with lock:
+        latencies.extend(worker_latencies)
+        status_codes.update(worker_status_codes)
+
+
+def run_load(
+    url: str, concurrency: int, duration: float, validate_ratio: float, seed: int = 0
+) -> dict:
+    parsed_url = urlsplit(url)
+    latencies = []
+    status_codes = Counter()
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+    workers = [
+        threading.Thread(
+            target=run_worker,
+            args=(
+                parsed_url.hostname,
+                parsed_url.port or 80,
+                deadline,
+                validate_ratio,
+                seed + index,
+                latencies,
+                status_codes,
+                lock,
+            ),
+        )
+        for index in range(concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    requests = len(latencies)
+    errors = requests - status_codes.get(200, 0)
+    return {
+        "concurrency": concurrency,
+        "durationSeconds": elapsed,
+        "requests": requests,
+        "errors": errors,
+        "errorRate": errors / requests if requests else 0.0,
+        "requestsPerSecond": requests / elapsed,
+        "latencyMs": {
+            "p50": percentile(latencies, 50) * 1e3 if latencies else None,
+            "p95": percentile(latencies, 95) * 1e3 if latencies else None,
+            "p99": percentile(latencies, 99) * 1e3 if latencies else None,
+            "max": max(latencies) * 1e3 if latencies else None,
+        },
+        "statusCodes": {str(code): count for code, count in status_codes.items()},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP load generator.")
+    parser.add_argument("--url", help="running server; default starts app locally")
+    parser.add_argument(
+        "--concurrency",
+        default="1,4,16",
+        help="comma separated list of concurrent clients to run one after another",
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument(
+        "--validate-ratio",
+        type=float,
+        default=0.5,
+        help="share of validate requests, the rest lists moves",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_local_server()
+    try:
+        runs = [
+            run_load(
+                url, int(concurrency), args.duration, args.validate_ratio, args.seed
+            )
+            for concurrency in args.concurrency.split(",")
+        ]
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = json.dumps(
+        {
+            "url": url,
+            "local": server is not None,
+            "validateRatio": args.validate_ratio,
+            "runs": runs,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(report)
+    print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
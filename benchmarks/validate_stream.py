@@ -0,0 +1,122 @@
+import argparse
+import http.client
+import json
+import random
+import resource
+import socket
+import sys
+import threading
+import time
+from benchmarks.loadtest import FIELDS, FIGURES, start_local_server
+from typing import Iterator, List, Optional
+from urllib.parse import urlsplit
+
+SEND_BLOCK_LINES = 1000
+READ_SIZE = 65536
+
+
+def generate_lines(count: int, seed: int) -> Iterator[bytes]:
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield json.dumps(
+            {
+                "figure": rng.choice(FIGURES),
+                "currentField": rng.choice(FIELDS),
+                "destField": rng.choice(FIELDS),
+            }
+        ).encode() + b"\n"
+
+
+def send_body(sock: socket.socket, lines: Iterator[bytes]):
+    block = []
+    for line in lines:
+        block.append(line)
+        if len(block) == SEND_BLOCK_LINES:
+            sock.sendall(b"".join(block))
+            block = []
+    if block:
+        sock.sendall(b"".join(block))
+
+
+def run_stream(url: str, count: int, seed: int = 0) -> dict:
+    # The body is sent from a second thread while the answers are read, as
+    # the server only reads on as fast as its answers are taken. It goes to
+    # the socket directly: the connection object closes itself once it sees
+    # the server's "Connection: close".
+    parsed_url = urlsplit(url)
+    connection = http.client.HTTPConnection(
+        parsed_url.hostname, parsed_url.port or 80, timeout=60
+    )
+    body_size = sum(len(line) for line in generate_lines(count, seed))
+    start = time.perf_counter()
+    connection.putrequest("POST", "/api/v1/validate/stream")
+    connection.putheader("Content-Type", "application/x-ndjson")
+    connection.putheader("Content-Length", str(body_size))
+    connection.endheaders()
+    sender = threading.Thread(
+        target=send_body,
+        args=(connection.sock, generate_lines(count, seed)),
+        daemon=True,
+    )
+    sender.start()
+    response = connection.getresponse()
+    lines = 0
+    while True:
+        data = response.read(READ_SIZE)
+        if not data:
+            break
+        lines += data.count(b"\n")
+    elapsed = time.perf_counter() - start
+    sender.join()
+    connection.close()
+    return {
+        "lines": lines,
+        "bodyBytes": body_size,
+        "status": response.status,
+        "durationSeconds": elapsed,
+        "linesPerSecond": lines / elapsed,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Throughput of the NDJSON validation stream."
+    )
+    parser.add_argument("--url", help="running server; default starts app locally")
+    parser.add_argument(
+        "--lines",
+        default="10000,100000",
+        help="comma separated list of stream lengths to run one after another",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_local_server()
+    try:
+        runs = [
+            run_stream(url, int(count), args.seed) for count in args.lines.split(",")
+        ]
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print(
+        json.dumps(
+            {
+                "url": url,
+                "local": server is not None,
+                "runs": runs,
+                # Stays flat across stream lengths when the server is local.
+                "maxRssKb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            },
+            indent=2,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
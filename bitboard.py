@@ -0,0 +1,110 @@
+from typing import Iterator, List, Optional
+
+# Squares are indexed 0..63 from A1 to H8, row by row (A1=0, B1=1, ..., H8=63).
+# A set of squares is a 64-bit int with bit n set for square n.
+COLUMNS = "ABCDEFGH"
+SQUARES = range(64)
+FIELDS = [f"{col}{row}" for row in range(1, 9) for col in COLUMNS]
+FIELD_TO_SQUARE = {field: square for square, field in enumerate(FIELDS)}
+# Both spellings of every field, so that lookups never have to upper() input.
+FIELD_LOOKUP = {
+    spelling: square
+    for field, square in FIELD_TO_SQUARE.items()
+    for spelling in (field, field.lower())
+}
+
+EMPTY = 0
+FULL = (1 << 64) - 1
+
+FILE_A = 0x0101010101010101
+FILE_B = FILE_A << 1
+FILE_G = FILE_A << 6
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_2 = RANK_1 << 8
+RANK_7 = RANK_1 << 48
+RANK_8 = RANK_1 << 56
+
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+NOT_RANK_1 = FULL ^ RANK_1
+NOT_RANK_8 = FULL ^ RANK_8
+
+UP = "up"
+DOWN = "down"
+LEFT = "left"
+RIGHT = "right"
+UP_LEFT = "up_left"
+UP_RIGHT = "up_right"
+DOWN_LEFT = "down_left"
+DOWN_RIGHT = "down_right"
+
+# Per direction: the bit shift and the mask of squares that can make that step
+# without leaving the board (or wrapping around to the other edge).
+SHIFTS = {
+    UP: (8, NOT_RANK_8),
+    DOWN: (-8, NOT_RANK_1),
+    LEFT: (-1, NOT_FILE_A),
+    RIGHT: (1, NOT_FILE_H),
+    UP_LEFT: (7, NOT_RANK_8 & NOT_FILE_A),
+    UP_RIGHT: (9, NOT_RANK_8 & NOT_FILE_H),
+    DOWN_LEFT: (-9, NOT_RANK_1 & NOT_FILE_A),
+    DOWN_RIGHT: (-7, NOT_RANK_1 & NOT_FILE_H),
+}
+
+ROOK_DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+BISHOP_DIRECTIONS = [UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT]
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+
+
+def square_bitboard(square: int) -> int:
+    return 1 << square
+
+
+def shift(bitboard: int, direction: str) -> int:
+    amount, mask = SHIFTS[direction]
+    bitboard &= mask
+    if amount > 0:
+        return bitboard << amount
+    return bitboard >> -amount
+
+
+def iterate_squares(bitboard: int) -> Iterator[int]:
+    while bitboard:
+        lowest_bit = bitboard & -bitboard
+        yield lowest_bit.bit_length() - 1
+        bitboard ^= lowest_bit
+
+
+def count_squares(bitboard: int) -> int:
+    return bin(bitboard).count("1")
+
+
+def get_column(square: int) -> int:
+    return square & 7
+
+
+def get_row(square: int) -> int:
+    return square >> 3
+
+
+def square_from_field(field: str) -> Optional[int]:
+    return FIELD_LOOKUP.get(field)
+
+
+def field_from_square(square: int) -> str:
+    return FIELDS[square]
+
+
+def bitboard_from_fields(fields: List[str]) -> int:
+    bitboard = EMPTY
+    for field in fields:
+        square = square_from_field(field)
+        if square is None:
+            raise ValueError(f"field {field} does not exist")
+        bitboard |= 1 << square
+    return bitboard
+
+
+def fields_from_bitboard(bitboard: int) -> List[str]:
+    return sorted(FIELDS[square] for square in iterate_squares(bitboard))
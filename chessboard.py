@@ -1,18 +1,30 @@
+import bitboard
+from typing import List, Optional
+
+
 class Chessboard:
     ROWS = range(1, 9)
     COLUMNS = "ABCDEFGH"
 
     @classmethod
     def get_fields_of_chessboard(cls) -> list:
-        fields = [f"{col}{row}" for row in cls.ROWS for col in cls.COLUMNS]
-        return fields
+        return list(bitboard.FIELDS)
 
     @staticmethod
     def check_if_field_in_chessboard(field: str) -> bool:
-        if field.upper() in Chessboard.get_fields_of_chessboard():
-            return True
-        else:
-            return False
+        return field.upper() in bitboard.FIELD_TO_SQUARE
+
+    @staticmethod
+    def get_square_from_field(field: str) -> Optional[int]:
+        return bitboard.square_from_field(field)
+
+    @staticmethod
+    def get_field_from_square(square: int) -> str:
+        return bitboard.field_from_square(square)
+
+    @staticmethod
+    def get_fields_from_bitboard(squares: int) -> List[str]:
+        return bitboard.fields_from_bitboard(squares)
 
     @staticmethod
     def change_column(column: str, change_by: int) -> str:
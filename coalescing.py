@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from job_pool import WAIT_INTERVAL, JobCancelled
+from metrics import MetricsRegistry
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        # Clients still waiting for the result, the leader included.
+        self.waiters = 1
+        self.result = None
+        self.exception: Optional[BaseException] = None
+
+
+class Coalescer:
+    # Concurrent calls with the same key share one computation, and its
+    # result is kept for ttl seconds in a bounded LRU cache.
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.results: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.flights: Dict[Hashable, Flight] = {}
+        self.lock = threading.Lock()
+        registry = registry or MetricsRegistry()
+        self.outcomes = registry.counter(
+            "chess_coalescing_requests_total",
+            "Expensive requests by how they were answered: computed, joined an "
+            "identical computation in flight (coalesced) or from the result "
+            "cache (cached).",
+            ("job", "outcome"),
+        )
+
+    def get_cached(self, key: Hashable, now: float):
+        entry = self.results.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if expires <= now:
+            del self.results[key]
+            return None
+        self.results.move_to_end(key)
+        return entry
+
+    def get_result(self, name: str, key: Hashable):
+        # The cached result for key, or None; never starts a computation.
+        with self.lock:
+            entry = self.get_cached(key, time.monotonic())
+        if entry is None:
+            return None
+        self.outcomes.inc((name, "cached"))
+        return entry[1]
+
+    def is_in_flight(self, key: Hashable) -> bool:
+        with self.lock:
+            return key in self.flights
+
+    def run(
+        self,
+        name: str,
+        key: Hashable,
+        compute: Callable[[Callable[[], bool]], Any],
+        is_disconnected: Optional[Callable[[], bool]] = None,
+    ):
+        # compute gets a callback telling whether every waiting client has
+        # disconnected, so that the shared work is only cancelled then.
+        with self.lock:
+            entry = self.get_cached(key, time.monotonic())
+            if entry is not None:
+                self.outcomes.inc((name, "cached"))
+                return entry[1]
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+            else:
+                flight.waiters += 1
+        self.outcomes.inc((name, "computed" if leader else "coalesced"))
+        if leader:
+            return self.lead(key, flight, compute, is_disconnected)
+        return self.follow(flight, is_disconnected)
+
+    def lead(
+        self,
+        key: Hashable,
+        flight: Flight,
+        compute: Callable[[Callable[[], bool]], Any],
+        is_disconnected: Optional[Callable[[], bool]],
+    ):
+        leader_gone = False
+
+        def is_abandoned() -> bool:
+            nonlocal leader_gone
+            if not leader_gone and is_disconnected is not None and is_disconnected():
+                leader_gone = True
+                self.leave(flight)
+            return flight.waiters == 0
+
+        try:
+            flight.result = compute(is_abandoned)
+        except BaseException as e:
+            flight.exception = e
+        with self.lock:
+            del self.flights[key]
+            if flight.exception is None and self.ttl > 0:
+                self.results[key] = (time.monotonic() + self.ttl, flight.result)
+                self.results.move_to_end(key)
+                while len(self.results) > self.max_size:
+                    self.results.popitem(last=False)
+        flight.done.set()
+        if flight.exception is not None:
+            raise flight.exception
+        return flight.result
+
+    def follow(self, flight: Flight, is_disconnected: Optional[Callable[[], bool]]):
+        while not flight.done.wait(WAIT_INTERVAL):
+            if is_disconnected is not None and is_disconnected():
+                self.leave(flight)
+                raise JobCancelled("client disconnected")
+        if flight.exception is not None:
+            raise flight.exception
+        return flight.result
+
+    def leave(self, flight: Flight):
+        with self.lock:
+            flight.waiters -= 1
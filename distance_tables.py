@@ -0,0 +1,82 @@
+from bitboard import iterate_squares
+from collections import deque
+from move_tables import MOVE_TABLES, PAWN_MOVE_TABLES, MoveTable
+from table_store import load_table
+from typing import List, Optional, Sequence
+
+UNREACHABLE = 255
+
+
+class DistanceTable:
+    def __init__(
+        self, move_table: MoveTable, distances: Optional[Sequence[int]] = None
+    ):
+        self.move_table = move_table
+        # distances[source * 64 + dest] is the minimum number of moves, or
+        # UNREACHABLE; a figure that cannot stand on source reaches nothing.
+        if distances is not None:
+            self.distances = distances
+            return
+        self.distances = bytearray([UNREACHABLE]) * (64 * 64)
+        for source in range(64):
+            if move_table.get_moves_bitboard(source) is not None:
+                self.search(source)
+
+    def search(self, source: int):
+        offset = source * 64
+        self.distances[offset + source] = 0
+        queue = deque([source])
+        while queue:
+            square = queue.popleft()
+            next_distance = self.distances[offset + square] + 1
+            for next_square in iterate_squares(self.get_moves(square)):
+                if self.distances[offset + next_square] == UNREACHABLE:
+                    self.distances[offset + next_square] = next_distance
+                    queue.append(next_square)
+
+    def get_moves(self, square: int) -> int:
+        return self.move_table.get_moves_bitboard(square) or 0
+
+    def is_valid_source(self, source: int) -> bool:
+        return self.distances[source * 64 + source] == 0
+
+    def get_distance(self, source: int, dest: int) -> Optional[int]:
+        distance = self.distances[source * 64 + dest]
+        return None if distance == UNREACHABLE else distance
+
+    def get_path(self, source: int, dest: int) -> Optional[List[int]]:
+        distance = self.get_distance(source, dest)
+        if distance is None:
+            return None
+        # Walk forward, always stepping to the lowest square that is one move
+        # closer to dest, which keeps the chosen path deterministic.
+        path = [source]
+        square = source
+        while distance:
+            distance -= 1
+            square = next(
+                next_square
+                for next_square in iterate_squares(self.get_moves(square))
+                if self.distances[next_square * 64 + dest] == distance
+            )
+            path.append(square)
+        return path
+
+    def get_reachable(self, source: int, max_moves: int) -> int:
+        offset = source * 64
+        reachable = 0
+        for dest in range(64):
+            if 0 < self.distances[offset + dest] <= max_moves:
+                reachable |= 1 << dest
+        return reachable
+
+
+DISTANCE_TABLES = {
+    figure: DistanceTable(move_table, load_table(f"distance_{figure}"))
+    for figure, move_table in MOVE_TABLES.items()
+}
+
+PAWN_DISTANCE_TABLES = {
+    color: DistanceTable(move_table, load_table(f"distance_pawn_{color}"))
+    for color, move_table in PAWN_MOVE_TABLES.items()
+}
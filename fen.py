@@ -0,0 +1,40 @@
+from typing import Dict, Tuple
+
+PIECES = "PNBRQKpnbrqk"
+STARTING_POSITION = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def parse_piece_placement(fen: str) -> Dict[int, str]:
+    fen_fields = fen.split()
+    if not fen_fields:
+        raise ValueError("invalid fen")
+    rows = fen_fields[0].split("/")
+    if len(rows) != 8:
+        raise ValueError("invalid fen")
+
+    pieces = {}
+    for row_index, row in enumerate(rows):
+        square = (7 - row_index) * 8
+        column = 0
+        for char in row:
+            if char in "12345678":
+                column += int(char)
+            elif char in PIECES and column < 8:
+                pieces[square + column] = char
+                column += 1
+            else:
+                raise ValueError("invalid fen")
+        if column != 8:
+            raise ValueError("invalid fen")
+    return pieces
+
+
+def get_occupancy_from_fen(fen: str) -> Tuple[int, int, int]:
+    whites = 0
+    blacks = 0
+    for square, piece in parse_piece_placement(fen).items():
+        if piece.isupper():
+            whites |= 1 << square
+        else:
+            blacks |= 1 << square
+    return whites | blacks, whites, blacks
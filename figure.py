@@ -1,9 +1,21 @@
 from abc import ABC, abstractmethod
+from bitboard import square_from_field
 
 
 class Figure(ABC):
+    # Figures are immutable, so one instance per (figure, square) can be
+    # shared by every request, see figures.get_figure.
+    __slots__ = ("current_field", "current_square")
+
     def __init__(self, current_field: str):
-        self.current_field = current_field.upper()
+        object.__setattr__(self, "current_field", current_field.upper())
+        object.__setattr__(self, "current_square", square_from_field(current_field))
+
+    def __setattr__(self, name: str, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
     @abstractmethod
     def list_available_moves(self) -> list:
@@ -1,296 +1,214 @@
+import bitboard
+from abc import abstractmethod
 from figure import Figure
-from chessboard import Chessboard
+from bitboard import fields_from_bitboard, square_from_field
+from magic_bitboards import get_bishop_attacks, get_queen_attacks, get_rook_attacks
+from move_tables import MOVE_TABLES, PAWN_MOVE_TABLES, MoveTable
 from collections import namedtuple
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple, Type
 
 
-class Bishop(Figure):
-    def __init__(self, current_field: str):
-        super().__init__(current_field)
+class TableFigure(Figure):
+    __slots__ = ()
+    move_table: MoveTable
 
-    def list_available_moves(self) -> list:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
-            raise ValueError("current field does not exist")
-        available_moves = []
-        directions = [
-            Chessboard.get_field_after_move_up_left,
-            Chessboard.get_field_after_move_up_right,
-            Chessboard.get_field_after_move_down_left,
-            Chessboard.get_field_after_move_down_right,
-        ]
-        for direction in directions:
-            for distance_to_possible_field in range(1, 8):
-                possible_field = direction(
-                    self.current_field, distance_to_possible_field
-                )
-                if Chessboard.check_if_field_in_chessboard(possible_field):
-                    available_moves.append(possible_field)
-                else:
-                    break
-        return sorted(available_moves)
-
-    def validate_move(self, dest_field: str) -> bool:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
-            raise ValueError("current field does not exist")
-        if not Chessboard.check_if_field_in_chessboard(dest_field):
-            raise ValueError("destination field does not exist")
-        if not dest_field.upper() in self.list_available_moves():
-            return False
-        else:
-            return True
-
-
-class King(Figure):
     def __init__(self, current_field: str):
         super().__init__(current_field)
 
-    def list_available_moves(self) -> list:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
-            raise ValueError("current field does not exist")
-        available_moves = []
-        directions = [
-            Chessboard.get_field_after_move_up,
-            Chessboard.get_field_after_move_down,
-            Chessboard.get_field_after_move_left,
-            Chessboard.get_field_after_move_right,
-            Chessboard.get_field_after_move_up_left,
-            Chessboard.get_field_after_move_up_right,
-            Chessboard.get_field_after_move_down_left,
-            Chessboard.get_field_after_move_down_right,
-        ]
-        for direction in directions:
-            dist_to_poss_field = 1
-            possible_field = direction(self.current_field, dist_to_poss_field)
-            if Chessboard.check_if_field_in_chessboard(possible_field):
-                available_moves.append(possible_field)
-        return sorted(available_moves)
-
-    def validate_move(self, dest_field: str) -> bool:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
+    def get_moves_bitboard(self) -> int:
+        if self.current_square is None:
             raise ValueError("current field does not exist")
-        if not Chessboard.check_if_field_in_chessboard(dest_field):
-            raise ValueError("destination field does not exist")
-        if not dest_field.upper() in self.list_available_moves():
-            return False
-        else:
-            return True
-
-
-class Knight(Figure):
-    def __init__(self, current_field: str):
-        super().__init__(current_field)
+        return self.move_table.get_moves_bitboard(self.current_square)
 
     def list_available_moves(self) -> list:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
+        if self.current_square is None:
             raise ValueError("current field does not exist")
-        available_moves = []
-        directions_combinations = [
-            [
-                Chessboard.get_field_after_move_up,
-                Chessboard.get_field_after_move_right,
-            ],
-            [
-                Chessboard.get_field_after_move_up,
-                Chessboard.get_field_after_move_left,
-            ],
-            [
-                Chessboard.get_field_after_move_down,
-                Chessboard.get_field_after_move_right,
-            ],
-            [
-                Chessboard.get_field_after_move_down,
-                Chessboard.get_field_after_move_left,
-            ],
-            [
-                Chessboard.get_field_after_move_left,
-                Chessboard.get_field_after_move_up,
-            ],
-            [
-                Chessboard.get_field_after_move_left,
-                Chessboard.get_field_after_move_down,
-            ],
-            [
-                Chessboard.get_field_after_move_right,
-                Chessboard.get_field_after_move_up,
-            ],
-            [
-                Chessboard.get_field_after_move_right,
-                Chessboard.get_field_after_move_down,
-            ],
-        ]
-        for direction in directions_combinations:
-            dist_to_inter_field = 2
-            dist_to_poss_field = 1
-            possible_field = direction[1](
-                direction[0](self.current_field, dist_to_inter_field),
-                dist_to_poss_field,
-            )
-            if Chessboard.check_if_field_in_chessboard(possible_field):
-                available_moves.append(possible_field)
-        return sorted(available_moves)
+        return list(self.move_table.get_available_moves(self.current_field))
 
     def validate_move(self, dest_field: str) -> bool:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
-            raise ValueError("current field does not exist")
-        if not Chessboard.check_if_field_in_chessboard(dest_field):
+        available_moves = self.get_moves_bitboard()
+        dest_square = square_from_field(dest_field)
+        if dest_square is None:
             raise ValueError("destination field does not exist")
-        if not dest_field.upper() in self.list_available_moves():
-            return False
-        else:
-            return True
+        return bool(available_moves >> dest_square & 1)
 
+    def get_moves_bitboard_on_board(self, occupied: int, own_pieces: int = 0) -> int:
+        return self.get_moves_bitboard() & ~own_pieces
 
-class Pawn(Figure):
-    MoveValidationFigureColor = Tuple[Optional[bool], Optional[bool]]
-
-    def __init__(self, current_field: str):
-        super().__init__(current_field)
-
-    def list_available_moves(self) -> list:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
-            raise ValueError("current field does not exist")
-        available_moves = [{"blacks": [], "whites": []}]
-        direction_for_whites = Chessboard.get_field_after_move_up
-        direction_for_blacks = Chessboard.get_field_after_move_down
-        current_column, current_row = Chessboard.get_col_and_row_from_field(
-            self.current_field
+    def list_available_moves_on_board(self, occupied: int, own_pieces: int = 0) -> list:
+        return fields_from_bitboard(
+            self.get_moves_bitboard_on_board(occupied, own_pieces)
         )
 
-        def add_to_available_moves(color, field):
-            if Chessboard.check_if_field_in_chessboard(field):
-                available_moves[0][color].append(field)
-
-        if current_row == 2:
-            for dist_to_poss_field_for_whites in [1, 2]:
-                add_to_available_moves(
-                    "whites",
-                    direction_for_whites(
-                        self.current_field, dist_to_poss_field_for_whites
-                    ),
-                )
-            add_to_available_moves(
-                "blacks", direction_for_blacks(self.current_field, 1)
-            )
 
-        elif current_row == 7:
-            add_to_available_moves(
-                "whites", direction_for_whites(self.current_field, 1)
-            )
+class SlidingFigure(TableFigure):
+    __slots__ = ()
 
-            for dist_to_poss_field_for_blacks in [1, 2]:
-                add_to_available_moves(
-                    "blacks",
-                    direction_for_blacks(
-                        self.current_field, dist_to_poss_field_for_blacks
-                    ),
-                )
+    @staticmethod
+    @abstractmethod
+    def get_attacks(square: int, occupied: int) -> int:
+        pass
 
-        elif 3 <= current_row <= 6:
-            add_to_available_moves(
-                "whites", direction_for_whites(self.current_field, 1)
-            )
-            add_to_available_moves(
-                "blacks", direction_for_blacks(self.current_field, 1)
-            )
+    def get_moves_bitboard_on_board(self, occupied: int, own_pieces: int = 0) -> int:
+        if self.current_square is None:
+            raise ValueError("current field does not exist")
+        return self.get_attacks(self.current_square, occupied) & ~own_pieces
 
-        elif current_row == 1:
-            return [{"whites": None, "blacks": []}]
-        elif current_row == 8:
-            return [{"whites": [], "blacks": None}]
-        return available_moves
 
-    def validate_move(self, dest_field: str) -> MoveValidationFigureColor:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
-            raise ValueError("current field does not exist")
-        if not Chessboard.check_if_field_in_chessboard(dest_field):
-            raise ValueError("destination field does not exist")
+class Bishop(SlidingFigure):
+    __slots__ = ()
+    move_table = MOVE_TABLES["bishop"]
+    get_attacks = staticmethod(get_bishop_attacks)
 
-        available_moves = self.list_available_moves()[0]
-        is_valid_for_color = namedtuple("valid_for_color", ["white", "black"])
 
-        if available_moves["blacks"] is None:
-            return is_valid_for_color(False, None)
+class King(TableFigure):
+    __slots__ = ()
+    move_table = MOVE_TABLES["king"]
 
-        elif available_moves["whites"] is None:
-            return is_valid_for_color(None, False)
 
-        dest_field_in_whites = dest_field.upper() in available_moves["whites"]
-        dest_field_in_blacks = dest_field.upper() in available_moves["blacks"]
+class Knight(TableFigure):
+    __slots__ = ()
+    move_table = MOVE_TABLES["knight"]
 
-        return is_valid_for_color(dest_field_in_whites, dest_field_in_blacks)
 
+class Pawn(Figure):
+    __slots__ = ()
+    MoveValidationFigureColor = Tuple[Optional[bool], Optional[bool]]
+    is_valid_for_color = namedtuple("valid_for_color", ["white", "black"])
+    whites_move_table = PAWN_MOVE_TABLES["whites"]
+    blacks_move_table = PAWN_MOVE_TABLES["blacks"]
 
-class Queen(Figure):
     def __init__(self, current_field: str):
         super().__init__(current_field)
 
+    def get_moves_bitboards(self) -> Tuple[Optional[int], Optional[int]]:
+        if self.current_square is None:
+            raise ValueError("current field does not exist")
+        return (
+            self.whites_move_table.get_moves_bitboard(self.current_square),
+            self.blacks_move_table.get_moves_bitboard(self.current_square),
+        )
+
     def list_available_moves(self) -> list:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
+        if self.current_square is None:
             raise ValueError("current field does not exist")
-        available_moves = []
-        directions = [
-            Chessboard.get_field_after_move_up,
-            Chessboard.get_field_after_move_down,
-            Chessboard.get_field_after_move_left,
-            Chessboard.get_field_after_move_right,
-            Chessboard.get_field_after_move_up_left,
-            Chessboard.get_field_after_move_up_right,
-            Chessboard.get_field_after_move_down_left,
-            Chessboard.get_field_after_move_down_right,
+        whites_moves = self.whites_move_table.get_available_moves(self.current_field)
+        blacks_moves = self.blacks_move_table.get_available_moves(self.current_field)
+        return [
+            {
+                "whites": list(whites_moves) if whites_moves is not None else None,
+                "blacks": list(blacks_moves) if blacks_moves is not None else None,
+            }
         ]
-        for direction in directions:
-            for distance_to_possible_field in range(1, 8):
-                possible_field = direction(
-                    self.current_field, distance_to_possible_field
-                )
-                if Chessboard.check_if_field_in_chessboard(possible_field):
-                    available_moves.append(possible_field)
-                else:
-                    break
-        return sorted(available_moves)
 
-    def validate_move(self, dest_field: str) -> bool:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
-            raise ValueError("current field does not exist")
-        if not Chessboard.check_if_field_in_chessboard(dest_field):
+    def validate_move(self, dest_field: str) -> MoveValidationFigureColor:
+        whites_moves, blacks_moves = self.get_moves_bitboards()
+        dest_square = square_from_field(dest_field)
+        if dest_square is None:
             raise ValueError("destination field does not exist")
-        if not dest_field.upper() in self.list_available_moves():
-            return False
-        else:
-            return True
 
+        return self.is_valid_for_color(
+            bool(whites_moves >> dest_square & 1) if whites_moves is not None else None,
+            bool(blacks_moves >> dest_square & 1) if blacks_moves is not None else None,
+        )
 
-class Rook(Figure):
-    def __init__(self, current_field: str):
-        super().__init__(current_field)
+    def get_moves_bitboards_on_board(
+        self, occupied: int, white_pieces: int = 0, black_pieces: int = 0
+    ) -> Tuple[Optional[int], Optional[int]]:
+        whites_moves, blacks_moves = self.get_moves_bitboards()
+        pawn = bitboard.square_bitboard(self.current_square)
+        empty = ~occupied
+        if whites_moves is not None:
+            single_push = bitboard.shift(pawn, bitboard.UP) & empty
+            whites_moves = (
+                single_push
+                | bitboard.shift(single_push, bitboard.UP) & whites_moves & empty
+                | (
+                    bitboard.shift(pawn, bitboard.UP_LEFT)
+                    | bitboard.shift(pawn, bitboard.UP_RIGHT)
+                )
+                & occupied
+                & ~white_pieces
+            )
+        if blacks_moves is not None:
+            single_push = bitboard.shift(pawn, bitboard.DOWN) & empty
+            blacks_moves = (
+                single_push
+                | bitboard.shift(single_push, bitboard.DOWN) & blacks_moves & empty
+                | (
+                    bitboard.shift(pawn, bitboard.DOWN_LEFT)
+                    | bitboard.shift(pawn, bitboard.DOWN_RIGHT)
+                )
+                & occupied
+                & ~black_pieces
+            )
+        return whites_moves, blacks_moves
 
-    def list_available_moves(self) -> list:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
-            raise ValueError("current field does not exist")
-        available_moves = []
-        directions = [
-            Chessboard.get_field_after_move_up,
-            Chessboard.get_field_after_move_down,
-            Chessboard.get_field_after_move_left,
-            Chessboard.get_field_after_move_right,
+    def list_available_moves_on_board(
+        self, occupied: int, white_pieces: int = 0, black_pieces: int = 0
+    ) -> list:
+        whites_moves, blacks_moves = self.get_moves_bitboards_on_board(
+            occupied, white_pieces, black_pieces
+        )
+        return [
+            {
+                "whites": fields_from_bitboard(whites_moves)
+                if whites_moves is not None
+                else None,
+                "blacks": fields_from_bitboard(blacks_moves)
+                if blacks_moves is not None
+                else None,
+            }
         ]
-        for direction in directions:
-            for distance_to_possible_field in range(1, 8):
-                possible_field = direction(
-                    self.current_field, distance_to_possible_field
-                )
-                if Chessboard.check_if_field_in_chessboard(possible_field):
-                    available_moves.append(possible_field)
-                else:
-                    break
-        return sorted(available_moves)
 
-    def validate_move(self, dest_field: str) -> bool:
-        if not Chessboard.check_if_field_in_chessboard(self.current_field):
-            raise ValueError("current field does not exist")
-        if not Chessboard.check_if_field_in_chessboard(dest_field):
-            raise ValueError("destination field does not exist")
-        if not dest_field.upper() in self.list_available_moves():
-            return False
-        else:
-            return True
+
+class Queen(SlidingFigure):
+    __slots__ = ()
+    move_table = MOVE_TABLES["queen"]
+    get_attacks = staticmethod(get_queen_attacks)
+
+
+class Rook(SlidingFigure):
+    __slots__ = ()
+    move_table = MOVE_TABLES["rook"]
+    get_attacks = staticmethod(get_rook_attacks)
+
+
+FIGURE_CLASSES: Dict[str, Type[Figure]] = {
+    "bishop": Bishop,
+    "king": King,
+    "knight": Knight,
+    "pawn": Pawn,
+    "queen": Queen,
+    "rook": Rook,
+}
+
+# The usual spellings resolve with a single lookup; anything else is
+# lowercased first.
+FIGURE_CLASS_LOOKUP: Dict[str, Type[Figure]] = {
+    spelling: figure_class
+    for name, figure_class in FIGURE_CLASSES.items()
+    for spelling in (name, name.capitalize(), name.upper())
+}
+
+FIGURE_REGISTRY: Dict[Tuple[Type[Figure], int], Figure] = {
+    (figure_class, square): figure_class(field)
+    for figure_class in FIGURE_CLASSES.values()
+    for square, field in enumerate(bitboard.FIELDS)
+}
+
+
+def get_figure_class(chess_figure: str) -> Optional[Type[Figure]]:
+    figure_class = FIGURE_CLASS_LOOKUP.get(chess_figure)
+    if figure_class is None:
+        figure_class = FIGURE_CLASSES.get(chess_figure.lower())
+    return figure_class
+
+
+def get_figure(figure_class: Type[Figure], current_field: str) -> Figure:
+    square = square_from_field(current_field)
+    if square is None:
+        # Fields off the board are not interned, which keeps the registry
+        # bounded; the instance only exists to report the error.
+        return figure_class(current_field)
+    return FIGURE_REGISTRY[figure_class, square]
@@ -0,0 +1,294 @@
+import math
+import queue
+import socket
+import threading
+import time
+from metrics import MetricsRegistry
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+# Callers wake up this often while waiting, to notice deadlines and clients
+# that went away.
+WAIT_INTERVAL = 0.05
+# Items a streaming job may produce ahead of its consumer before it blocks.
+STREAM_BUFFER_SIZE = 64
+
+
+class JobRejected(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("job queue is full")
+        self.retry_after = retry_after
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(
+        self,
+        name: str,
+        function: Callable[[threading.Event], Any],
+        deadline: float,
+        stream: bool = False,
+    ):
+        self.name = name
+        self.function = function
+        self.deadline = deadline
+        self.stream = stream
+        # Set when the job should stop; long running functions poll it.
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.submitted = time.monotonic()
+        self.result = None
+        self.exception: Optional[BaseException] = None
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def finish(self, result=None, exception: Optional[BaseException] = None):
+        self.result = result
+        self.exception = exception
+        self.done.set()
+
+    def get_result(self):
+        if self.exception is not None:
+            raise self.exception
+        return self.result
+
+
+def is_client_disconnected(environ: dict) -> bool:
+    # Only the development server exposes the connection; elsewhere a client
+    # that went away is noticed at the job deadline.
+    connection = environ.get("werkzeug.socket")
+    if connection is None:
+        return False
+    try:
+        return connection.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except BlockingIOError:
+        return False
+    except OSError:
+        return True
+
+
+class JobPool:
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        registry: Optional[MetricsRegistry] = None,
+        max_streams: Optional[int] = None,
+    ):
+        if workers < 1 or max_queue < 0:
+            raise ValueError("invalid job pool size")
+        self.worker_count = workers
+        self.max_queue = max_queue
+        # Streaming jobs run as fast as their clients read, so only this many
+        # may hold workers at once; the others stay free for plain jobs.
+        self.max_streams = max_streams
+        self.queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self.threads: List[threading.Thread] = []
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.streams = 0
+        self.mean_run_time = 0.0
+        registry = registry or MetricsRegistry()
+        self.queue_wait_duration = registry.histogram(
+            "chess_job_queue_wait_seconds",
+            "Time jobs spent queued before a worker picked them up.",
+            ("job",),
+        )
+        self.run_duration = registry.histogram(
+            "chess_job_run_seconds", "Time jobs spent running.", ("job",)
+        )
+        self.outcomes = registry.counter(
+            "chess_jobs_total",
+            "Jobs by outcome (completed, failed, rejected, cancelled, expired).",
+            ("job", "outcome"),
+        )
+        self.queue_depth = registry.gauge(
+            "chess_job_queue_depth", "Jobs waiting for a worker."
+        )
+        self.running_jobs = registry.gauge(
+            "chess_job_running", "Jobs currently running."
+        )
+
+    def start(self):
+        # Threads are started with the first job rather than on creation, so
+        # that a pre-forking master that never runs jobs owns none.
+        with self.lock:
+            if self.threads:
+                return
+            for index in range(self.worker_count):
+                thread = threading.Thread(
+                    target=self.work, name=f"job-worker-{index}", daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def get_retry_after(self) -> int:
+        queued_rounds = (self.pending + 1) / self.worker_count
+        return max(1, math.ceil(queued_rounds * self.mean_run_time))
+
+    def reject_if_full(self, name: str, stream: bool = False):
+        # Called with the lock held.
+        if self.pending >= self.worker_count + self.max_queue or (
+            stream and self.max_streams is not None and self.streams >= self.max_streams
+        ):
+            self.outcomes.inc((name, "rejected"))
+            raise JobRejected(self.get_retry_after())
+
+    def check_capacity(self, name: str):
+        # Raises JobRejected if a job submitted now would be rejected, for
+        # callers that tie up resources before they get to submit.
+        with self.lock:
+            self.reject_if_full(name)
+
+    def submit(
+        self,
+        name: str,
+        function: Callable[[threading.Event], Any],
+        deadline: float,
+        stream: bool = False,
+    ) -> Job:
+        self.start()
+        with self.lock:
+            self.reject_if_full(name, stream)
+            self.pending += 1
+            if stream:
+                self.streams += 1
+            self.queue_depth.set(value=self.pending - self.running)
+        job = Job(name, function, deadline, stream)
+        self.queue.put(job)
+        return job
+
+    def work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            started = time.monotonic()
+            self.queue_wait_duration.observe(started - job.submitted, (job.name,))
+            with self.lock:
+                self.running += 1
+                self.queue_depth.set(value=self.pending - self.running)
+                self.running_jobs.set(value=self.running)
+            try:
+                if job.cancelled.is_set():
+                    outcome = "cancelled"
+                    job.finish(exception=JobCancelled("job cancelled"))
+                elif started >= job.deadline:
+                    outcome = "expired"
+                    job.finish(exception=JobCancelled("job deadline exceeded"))
+                else:
+                    self.run_job(job, started)
+                    outcome = "completed" if job.exception is None else "failed"
+                    if isinstance(job.exception, JobCancelled):
+                        outcome = "cancelled"
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self.pending -= 1
+                    if job.stream:
+                        self.streams -= 1
+                    self.queue_depth.set(value=self.pending - self.running)
+                    self.running_jobs.set(value=self.running)
+            self.outcomes.inc((job.name, outcome))
+
+    def run_job(self, job: Job, started: float):
+        try:
+            result = job.function(job.cancelled)
+        except Exception as e:
+            job.finish(exception=e)
+        else:
+            job.finish(result)
+        run_time = time.monotonic() - started
+        self.run_duration.observe(run_time, (job.name,))
+        with self.lock:
+            if self.mean_run_time:
+                self.mean_run_time += (run_time - self.mean_run_time) * 0.1
+            else:
+                self.mean_run_time = run_time
+
+    def run(
+        self,
+        name: str,
+        function: Callable[[threading.Event], Any],
+        timeout: float,
+        is_disconnected: Optional[Callable[[], bool]] = None,
+    ):
+        # Waits for the result, cancelling the job when its deadline passes
+        # or the client disconnects. Raises JobRejected or JobCancelled.
+        deadline = time.monotonic() + timeout
+        job = self.submit(name, function, deadline)
+        while not job.done.wait(WAIT_INTERVAL):
+            if time.monotonic() >= deadline:
+                job.cancel()
+                raise JobCancelled("job deadline exceeded")
+            if is_disconnected is not None and is_disconnected():
+                job.cancel()
+                raise JobCancelled("client disconnected")
+        return job.get_result()
+
+    def iterate(
+        self,
+        name: str,
+        produce: Callable[[threading.Event, Callable[[Any], None]], Any],
+        timeout: float,
+        idle_timeout: Optional[float] = None,
+    ) -> Iterator[Tuple[str, Any]]:
+        # Runs produce(cancelled, emit) on the pool and yields ("item", item)
+        # for everything it emits, then ("result", its return value). The
+        # buffer between them is bounded, so a slow consumer pauses the job
+        # instead of letting items pile up, and a consumer that takes nothing
+        # for idle_timeout seconds cancels it. Raises JobRejected right away;
+        # closing the iterator early cancels the job.
+        deadline = time.monotonic() + timeout
+        items: "queue.Queue[Any]" = queue.Queue(STREAM_BUFFER_SIZE)
+
+        def run(cancelled: threading.Event):
+            def emit(item):
+                stalled = math.inf
+                if idle_timeout is not None:
+                    stalled = time.monotonic() + idle_timeout
+                while True:
+                    if cancelled.is_set():
+                        raise JobCancelled("job cancelled")
+                    try:
+                        items.put(item, timeout=WAIT_INTERVAL)
+                        return
+                    except queue.Full:
+                        if time.monotonic() >= stalled:
+                            raise JobCancelled("stream consumer stalled")
+
+            return produce(cancelled, emit)
+
+        job = self.submit(name, run, deadline, stream=True)
+        return self.drain(job, items, deadline)
+
+    def drain(
+        self, job: Job, items: "queue.Queue[Any]", deadline: float
+    ) -> Iterator[Tuple[str, Any]]:
+        try:
+            while True:
+                try:
+                    yield "item", items.get(timeout=WAIT_INTERVAL)
+                    continue
+                except queue.Empty:
+                    pass
+                # Everything a finished job emitted is already queued.
+                if job.done.is_set() and items.empty():
+                    yield "result", job.get_result()
+                    return
+                if time.monotonic() >= deadline:
+                    raise JobCancelled("job deadline exceeded")
+        finally:
+            job.cancel()
+
+    def shutdown(self):
+        with self.lock:
+            threads, self.threads = self.threads, []
+        for _ in threads:
+            self.queue.put(None)
+        for thread in threads:
+            thread.join()
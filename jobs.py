@@ -0,0 +1,385 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from fen import STARTING_POSITION
+from move_responses import build_batch_query_response
+from perft import perft, perft_hashed
+from position import Position, move_to_uci
+from transposition import TranspositionTable
+from typing import Callable, Optional, Tuple
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JOB_TYPES = ("perft", "batch")
+# Progress is written at most this often, so that fast jobs are not slowed
+# down by their own bookkeeping.
+PROGRESS_INTERVAL = 0.5
+BATCH_PROGRESS_STEP = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    params TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_dedup_key ON jobs (dedup_key);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at);
+"""
+
+
+def parse_job_request(
+    data, perft_max_depth: int, batch_max_size: int
+) -> Tuple[str, dict]:
+    # Returns the job type and normalized parameters, so that identical
+    # submissions get the same deduplication key.
+    if not isinstance(data, dict) or data.get("type") not in JOB_TYPES:
+        raise ValueError("invalid job type")
+    if data["type"] == "perft":
+        fen = data.get("fen", STARTING_POSITION)
+        depth = data.get("depth")
+        hash_size_mb = data.get("hash")
+        if not isinstance(fen, str):
+            raise ValueError("invalid fen")
+        if not isinstance(depth, int) or isinstance(depth, bool) or depth < 0:
+            raise ValueError("invalid depth")
+        if depth > perft_max_depth:
+            raise ValueError(f"depth exceeds limit of {perft_max_depth}")
+        if hash_size_mb is not None and (
+            not isinstance(hash_size_mb, (int, float)) or not hash_size_mb > 0
+        ):
+            raise ValueError("invalid hash size")
+        return "perft", {
+            "fen": Position(fen).get_fen(),
+            "depth": depth,
+            "hash": hash_size_mb,
+        }
+    queries = data.get("queries")
+    if not isinstance(queries, list):
+        raise ValueError("invalid batch")
+    if len(queries) > batch_max_size:
+        raise ValueError(f"batch size exceeds limit of {batch_max_size}")
+    return "batch", {"queries": queries}
+
+
+def get_dedup_key(job_type: str, params: dict) -> str:
+    canonical = json.dumps([job_type, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def connect(path: str) -> sqlite3.Connection:
+    # A connection per operation keeps the store safe to use from request
+    # threads and worker processes alike; SQLite serializes the writers.
+    connection = sqlite3.connect(path, timeout=30)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+class JobStore:
+    def __init__(self, path: str):
+        self.path = path
+        # The database holds every client's jobs, so only its owner may
+        # reach the directory it is created in.
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        with closing(connect(path)) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def create(
+        self, job_type: str, params: dict, ttl: float
+    ) -> Tuple[sqlite3.Row, bool]:
+        # Returns the job and whether it was newly created; an identical job
+        # that is queued, running or done (and not expired) is reused. Only
+        # finished jobs expire, ttl seconds after they finish.
+        dedup_key = get_dedup_key(job_type, params)
+        now = time.time()
+        with closing(connect(self.path)) as connection, connection:
+            connection.execute("BEGIN IMMEDIATE")
+            job = connection.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ? AND status != ?"
+                " AND (expires_at > ? OR status IN (?, ?))"
+                " ORDER BY created_at DESC LIMIT 1",
+                (dedup_key, FAILED, now, QUEUED, RUNNING),
+            ).fetchone()
+            if job is not None:
+                return job, False
+            job_id = uuid.uuid4().hex
+            connection.execute(
+                "INSERT INTO jobs (id, type, params, dedup_key, status, created_at,"
+                " updated_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    job_type,
+                    json.dumps(params),
+                    dedup_key,
+                    QUEUED,
+                    now,
+                    now,
+                    now + ttl,
+                ),
+            )
+            job = connection.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return job, True
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        with closing(connect(self.path)) as connection:
+            return connection.execute(
+                "SELECT * FROM jobs WHERE id = ?"
+                " AND (expires_at > ? OR status IN (?, ?))",
+                (job_id, time.time(), QUEUED, RUNNING),
+            ).fetchone()
+
+    def claim(self, job_id: str) -> Optional[sqlite3.Row]:
+        # Only one process gets to run a job, however often it was submitted.
+        now = time.time()
+        with closing(connect(self.path)) as connection, connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, updated_at = ?"
+                " WHERE id = ? AND status = ?",
+                (RUNNING, now, now, job_id, QUEUED),
+            )
+            if cursor.rowcount != 1:
+                return None
+            return connection.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+
+    def touch(self, job_id: str, progress: Optional[float] = None):
+        with closing(connect(self.path)) as connection, connection:
+            if progress is None:
+                connection.execute(
+                    "UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id)
+                )
+            else:
+                connection.execute(
+                    "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                    (progress, time.time(), job_id),
+                )
+
+    def finish(
+        self, job_id: str, result: Optional[dict] = None, error: Optional[str] = None
+    ):
+        # The ttl the job was created with is expires_at - created_at; it
+        # starts over when the job finishes.
+        now = time.time()
+        with closing(connect(self.path)) as connection, connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, progress = ?, result = ?, error = ?,"
+                " finished_at = ?, updated_at = ?,"
+                " expires_at = ? + expires_at - created_at WHERE id = ?",
+                (
+                    FAILED if error is not None else DONE,
+                    0 if error is not None else 1,
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    now,
+                    now,
+                    now,
+                    job_id,
+                ),
+            )
+
+    def requeue_stale(self, stale_timeout: float) -> int:
+        # Jobs whose worker stopped sending heartbeats (a crash or restart)
+        # go back to the queue.
+        with closing(connect(self.path)) as connection, connection:
+            return connection.execute(
+                "UPDATE jobs SET status = ?, progress = 0, started_at = NULL"
+                " WHERE status = ? AND updated_at < ?",
+                (QUEUED, RUNNING, time.time() - stale_timeout),
+            ).rowcount
+
+    def get_queued_ids(self):
+        with closing(connect(self.path)) as connection:
+            return [
+                row["id"]
+                for row in connection.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at",
+                    (QUEUED,),
+                )
+            ]
+
+    def delete_expired(self) -> int:
+        with closing(connect(self.path)) as connection, connection:
+            return connection.execute(
+                "DELETE FROM jobs WHERE expires_at <= ? AND status IN (?, ?)",
+                (time.time(), DONE, FAILED),
+            ).rowcount
+
+
+def run_perft_job(params: dict, report_progress: Callable[[float], None]) -> dict:
+    position = Position(params["fen"])
+    depth = params["depth"]
+    table = TranspositionTable(params["hash"]) if params["hash"] else None
+    start = time.perf_counter()
+    divide = {}
+    moves = position.generate_legal_moves() if depth else []
+    for index, move in enumerate(moves):
+        position.make_move(move)
+        if table is None:
+            divide[move_to_uci(move)] = perft(position, depth - 1)
+        else:
+            divide[move_to_uci(move)] = perft_hashed(position, depth - 1, table)
+        position.unmake_move()
+        report_progress((index + 1) / len(moves))
+    elapsed = time.perf_counter() - start
+    nodes = sum(divide.values()) if depth else 1
+    return {
+        "nodes": nodes,
+        "divide": divide,
+        "depth": depth,
+        "elapsedSeconds": elapsed,
+        "nodesPerSecond": int(nodes / elapsed) if elapsed else None,
+        "fen": params["fen"],
+    }
+
+
+def run_batch_job(params: dict, report_progress: Callable[[float], None]) -> dict:
+    queries = params["queries"]
+    results = []
+    figure_classes = {}
+    for index, query in enumerate(queries):
+        results.append(build_batch_query_response(query, figure_classes))
+        if not (index + 1) % BATCH_PROGRESS_STEP:
+            report_progress((index + 1) / len(queries))
+    return {"results": results}
+
+
+JOB_RUNNERS = {"perft": run_perft_job, "batch": run_batch_job}
+
+
+def execute_job(path: str, job_id: str, heartbeat_interval: float):
+    store = JobStore(path)
+    job = store.claim(job_id)
+    if job is None:
+        return
+    stopped = threading.Event()
+
+    def send_heartbeats():
+        while not stopped.wait(heartbeat_interval):
+            store.touch(job_id)
+
+    heartbeat = threading.Thread(target=send_heartbeats, daemon=True)
+    heartbeat.start()
+    last_report = 0.0
+
+    def report_progress(progress: float):
+        nonlocal last_report
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            store.touch(job_id, progress)
+
+    try:
+        result = JOB_RUNNERS[job["type"]](json.loads(job["params"]), report_progress)
+    except Exception as e:
+        store.finish(job_id, error=str(e) or type(e).__name__)
+    else:
+        store.finish(job_id, result)
+    finally:
+        stopped.set()
+        heartbeat.join()
+
+
+class JobManager:
+    def __init__(
+        self,
+        path: str,
+        workers: int,
+        ttl: float,
+        stale_timeout: float,
+        heartbeat_interval: float,
+        maintenance_interval: float = 10.0,
+    ):
+        self.path = path
+        self.workers = workers
+        self.ttl = ttl
+        self.stale_timeout = stale_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.maintenance_interval = maintenance_interval
+        self.store: Optional[JobStore] = None
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.last_maintenance = 0.0
+        self.redispatch = False
+        self.lock = threading.Lock()
+
+    def get_store(self) -> JobStore:
+        # The database and the worker processes are set up on first use, so
+        # that importing the app neither touches the disk nor forks.
+        with self.lock:
+            if self.store is None:
+                self.store = JobStore(self.path)
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+                # Jobs queued before a restart are picked up again.
+                self.redispatch = True
+                self.last_maintenance = 0.0
+        self.run_maintenance()
+        return self.store
+
+    def dispatch(self, job_id: str):
+        try:
+            self.executor.submit(
+                execute_job, self.path, job_id, self.heartbeat_interval
+            )
+        except BrokenProcessPool:
+            # A worker died and took the executor's queue with it: the job it
+            # ran is requeued by the heartbeat check, the others are sent
+            # again at the next maintenance.
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            self.redispatch = True
+            self.executor.submit(
+                execute_job, self.path, job_id, self.heartbeat_interval
+            )
+
+    def run_maintenance(self):
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_maintenance < self.maintenance_interval:
+                return
+            self.last_maintenance = now
+        self.store.delete_expired()
+        if self.store.requeue_stale(self.stale_timeout) or self.redispatch:
+            # Jobs still waiting in the executor may be sent twice; the
+            # second copy finds them claimed and returns at once.
+            self.redispatch = False
+            for job_id in self.store.get_queued_ids():
+                self.dispatch(job_id)
+
+    def submit(self, job_type: str, params: dict) -> Tuple[sqlite3.Row, bool]:
+        store = self.get_store()
+        job, created = store.create(job_type, params, self.ttl)
+        if created:
+            self.dispatch(job["id"])
+        return job, created
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self.get_store().get(job_id)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+            self.store = None
@@ -0,0 +1,263 @@
+import bitboard
+import random
+from bitboard import BISHOP_DIRECTIONS, FULL, ROOK_DIRECTIONS
+from table_store import load_table
+from typing import Iterator, List, Optional, Sequence
+
+# Found once with find_magic(random.Random(1)) and kept fixed, so that
+# building the attack tables at import never has to search.
+ROOK_MAGICS = [
+    0x128012C0008000E0,
+    0x0240002000401001,
+    0x4100200041001008,
+    0x8280100008018004,
+    0x2080080002040080,
+    0x1300010004008208,
+    0x04000208A9101408,
+    0x020000204A018F04,
+    0x1080800040008020,
+    0x0000C01000402001,
+    0x0080808010002000,
+    0x0408800800801000,
+    0x0010800801040080,
+    0x4804800400804200,
+    0x0304800D00800200,
+    0x010200040081006A,
+    0x8280044020084000,
+    0x042000C010004021,
+    0x2010002004080020,
+    0x0040210010000900,
+    0x0008004004020041,
+    0x0004008080040200,
+    0x1C20040070610208,
+    0x1020A20000508104,
+    0x0100C00380008120,
+    0x4001200280400080,
+    0x0200100080200080,
+    0x0000401200082200,
+    0xC02C080080040080,
+    0x0840040080020080,
+    0x2102004040800100,
+    0x0042079A00004104,
+    0x0000400424800280,
+    0x4820100020400040,
+    0x5010002000801880,
+    0x9061080081801002,
+    0x208A050011000800,
+    0x000200080E003094,
+    0xA010018204003008,
+    0x2000288042001401,
+    0x400181C000228000,
+    0x0200402010004000,
+    0x8388928600420021,
+    0x400021001001000A,
+    0x2100080011010004,
+    0x1002020004008080,
+    0x0802000804020001,
+    0x88004410408A0001,
+    0x010508C030800100,
+    0x4000400080310100,
+    0x0030200010048080,
+    0x2000800800100080,
+    0x0100040008008080,
+    0x0022000204008080,
+    0x0108020170284400,
+    0x1001010084004200,
+    0x0004890141902202,
+    0x0100881100220042,
+    0x0100102001000841,
+    0x4408050020081001,
+    0x0002008884201002,
+    0x2002000490410802,
+    0x0020014800900204,
+    0x0100082081044402,
+]
+
+BISHOP_MAGICS = [
+    0x0010104088840042,
+    0x0110104081004062,
+    0x0091142082000100,
+    0x0108208821008100,
+    0x0101104000080000,
+    0x010104200404001C,
+    0x0C01040202C00010,
+    0x0001004800841080,
+    0xCA8B46100E280102,
+    0x001010D00085024C,
+    0x4180089881020120,
+    0x8010082050411000,
+    0x0800020210100000,
+    0x0002120905201200,
+    0xC000040404040510,
+    0x0110410101100200,
+    0x0042201408020C27,
+    0xA882000404440C20,
+    0x0002000102040100,
+    0x800200202202C200,
+    0x4002005012101401,
+    0x2441014880600200,
+    0x0214020104018400,
+    0x000180004414410A,
+    0x0105410C10020800,
+    0x0004200084013400,
+    0x200582045004001B,
+    0x1000404004010200,
+    0x0001001081004021,
+    0x2400430202008628,
+    0x000604C144230800,
+    0x04004840008A1804,
+    0x4010045000220210,
+    0x2012100400500120,
+    0x10001C0205900081,
+    0x0020880800360A00,
+    0x8500460020060080,
+    0x0420008209010110,
+    0x0010020250008C00,
+    0x8010A40100004104,
+    0x00008208400022C8,
+    0x0008410450402100,
+    0x0008920110004104,
+    0x43A8011044002024,
+    0x0029102021900602,
+    0x2270101000212040,
+    0x0020C41112004040,
+    0x3004840550C42200,
+    0x5002022202404480,
+    0x0402822309200840,
+    0x0032010423240048,
+    0x2000CA0384110008,
+    0x4001140410440000,
+    0x2092E50810011010,
+    0x0140040852005041,
+    0x00200200C1010104,
+    0x40120202020104E0,
+    0xA000010042300500,
+    0x400048004A009001,
+    0x4200800400411081,
+    0x0010040604105400,
+    0x0107004210024080,
+    0x0004423004210040,
+    0xC220023088010040,
+]
+
+
+def generate_relevant_occupancy_mask(square: int, directions: List[str]) -> int:
+    mask = bitboard.EMPTY
+    for direction in directions:
+        possible_field = bitboard.shift(bitboard.square_bitboard(square), direction)
+        # The last square of a ray never blocks anything behind it.
+        while bitboard.shift(possible_field, direction):
+            mask |= possible_field
+            possible_field = bitboard.shift(possible_field, direction)
+    return mask
+
+
+def generate_ray_attacks(square: int, occupied: int, directions: List[str]) -> int:
+    attacks = bitboard.EMPTY
+    for direction in directions:
+        possible_field = bitboard.shift(bitboard.square_bitboard(square), direction)
+        while possible_field:
+            attacks |= possible_field
+            if possible_field & occupied:
+                break
+            possible_field = bitboard.shift(possible_field, direction)
+    return attacks
+
+
+def iterate_occupancy_subsets(mask: int) -> Iterator[int]:
+    subset = bitboard.EMPTY
+    while True:
+        yield subset
+        subset = (subset - mask) & mask
+        if subset == bitboard.EMPTY:
+            break
+
+
+def find_magic(square: int, directions: List[str], rng: random.Random) -> int:
+    mask = generate_relevant_occupancy_mask(square, directions)
+    shift = 64 - bitboard.count_squares(mask)
+    subsets = list(iterate_occupancy_subsets(mask))
+    attacks = [generate_ray_attacks(square, subset, directions) for subset in subsets]
+    while True:
+        magic = rng.getrandbits(64) & rng.getrandbits(64) & rng.getrandbits(64)
+        if bitboard.count_squares((mask * magic & FULL) >> 56) < 6:
+            continue
+        table = {}
+        for subset, subset_attacks in zip(subsets, attacks):
+            index = (subset * magic & FULL) >> shift
+            if table.setdefault(index, subset_attacks) != subset_attacks:
+                break
+        else:
+            return magic
+
+
+class MagicAttackTable:
+    def __init__(
+        self,
+        directions: List[str],
+        magics: List[int],
+        attacks: Optional[Sequence[int]] = None,
+    ):
+        # When given, attacks holds every square's table back to back (as
+        # loaded from the table store) and is sliced instead of generated.
+        self.masks = []
+        self.magics = magics
+        self.shifts = []
+        self.attacks = []
+        offset = 0
+        for square in bitboard.SQUARES:
+            mask = generate_relevant_occupancy_mask(square, directions)
+            shift = 64 - bitboard.count_squares(mask)
+            size = 1 << (64 - shift)
+            self.masks.append(mask)
+            self.shifts.append(shift)
+            if attacks is None:
+                self.attacks.append(
+                    self.generate_square_attacks(square, directions, size)
+                )
+            else:
+                self.attacks.append(attacks[offset : offset + size])  # noqa: E203
+            offset += size
+
+    def generate_square_attacks(
+        self, square: int, directions: List[str], size: int
+    ) -> List[int]:
+        mask = self.masks[square]
+        magic = self.magics[square]
+        shift = self.shifts[square]
+        attacks = [None] * size
+        for subset in iterate_occupancy_subsets(mask):
+            index = (subset * magic & FULL) >> shift
+            subset_attacks = generate_ray_attacks(square, subset, directions)
+            if attacks[index] not in (None, subset_attacks):
+                raise ValueError(f"magic for square {square} has collisions")
+            attacks[index] = subset_attacks
+        return attacks
+
+    def get_attacks(self, square: int, occupied: int) -> int:
+        index = ((occupied & self.masks[square]) * self.magics[square] & FULL) >> (
+            self.shifts[square]
+        )
+        return self.attacks[square][index]
+
+
+ROOK_ATTACKS = MagicAttackTable(
+    ROOK_DIRECTIONS, ROOK_MAGICS, load_table("rook_attacks")
+)
+BISHOP_ATTACKS = MagicAttackTable(
+    BISHOP_DIRECTIONS, BISHOP_MAGICS, load_table("bishop_attacks")
+)
+
+
+def get_rook_attacks(square: int, occupied: int) -> int:
+    return ROOK_ATTACKS.get_attacks(square, occupied)
+
+
+def get_bishop_attacks(square: int, occupied: int) -> int:
+    return BISHOP_ATTACKS.get_attacks(square, occupied)
+
+
+def get_queen_attacks(square: int, occupied: int) -> int:
+    return ROOK_ATTACKS.get_attacks(square, occupied) | BISHOP_ATTACKS.get_attacks(
+        square, occupied
+    )
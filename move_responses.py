@@ -0,0 +1,203 @@
+import time
+from figures import FIGURE_CLASSES, Pawn, get_figure, get_figure_class
+from metrics import Histogram
+from typing import Optional, Tuple
+
+
+def get_figure_label(chess_figure: Optional[str]) -> str:
+    # Unknown figures share one label so that arbitrary paths cannot grow
+    # the number of series without bound.
+    if chess_figure is None:
+        return ""
+    chess_figure = chess_figure.lower()
+    return chess_figure if chess_figure in FIGURE_CLASSES else "invalid"
+
+
+def build_list_available_moves_response(
+    figure_class,
+    chess_figure: str,
+    current_field: str,
+    move_generation_duration: Optional[Histogram] = None,
+) -> Tuple[dict, int]:
+    if not figure_class:
+        return (
+            {
+                "availableMoves": [],
+                "error": "invalid figure",
+                "figure": chess_figure,
+                "currentField": current_field,
+            },
+            404,
+        )
+
+    figure_instance = get_figure(figure_class, current_field)
+
+    start = time.perf_counter()
+    try:
+        available_moves = figure_instance.list_available_moves()
+    except ValueError as e:
+        return (
+            {
+                "availableMoves": [],
+                "error": str(e),
+                "figure": chess_figure,
+                "currentField": current_field,
+            },
+            409,
+        )
+    else:
+        if move_generation_duration is not None:
+            move_generation_duration.observe(
+                time.perf_counter() - start, (get_figure_label(chess_figure),)
+            )
+        if figure_class is Pawn:
+            whites_moves = available_moves[0]["whites"]
+            blacks_moves = available_moves[0]["blacks"]
+            return (
+                {
+                    "availableMoves": {
+                        "forWhites": whites_moves if whites_moves is not None else [],
+                        "forBlacks": blacks_moves if blacks_moves is not None else [],
+                    },
+                    "error": {
+                        "forWhites": "invalid field for figure"
+                        if whites_moves is None
+                        else None,
+                        "forBlacks": "invalid field for figure"
+                        if blacks_moves is None
+                        else None,
+                    },
+                    "figure": chess_figure,
+                    "currentField": current_field,
+                },
+                200,
+            )
+        else:
+            return (
+                {
+                    "availableMoves": available_moves,
+                    "error": None,
+                    "figure": chess_figure,
+                    "currentField": current_field,
+                },
+                200,
+            )
+
+
+def build_validate_move_response(
+    figure_class,
+    chess_figure: str,
+    current_field: str,
+    dest_field: str,
+    move_generation_duration: Optional[Histogram] = None,
+) -> Tuple[dict, int]:
+    if not figure_class:
+        return (
+            {
+                "move": "invalid",
+                "error": "invalid figure",
+                "figure": chess_figure,
+                "currentField": current_field,
+                "destField": dest_field,
+            },
+            404,
+        )
+
+    figure_instance = get_figure(figure_class, current_field)
+
+    start = time.perf_counter()
+    try:
+        is_move_valid = figure_instance.validate_move(dest_field)
+    except ValueError as e:
+        return (
+            {
+                "move": "invalid",
+                "figure": chess_figure,
+                "error": str(e),
+                "currentField": current_field,
+                "destField": dest_field,
+            },
+            409,
+        )
+    else:
+        if move_generation_duration is not None:
+            move_generation_duration.observe(
+                time.perf_counter() - start, (get_figure_label(chess_figure),)
+            )
+        if figure_class is Pawn:
+            is_move_valid_for_whites, is_move_valid_for_blacks = is_move_valid
+            return (
+                {
+                    "move": {
+                        "forWhites": "valid" if is_move_valid_for_whites else "invalid",
+                        "forBlacks": "valid" if is_move_valid_for_blacks else "invalid",
+                    },
+                    "figure": chess_figure,
+                    "error": {
+                        "forWhites": None
+                        if is_move_valid_for_whites
+                        else (
+                            "invalid field for figure"
+                            if is_move_valid_for_whites is None
+                            else "current move is not permitted"
+                        ),
+                        "forBlacks": None
+                        if is_move_valid_for_blacks
+                        else (
+                            "invalid field for figure"
+                            if is_move_valid_for_blacks is None
+                            else "current move is not permitted"
+                        ),
+                    },
+                    "currentField": current_field,
+                    "destField": dest_field,
+                },
+                200,
+            )
+
+        else:
+            return (
+                {
+                    "move": "valid" if is_move_valid else "invalid",
+                    "figure": chess_figure,
+                    "error": None if is_move_valid else "current move is not permitted",
+                    "currentField": current_field,
+                    "destField": dest_field,
+                },
+                200,
+            )
+
+
+def build_batch_query_response(
+    query, figure_classes: dict, move_generation_duration: Optional[Histogram] = None
+) -> dict:
+    if not isinstance(query, dict):
+        return {"status": 400, "response": {"error": "invalid query"}}
+    chess_figure = query.get("figure")
+    current_field = query.get("currentField")
+    dest_field = query.get("destField")
+    if (
+        not isinstance(chess_figure, str)
+        or not isinstance(current_field, str)
+        or not isinstance(dest_field, (str, type(None)))
+    ):
+        return {"status": 400, "response": {"error": "invalid query"}}
+
+    figure_key = chess_figure.lower()
+    if figure_key not in figure_classes:
+        figure_classes[figure_key] = get_figure_class(chess_figure)
+    figure_class = figure_classes[figure_key]
+
+    if dest_field is None:
+        payload, status_code = build_list_available_moves_response(
+            figure_class, chess_figure, current_field, move_generation_duration
+        )
+    else:
+        payload, status_code = build_validate_move_response(
+            figure_class,
+            chess_figure,
+            current_field,
+            dest_field,
+            move_generation_duration,
+        )
+    return {"status": status_code, "response": payload}
@@ -0,0 +1,154 @@
+import bitboard
+from bitboard import (
+    BISHOP_DIRECTIONS,
+    DOWN,
+    LEFT,
+    QUEEN_DIRECTIONS,
+    RANK_1,
+    RANK_2,
+    RANK_7,
+    RANK_8,
+    RIGHT,
+    ROOK_DIRECTIONS,
+    UP,
+)
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+
+KNIGHT_DIRECTIONS_COMBINATIONS = [
+    (UP, UP, RIGHT),
+    (UP, UP, LEFT),
+    (DOWN, DOWN, RIGHT),
+    (DOWN, DOWN, LEFT),
+    (LEFT, LEFT, UP),
+    (LEFT, LEFT, DOWN),
+    (RIGHT, RIGHT, UP),
+    (RIGHT, RIGHT, DOWN),
+]
+
+
+def generate_sliding_moves(square: int, directions: List[str]) -> int:
+    available_moves = bitboard.EMPTY
+    for direction in directions:
+        possible_field = bitboard.shift(bitboard.square_bitboard(square), direction)
+        while possible_field:
+            available_moves |= possible_field
+            possible_field = bitboard.shift(possible_field, direction)
+    return available_moves
+
+
+def generate_bishop_moves(square: int) -> int:
+    return generate_sliding_moves(square, BISHOP_DIRECTIONS)
+
+
+def generate_rook_moves(square: int) -> int:
+    return generate_sliding_moves(square, ROOK_DIRECTIONS)
+
+
+def generate_queen_moves(square: int) -> int:
+    return generate_sliding_moves(square, QUEEN_DIRECTIONS)
+
+
+def generate_king_moves(square: int) -> int:
+    available_moves = bitboard.EMPTY
+    for direction in QUEEN_DIRECTIONS:
+        available_moves |= bitboard.shift(bitboard.square_bitboard(square), direction)
+    return available_moves
+
+
+def generate_knight_moves(square: int) -> int:
+    available_moves = bitboard.EMPTY
+    for directions in KNIGHT_DIRECTIONS_COMBINATIONS:
+        possible_field = bitboard.square_bitboard(square)
+        for direction in directions:
+            possible_field = bitboard.shift(possible_field, direction)
+        available_moves |= possible_field
+    return available_moves
+
+
+def generate_whites_pawn_moves(square: int) -> Optional[int]:
+    pawn = bitboard.square_bitboard(square)
+    if pawn & RANK_1:
+        return None
+    available_moves = bitboard.shift(pawn, UP)
+    if pawn & RANK_2:
+        available_moves |= bitboard.shift(available_moves, UP)
+    return available_moves
+
+
+def generate_blacks_pawn_moves(square: int) -> Optional[int]:
+    pawn = bitboard.square_bitboard(square)
+    if pawn & RANK_8:
+        return None
+    available_moves = bitboard.shift(pawn, DOWN)
+    if pawn & RANK_7:
+        available_moves |= bitboard.shift(available_moves, DOWN)
+    return available_moves
+
+
+def order_by_field_name(square: int) -> str:
+    return bitboard.field_from_square(square)
+
+
+def order_by_distance_down(square: int) -> int:
+    return -square
+
+
+class MoveTable:
+    def __init__(
+        self,
+        generate_moves: Callable[[int], Optional[int]],
+        field_order: Callable[[int], object] = order_by_field_name,
+    ):
+        self.bitboards: List[Optional[int]] = [
+            generate_moves(square) for square in bitboard.SQUARES
+        ]
+        # Field-name views are built once here so that the API boundary
+        # never converts bitboards on the request path.
+        self.available_moves: Dict[str, Optional[Tuple[str, ...]]] = {}
+        self.available_fields: Dict[str, Optional[FrozenSet[str]]] = {}
+        for square, moves in enumerate(self.bitboards):
+            field = bitboard.field_from_square(square)
+            if moves is None:
+                self.available_moves[field] = None
+                self.available_fields[field] = None
+            else:
+                squares = sorted(bitboard.iterate_squares(moves), key=field_order)
+                fields = tuple(bitboard.field_from_square(s) for s in squares)
+                self.available_moves[field] = fields
+                self.available_fields[field] = frozenset(fields)
+
+    def has_field(self, field: str) -> bool:
+        return field in self.available_moves
+
+    def get_moves_bitboard(self, square: int) -> Optional[int]:
+        return self.bitboards[square]
+
+    def get_available_moves(self, field: str) -> Optional[Tuple[str, ...]]:
+        return self.available_moves[field]
+
+    def is_move_available(self, field: str, dest_field: str) -> Optional[bool]:
+        available_fields = self.available_fields[field]
+        if available_fields is None:
+            return None
+        return dest_field in available_fields
+
+    def is_square_available(self, square: int, dest_square: int) -> Optional[bool]:
+        moves = self.bitboards[square]
+        if moves is None:
+            return None
+        return bool(moves >> dest_square & 1)
+
+
+MOVE_TABLES = {
+    "bishop": MoveTable(generate_bishop_moves),
+    "king": MoveTable(generate_king_moves),
+    "knight": MoveTable(generate_knight_moves),
+    "queen": MoveTable(generate_queen_moves),
+    "rook": MoveTable(generate_rook_moves),
+}
+
+PAWN_MOVE_TABLES = {
+    "whites": MoveTable(generate_whites_pawn_moves),
+    "blacks": MoveTable(generate_blacks_pawn_moves, order_by_distance_down),
+}
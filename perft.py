@@ -0,0 +1,210 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from job_pool import WAIT_INTERVAL, JobCancelled
+from position import Position, move_to_uci
+from transposition import TranspositionTable
+from typing import Callable, Dict, List, Optional, Tuple
+from zobrist import DEPTH_KEYS
+
+# One table per worker process, reused by every subtree it is handed.
+_worker_tables: Dict[float, TranspositionTable] = {}
+
+# One pool per process, created on first use and shared by every parallel
+# run; a run's workers argument only limits how many subtrees it has queued
+# on the pool at once.
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def perft(position: Position, depth: int) -> int:
+    if depth == 0:
+        return 1
+    moves = position.generate_legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    make_move = position.make_move
+    unmake_move = position.unmake_move
+    for move in moves:
+        make_move(move)
+        nodes += perft(position, depth - 1)
+        unmake_move()
+    return nodes
+
+
+def perft_hashed(position: Position, depth: int, table: TranspositionTable) -> int:
+    # The last ply is cheaper to count than to hash.
+    if depth <= 1:
+        return perft(position, depth)
+    key = position.key ^ DEPTH_KEYS[depth]
+    entry = table.probe(key)
+    if entry is not None:
+        return entry[1]
+    nodes = 0
+    for move in position.generate_legal_moves():
+        position.make_move(move)
+        nodes += perft_hashed(position, depth - 1, table)
+        position.unmake_move()
+    table.store(key, depth, nodes)
+    return nodes
+
+
+def perft_divide(
+    position: Position,
+    depth: int,
+    table: Optional[TranspositionTable] = None,
+    cancelled: Optional[threading.Event] = None,
+    on_move: Optional[Callable[[str, int], None]] = None,
+) -> Dict[str, int]:
+    divide = {}
+    if depth == 0:
+        return divide
+    for move in position.generate_legal_moves():
+        # Checked once per root move, which is far outside the hot loop.
+        if cancelled is not None and cancelled.is_set():
+            raise JobCancelled("job cancelled")
+        position.make_move(move)
+        if table is None:
+            nodes = perft(position, depth - 1)
+        else:
+            nodes = perft_hashed(position, depth - 1, table)
+        position.unmake_move()
+        divide[move_to_uci(move)] = nodes
+        if on_move is not None:
+            on_move(move_to_uci(move), nodes)
+    return divide
+
+
+def perft_subtree(
+    fen: str,
+    moves: Tuple[int, ...],
+    depth: int,
+    hash_size_mb: Optional[float] = None,
+) -> int:
+    position = Position(fen)
+    for move in moves:
+        position.make_move(move)
+    if hash_size_mb is None:
+        return perft(position, depth)
+    if hash_size_mb not in _worker_tables:
+        _worker_tables[hash_size_mb] = TranspositionTable(hash_size_mb)
+    return perft_hashed(position, depth, _worker_tables[hash_size_mb])
+
+
+def split_perft_tasks(
+    position: Position, split_depth: int
+) -> List[Tuple[int, Tuple[int, ...]]]:
+    tasks = [(move, (move,)) for move in position.generate_legal_moves()]
+    for _ in range(split_depth - 1):
+        deeper_tasks = []
+        for root_move, moves in tasks:
+            for move in moves:
+                position.make_move(move)
+            deeper_tasks.extend(
+                (root_move, moves + (move,)) for move in position.generate_legal_moves()
+            )
+            for _ in moves:
+                position.unmake_move()
+        tasks = deeper_tasks
+    return tasks
+
+
+def get_executor(pool_size: Optional[int] = None) -> ProcessPoolExecutor:
+    # The first caller sizes the pool. Its workers are spawned rather than
+    # forked, as the serving process runs threads.
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=pool_size or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def discard_executor(executor: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def perft_divide_parallel(
+    position: Position,
+    depth: int,
+    workers: Optional[int] = None,
+    split_depth: Optional[int] = None,
+    hash_size_mb: Optional[float] = None,
+    cancelled: Optional[threading.Event] = None,
+    pool_size: Optional[int] = None,
+) -> Dict[str, int]:
+    if depth <= 1:
+        return perft_divide(position, depth)
+    workers = workers or os.cpu_count() or 1
+    root_moves = position.generate_legal_moves()
+    if split_depth is None:
+        # Few root moves leave most workers idle near the end, so split one
+        # ply deeper to get smaller, better balanced subtrees.
+        split_depth = 2 if len(root_moves) < 4 * workers else 1
+    split_depth = min(split_depth, depth - 1)
+    fen = position.get_fen()
+    tasks = iter(split_perft_tasks(position, split_depth))
+    executor = get_executor(pool_size)
+    divide = dict.fromkeys((move_to_uci(move) for move in root_moves), 0)
+    running: Dict[Future, int] = {}
+    try:
+        while True:
+            for root_move, moves in itertools.islice(tasks, workers - len(running)):
+                future = executor.submit(
+                    perft_subtree, fen, moves, depth - len(moves), hash_size_mb
+                )
+                running[future] = root_move
+            if not running:
+                return divide
+            done, _ = wait(running, WAIT_INTERVAL, FIRST_COMPLETED)
+            for future in done:
+                divide[move_to_uci(running.pop(future))] += future.result()
+            if cancelled is not None and cancelled.is_set():
+                raise JobCancelled("job cancelled")
+    except BrokenProcessPool:
+        # A worker died; the next run starts a fresh pool.
+        discard_executor(executor)
+        raise
+    finally:
+        for future in running:
+            future.cancel()
+
+
+def compare_perft_speedup(
+    fen: str,
+    depth: int,
+    workers: Optional[int] = None,
+    cancelled: Optional[threading.Event] = None,
+    pool_size: Optional[int] = None,
+) -> Dict[str, float]:
+    start = time.perf_counter()
+    nodes = perft(Position(fen), depth)
+    serial_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    divide = perft_divide_parallel(
+        Position(fen), depth, workers, cancelled=cancelled, pool_size=pool_size
+    )
+    parallel_nodes = sum(divide.values())
+    parallel_elapsed = time.perf_counter() - start
+    if parallel_nodes != nodes:
+        raise RuntimeError("parallel perft node count differs from serial perft")
+    return {
+        "nodes": nodes,
+        "serialElapsedSeconds": serial_elapsed,
+        "parallelElapsedSeconds": parallel_elapsed,
+        "speedup": serial_elapsed / parallel_elapsed,
+    }
@@ -0,0 +1,620 @@
+import bitboard
+from bitboard import (
+    DOWN_LEFT,
+    DOWN_RIGHT,
+    FILE_A,
+    FILE_H,
+    FULL,
+    RANK_1,
+    RANK_8,
+    UP_LEFT,
+    UP_RIGHT,
+)
+from fen import STARTING_POSITION, parse_piece_placement
+from magic_bitboards import BISHOP_ATTACKS, ROOK_ATTACKS
+from move_tables import MOVE_TABLES
+from typing import List, Optional
+from zobrist import CASTLING_KEYS, EN_PASSANT_KEYS, PIECE_KEYS, SIDE_KEY, compute_key
+
+WHITE = 0
+BLACK = 1
+
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+
+# Board squares hold a piece code color * 6 + piece type, or None when empty.
+PIECE_SYMBOLS = "PNBRQKpnbrqk"
+
+# Castling rights bits.
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+CASTLING_SYMBOLS = {
+    "K": WHITE_KINGSIDE,
+    "Q": WHITE_QUEENSIDE,
+    "k": BLACK_KINGSIDE,
+    "q": BLACK_QUEENSIDE,
+}
+
+# Moves are ints: from square | to square << 6 | promotion type << 12 | flag << 16.
+NORMAL = 0
+DOUBLE_PUSH = 1
+EN_PASSANT = 2
+CASTLING = 3
+
+PROMOTION_TYPES = (QUEEN, ROOK, BISHOP, KNIGHT)
+PROMOTION_SYMBOLS = {KNIGHT: "n", BISHOP: "b", ROOK: "r", QUEEN: "q"}
+
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+RANK_3 = bitboard.RANK_1 << 16
+RANK_6 = bitboard.RANK_1 << 40
+
+KNIGHT_ATTACKS = MOVE_TABLES["knight"].bitboards
+KING_ATTACKS = MOVE_TABLES["king"].bitboards
+PAWN_ATTACKS = [
+    [
+        bitboard.shift(1 << square, UP_LEFT) | bitboard.shift(1 << square, UP_RIGHT)
+        for square in bitboard.SQUARES
+    ],
+    [
+        bitboard.shift(1 << square, DOWN_LEFT) | bitboard.shift(1 << square, DOWN_RIGHT)
+        for square in bitboard.SQUARES
+    ],
+]
+
+
+def generate_line_tables():
+    between = [[0] * 64 for _ in bitboard.SQUARES]
+    line = [[0] * 64 for _ in bitboard.SQUARES]
+    for attack_table in (ROOK_ATTACKS, BISHOP_ATTACKS):
+        for square in bitboard.SQUARES:
+            empty_board_attacks = attack_table.get_attacks(square, 0)
+            for other in bitboard.iterate_squares(empty_board_attacks):
+                between[square][other] = attack_table.get_attacks(
+                    square, 1 << other
+                ) & attack_table.get_attacks(other, 1 << square)
+                line[square][other] = (
+                    empty_board_attacks & attack_table.get_attacks(other, 0)
+                    | 1 << square
+                    | 1 << other
+                )
+    return between, line
+
+
+BETWEEN, LINE = generate_line_tables()
+
+# Castling rights that survive a move touching a given square.
+CASTLING_MASKS = [15] * 64
+CASTLING_MASKS[0] = 15 ^ WHITE_QUEENSIDE
+CASTLING_MASKS[4] = 15 ^ (WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASKS[7] = 15 ^ WHITE_KINGSIDE
+CASTLING_MASKS[56] = 15 ^ BLACK_QUEENSIDE
+CASTLING_MASKS[60] = 15 ^ (BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASKS[63] = 15 ^ BLACK_KINGSIDE
+
+# Castling right -> (king square, rook square) the right needs.
+CASTLING_HOME_SQUARES = {
+    WHITE_KINGSIDE: (4, 7),
+    WHITE_QUEENSIDE: (4, 0),
+    BLACK_KINGSIDE: (60, 63),
+    BLACK_QUEENSIDE: (60, 56),
+}
+
+# King destination square -> (rook from square, rook to square).
+CASTLING_ROOK_MOVES = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}
+
+
+def encode_move(
+    from_square: int, to_square: int, promotion: int = 0, flag: int = NORMAL
+) -> int:
+    return from_square | to_square << 6 | promotion << 12 | flag << 16
+
+
+def move_to_uci(move: int) -> str:
+    uci = (
+        bitboard.field_from_square(move & 63)
+        + bitboard.field_from_square(move >> 6 & 63)
+    ).lower()
+    promotion = move >> 12 & 7
+    if promotion:
+        uci += PROMOTION_SYMBOLS[promotion]
+    return uci
+
+
+class Position:
+    def __init__(self, fen: str = STARTING_POSITION):
+        self.board: List[Optional[int]] = [None] * 64
+        self.bitboards = [0] * 12
+        self.occupancy = [0, 0]
+        self.history = []
+
+        fen_fields = fen.split()
+        if len(fen_fields) > 6:
+            raise ValueError("invalid fen")
+        for square, symbol in parse_piece_placement(fen).items():
+            piece = PIECE_SYMBOLS.index(symbol)
+            self.board[square] = piece
+            self.bitboards[piece] |= 1 << square
+            self.occupancy[piece // 6] |= 1 << square
+        if any(
+            bitboard.count_squares(self.bitboards[color * 6 + KING]) != 1
+            for color in (WHITE, BLACK)
+        ):
+            raise ValueError("invalid fen")
+        if (self.bitboards[PAWN] | self.bitboards[6 + PAWN]) & (RANK_1 | RANK_8):
+            raise ValueError("invalid fen")
+
+        default_fields = ["w", "-", "-", "0", "1"]
+        fen_fields += default_fields[len(fen_fields) - 1 :]  # noqa: E203
+        (
+            side_to_move,
+            castling,
+            en_passant,
+            halfmove_clock,
+            fullmove_number,
+        ) = fen_fields[1:6]
+        if side_to_move not in ("w", "b"):
+            raise ValueError("invalid fen")
+        self.side_to_move = WHITE if side_to_move == "w" else BLACK
+        # The side not to move cannot be in check: its king could be captured.
+        them = self.side_to_move ^ 1
+        if self.get_attackers(
+            self.bitboards[them * 6 + KING].bit_length() - 1,
+            self.side_to_move,
+            self.occupancy[0] | self.occupancy[1],
+        ):
+            raise ValueError("invalid fen")
+
+        self.castling_rights = 0
+        if castling != "-":
+            for symbol in castling:
+                if symbol not in CASTLING_SYMBOLS:
+                    raise ValueError("invalid fen")
+                self.castling_rights |= CASTLING_SYMBOLS[symbol]
+        # Rights whose king or rook has left its home square cannot be used;
+        # dropping them also keeps the key equal to one reached by moves.
+        for right, (king_square, rook_square) in CASTLING_HOME_SQUARES.items():
+            color = WHITE if right & (WHITE_KINGSIDE | WHITE_QUEENSIDE) else BLACK
+            if (
+                self.board[king_square] != color * 6 + KING
+                or self.board[rook_square] != color * 6 + ROOK
+            ):
+                self.castling_rights &= ~right
+
+        self.en_passant_square = None
+        if en_passant != "-":
+            self.en_passant_square = bitboard.square_from_field(en_passant)
+            if self.en_passant_square is None:
+                raise ValueError("invalid fen")
+            # The square is the one a double step of the side that just
+            # moved passed over: empty, with that pawn right behind it.
+            if self.side_to_move == WHITE:
+                ep_rank, pawn_square = RANK_6, self.en_passant_square - 8
+            else:
+                ep_rank, pawn_square = RANK_3, self.en_passant_square + 8
+            if (
+                not (1 << self.en_passant_square) & ep_rank
+                or self.board[self.en_passant_square] is not None
+                or self.board[pawn_square] != them * 6 + PAWN
+            ):
+                raise ValueError("invalid fen")
+            # make_move only keeps the square when a pawn can capture there,
+            # and the key has to match the same position reached by moves.
+            if not (
+                PAWN_ATTACKS[self.side_to_move ^ 1][self.en_passant_square]
+                & self.bitboards[self.side_to_move * 6 + PAWN]
+            ):
+                self.en_passant_square = None
+
+        if not (halfmove_clock.isdigit() and fullmove_number.isdigit()):
+            raise ValueError("invalid fen")
+        self.halfmove_clock = int(halfmove_clock)
+        self.fullmove_number = int(fullmove_number)
+        self.key = compute_key(
+            self.board,
+            self.side_to_move,
+            self.castling_rights,
+            self.en_passant_square,
+        )
+
+    def get_fen(self) -> str:
+        rows = []
+        for row in range(7, -1, -1):
+            fen_row = ""
+            empty_squares = 0
+            for square in range(row * 8, row * 8 + 8):
+                piece = self.board[square]
+                if piece is None:
+                    empty_squares += 1
+                    continue
+                if empty_squares:
+                    fen_row += str(empty_squares)
+                    empty_squares = 0
+                fen_row += PIECE_SYMBOLS[piece]
+            if empty_squares:
+                fen_row += str(empty_squares)
+            rows.append(fen_row)
+
+        castling = "".join(
+            symbol
+            for symbol, right in CASTLING_SYMBOLS.items()
+            if self.castling_rights & right
+        )
+        en_passant = (
+            bitboard.field_from_square(self.en_passant_square).lower()
+            if self.en_passant_square is not None
+            else "-"
+        )
+        return " ".join(
+            [
+                "/".join(rows),
+                "w" if self.side_to_move == WHITE else "b",
+                castling or "-",
+                en_passant,
+                str(self.halfmove_clock),
+                str(self.fullmove_number),
+            ]
+        )
+
+    def get_attackers(self, square: int, color: int, occupied: int) -> int:
+        bitboards = self.bitboards
+        base = color * 6
+        return (
+            PAWN_ATTACKS[color ^ 1][square] & bitboards[base + PAWN]
+            | KNIGHT_ATTACKS[square] & bitboards[base + KNIGHT]
+            | KING_ATTACKS[square] & bitboards[base + KING]
+            | BISHOP_ATTACKS.get_attacks(square, occupied)
+            & (bitboards[base + BISHOP] | bitboards[base + QUEEN])
+            | ROOK_ATTACKS.get_attacks(square, occupied)
+            & (bitboards[base + ROOK] | bitboards[base + QUEEN])
+        )
+
+    def is_in_check(self) -> bool:
+        us = self.side_to_move
+        king_square = self.bitboards[us * 6 + KING].bit_length() - 1
+        return bool(
+            self.get_attackers(
+                king_square, us ^ 1, self.occupancy[0] | self.occupancy[1]
+            )
+        )
+
+    def generate_legal_moves(self) -> List[int]:
+        us = self.side_to_move
+        them = us ^ 1
+        bitboards = self.bitboards
+        us_occupancy = self.occupancy[us]
+        them_occupancy = self.occupancy[them]
+        occupied = us_occupancy | them_occupancy
+        not_us = FULL ^ us_occupancy
+        base = us * 6
+        them_base = them * 6
+        king = bitboards[base + KING]
+        king_square = king.bit_length() - 1
+        get_attackers = self.get_attackers
+        moves = []
+        append = moves.append
+
+        occupied_without_king = occupied ^ king
+        targets = KING_ATTACKS[king_square] & not_us
+        while targets:
+            to_bit = targets & -targets
+            targets ^= to_bit
+            to_square = to_bit.bit_length() - 1
+            if not get_attackers(to_square, them, occupied_without_king):
+                append(king_square | to_square << 6)
+
+        checkers = get_attackers(king_square, them, occupied)
+        if checkers & (checkers - 1):
+            return moves
+        if checkers:
+            target_mask = checkers | BETWEEN[king_square][checkers.bit_length() - 1]
+        else:
+            target_mask = FULL
+            self._add_castling_moves(append, king_square, occupied)
+
+        them_diagonal = bitboards[them_base + BISHOP] | bitboards[them_base + QUEEN]
+        them_orthogonal = bitboards[them_base + ROOK] | bitboards[them_base + QUEEN]
+        pinned = 0
+        snipers = (
+            BISHOP_ATTACKS.get_attacks(king_square, them_occupancy) & them_diagonal
+            | ROOK_ATTACKS.get_attacks(king_square, them_occupancy) & them_orthogonal
+        )
+        king_between = BETWEEN[king_square]
+        while snipers:
+            sniper = snipers & -snipers
+            snipers ^= sniper
+            blockers = king_between[sniper.bit_length() - 1] & occupied
+            if blockers & (blockers - 1) == 0:
+                pinned |= blockers & us_occupancy
+        king_line = LINE[king_square]
+        move_mask = not_us & target_mask
+
+        pieces = bitboards[base + KNIGHT] & ~pinned
+        while pieces:
+            from_bit = pieces & -pieces
+            pieces ^= from_bit
+            from_square = from_bit.bit_length() - 1
+            targets = KNIGHT_ATTACKS[from_square] & move_mask
+            while targets:
+                to_bit = targets & -targets
+                targets ^= to_bit
+                append(from_square | (to_bit.bit_length() - 1) << 6)
+
+        for attack_table, pieces in (
+            (BISHOP_ATTACKS, bitboards[base + BISHOP] | bitboards[base + QUEEN]),
+            (ROOK_ATTACKS, bitboards[base + ROOK] | bitboards[base + QUEEN]),
+        ):
+            masks = attack_table.masks
+            magics = attack_table.magics
+            shifts = attack_table.shifts
+            attacks = attack_table.attacks
+            while pieces:
+                from_bit = pieces & -pieces
+                pieces ^= from_bit
+                from_square = from_bit.bit_length() - 1
+                targets = (
+                    attacks[from_square][
+                        ((occupied & masks[from_square]) * magics[from_square] & FULL)
+                        >> shifts[from_square]
+                    ]
+                    & move_mask
+                )
+                if from_bit & pinned:
+                    targets &= king_line[from_square]
+                while targets:
+                    to_bit = targets & -targets
+                    targets ^= to_bit
+                    append(from_square | (to_bit.bit_length() - 1) << 6)
+
+        pawns = bitboards[base + PAWN]
+        self._add_pawn_moves(append, pawns & ~pinned, FULL, occupied, target_mask)
+        pinned_pawns = pawns & pinned
+        while pinned_pawns:
+            from_bit = pinned_pawns & -pinned_pawns
+            pinned_pawns ^= from_bit
+            self._add_pawn_moves(
+                append,
+                from_bit,
+                king_line[from_bit.bit_length() - 1],
+                occupied,
+                target_mask,
+            )
+
+        if self.en_passant_square is not None:
+            self._add_en_passant_moves(append, king_square, occupied)
+        return moves
+
+    def _add_pawn_moves(
+        self, append, pawns: int, line_mask: int, occupied: int, target_mask: int
+    ):
+        if not pawns:
+            return
+        us = self.side_to_move
+        them_occupancy = self.occupancy[us ^ 1]
+        empty = FULL ^ occupied
+        mask = line_mask & target_mask
+        if us == WHITE:
+            single_pushes = pawns << 8 & empty
+            double_pushes = (single_pushes & RANK_3) << 8 & empty & mask
+            single_pushes &= mask
+            left_captures = (pawns & NOT_FILE_A) << 7 & them_occupancy & mask
+            right_captures = (pawns & NOT_FILE_H) << 9 & them_occupancy & mask
+            push_offset, left_offset, right_offset = -8, -7, -9
+            promotion_rank = RANK_8
+        else:
+            single_pushes = pawns >> 8 & empty
+            double_pushes = (single_pushes & RANK_6) >> 8 & empty & mask
+            single_pushes &= mask
+            left_captures = (pawns & NOT_FILE_A) >> 9 & them_occupancy & mask
+            right_captures = (pawns & NOT_FILE_H) >> 7 & them_occupancy & mask
+            push_offset, left_offset, right_offset = 8, 9, 7
+            promotion_rank = RANK_1
+
+        for targets, offset in (
+            (single_pushes, push_offset),
+            (left_captures, left_offset),
+            (right_captures, right_offset),
+        ):
+            while targets:
+                to_bit = targets & -targets
+                targets ^= to_bit
+                to_square = to_bit.bit_length() - 1
+                move = to_square + offset | to_square << 6
+                if to_bit & promotion_rank:
+                    for promotion in PROMOTION_TYPES:
+                        append(move | promotion << 12)
+                else:
+                    append(move)
+        while double_pushes:
+            to_bit = double_pushes & -double_pushes
+            double_pushes ^= to_bit
+            to_square = to_bit.bit_length() - 1
+            append(to_square + 2 * push_offset | to_square << 6 | DOUBLE_PUSH << 16)
+
+    def _add_en_passant_moves(self, append, king_square: int, occupied: int):
+        us = self.side_to_move
+        them = us ^ 1
+        to_square = self.en_passant_square
+        captured_square = to_square - 8 if us == WHITE else to_square + 8
+        captured_bit = 1 << captured_square
+        capturers = PAWN_ATTACKS[them][to_square] & self.bitboards[us * 6 + PAWN]
+        while capturers:
+            from_bit = capturers & -capturers
+            capturers ^= from_bit
+            # Two pawns leave a rank at once, so pins are checked on the
+            # resulting board rather than with the pinned mask.
+            occupied_after = occupied ^ from_bit ^ captured_bit | 1 << to_square
+            attackers = self.get_attackers(king_square, them, occupied_after)
+            if not attackers & ~captured_bit:
+                append(from_bit.bit_length() - 1 | to_square << 6 | EN_PASSANT << 16)
+
+    def _add_castling_moves(self, append, king_square: int, occupied: int):
+        us = self.side_to_move
+        them = us ^ 1
+        if us == WHITE:
+            sides = (
+                (WHITE_KINGSIDE, 6, (5, 6), (5, 6)),
+                (WHITE_QUEENSIDE, 2, (1, 2, 3), (2, 3)),
+            )
+        else:
+            sides = (
+                (BLACK_KINGSIDE, 62, (61, 62), (61, 62)),
+                (BLACK_QUEENSIDE, 58, (57, 58, 59), (58, 59)),
+            )
+        rook = us * 6 + ROOK
+        for right, to_square, empty_squares, safe_squares in sides:
+            if not self.castling_rights & right:
+                continue
+            if self.board[CASTLING_ROOK_MOVES[to_square][0]] != rook:
+                continue
+            if any(occupied >> square & 1 for square in empty_squares):
+                continue
+            if any(
+                self.get_attackers(square, them, occupied) for square in safe_squares
+            ):
+                continue
+            append(king_square | to_square << 6 | CASTLING << 16)
+
+    def make_move(self, move: int):
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        promotion = move >> 12 & 7
+        flag = move >> 16
+        board = self.board
+        bitboards = self.bitboards
+        occupancy = self.occupancy
+        us = self.side_to_move
+        them = us ^ 1
+        piece = board[from_square]
+
+        if flag == EN_PASSANT:
+            captured_square = to_square - 8 if us == WHITE else to_square + 8
+        else:
+            captured_square = to_square
+        captured = board[captured_square]
+        self.history.append(
+            (
+                move,
+                captured,
+                self.castling_rights,
+                self.en_passant_square,
+                self.halfmove_clock,
+                self.key,
+            )
+        )
+        piece_keys = PIECE_KEYS[piece]
+        key = self.key ^ SIDE_KEY ^ piece_keys[from_square] ^ piece_keys[to_square]
+
+        if captured is not None:
+            captured_bit = 1 << captured_square
+            bitboards[captured] ^= captured_bit
+            occupancy[them] ^= captured_bit
+            board[captured_square] = None
+            key ^= PIECE_KEYS[captured][captured_square]
+
+        from_to_bits = 1 << from_square | 1 << to_square
+        bitboards[piece] ^= from_to_bits
+        occupancy[us] ^= from_to_bits
+        board[from_square] = None
+        board[to_square] = piece
+
+        if promotion:
+            promoted = us * 6 + promotion
+            bitboards[piece] ^= 1 << to_square
+            bitboards[promoted] |= 1 << to_square
+            board[to_square] = promoted
+            key ^= piece_keys[to_square] ^ PIECE_KEYS[promoted][to_square]
+        elif flag == CASTLING:
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_square]
+            rook = board[rook_from]
+            rook_bits = 1 << rook_from | 1 << rook_to
+            bitboards[rook] ^= rook_bits
+            occupancy[us] ^= rook_bits
+            board[rook_from] = None
+            board[rook_to] = rook
+            key ^= PIECE_KEYS[rook][rook_from] ^ PIECE_KEYS[rook][rook_to]
+
+        castling_rights = self.castling_rights
+        self.castling_rights &= CASTLING_MASKS[from_square] & CASTLING_MASKS[to_square]
+        if castling_rights != self.castling_rights:
+            key ^= CASTLING_KEYS[castling_rights] ^ CASTLING_KEYS[self.castling_rights]
+        if self.en_passant_square is not None:
+            key ^= EN_PASSANT_KEYS[self.en_passant_square & 7]
+            self.en_passant_square = None
+        if flag == DOUBLE_PUSH:
+            en_passant_square = (from_square + to_square) >> 1
+            if PAWN_ATTACKS[us][en_passant_square] & bitboards[them * 6 + PAWN]:
+                self.en_passant_square = en_passant_square
+                key ^= EN_PASSANT_KEYS[en_passant_square & 7]
+        self.key = key
+        if piece == us * 6 + PAWN or captured is not None:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.side_to_move = them
+
+    def unmake_move(self):
+        (
+            move,
+            captured,
+            self.castling_rights,
+            self.en_passant_square,
+            self.halfmove_clock,
+            self.key,
+        ) = self.history.pop()
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        promotion = move >> 12 & 7
+        flag = move >> 16
+        board = self.board
+        bitboards = self.bitboards
+        occupancy = self.occupancy
+        them = self.side_to_move
+        us = them ^ 1
+        self.side_to_move = us
+        if us == BLACK:
+            self.fullmove_number -= 1
+
+        piece = board[to_square]
+        if promotion:
+            bitboards[piece] ^= 1 << to_square
+            piece = us * 6 + PAWN
+            bitboards[piece] |= 1 << to_square
+        elif flag == CASTLING:
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_square]
+            rook = board[rook_to]
+            rook_bits = 1 << rook_from | 1 << rook_to
+            bitboards[rook] ^= rook_bits
+            occupancy[us] ^= rook_bits
+            board[rook_to] = None
+            board[rook_from] = rook
+
+        from_to_bits = 1 << from_square | 1 << to_square
+        bitboards[piece] ^= from_to_bits
+        occupancy[us] ^= from_to_bits
+        board[to_square] = None
+        board[from_square] = piece
+
+        if captured is not None:
+            if flag == EN_PASSANT:
+                captured_square = to_square - 8 if us == WHITE else to_square + 8
+            else:
+                captured_square = to_square
+            captured_bit = 1 << captured_square
+            bitboards[captured] |= captured_bit
+            occupancy[them] |= captured_bit
+            board[captured_square] = captured
+
+    def parse_uci_move(self, uci: str) -> int:
+        for move in self.generate_legal_moves():
+            if move_to_uci(move) == uci.lower():
+                return move
+        raise ValueError("illegal move")
@@ -0,0 +1,135 @@
+import cProfile
+import itertools
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from flask import Flask, g, jsonify, request
+from typing import List, Optional
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_SUFFIX = ".prof"
+TAG_NAMES = ("chess_figure", "current_field", "dest_field")
+
+
+def sanitize_tag(tag: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", tag)[:32] or "_"
+
+
+class ProfileStore:
+    def __init__(self, directory: str, max_files: int = 100):
+        self.directory = directory
+        self.max_files = max_files
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def list_files(self) -> List[str]:
+        # File names start with a fixed-width timestamp, so name order is
+        # also age order.
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(PROFILE_SUFFIX)
+        )
+
+    def save(self, profile: cProfile.Profile, tags: List[str], wall_time: float) -> str:
+        name = "{:019d}-{:06d}-{}-{:.3f}ms{}".format(
+            time.time_ns(),
+            next(self.sequence) % 1000000,
+            "-".join(sanitize_tag(tag) for tag in tags),
+            wall_time * 1000,
+            PROFILE_SUFFIX,
+        )
+        path = os.path.join(self.directory, name)
+        profile.dump_stats(path)
+        with self.lock:
+            files = self.list_files()
+            for old_path in files[: max(len(files) - self.max_files, 0)]:
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+        return path
+
+    def summarize(self, top: int = 20, limit: Optional[int] = None) -> dict:
+        files = self.list_files()
+        if limit is not None:
+            files = files[-limit:] if limit > 0 else []
+        if not files:
+            return {"profiles": 0, "functions": []}
+
+        stats = pstats.Stats(*files)
+        functions = sorted(
+            stats.stats.items(), key=lambda item: item[1][2], reverse=True
+        )[:top]
+        return {
+            "profiles": len(files),
+            "functions": [
+                {
+                    "function": f"{filename}:{line}({function_name})",
+                    "calls": calls,
+                    "primitiveCalls": primitive_calls,
+                    "totalTime": total_time,
+                    "cumulativeTime": cumulative_time,
+                }
+                for (filename, line, function_name), (
+                    primitive_calls,
+                    calls,
+                    total_time,
+                    cumulative_time,
+                    _,
+                ) in functions
+            ],
+        }
+
+
+def install_profiling(app: Flask) -> ProfileStore:
+    profile_store = ProfileStore(
+        app.config["PROFILING_DIRECTORY"], app.config["PROFILING_MAX_FILES"]
+    )
+    app.extensions["profile_store"] = profile_store
+    sample_rate = app.config["PROFILING_SAMPLE_RATE"]
+
+    @app.before_request
+    def start_profile():
+        if request.headers.get(PROFILE_HEADER, "").lower() not in ("1", "true"):
+            return
+        if random.random() >= sample_rate:
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active in this interpreter.
+            return
+        g.profile = profile
+        g.profile_start = time.perf_counter()
+
+    @app.after_request
+    def save_profile(response):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            profile.disable()
+            wall_time = time.perf_counter() - g.pop("profile_start")
+            view_args = request.view_args or {}
+            tags = [request.endpoint or "unmatched"] + [
+                view_args[name] for name in TAG_NAMES if name in view_args
+            ]
+            profile_store.save(profile, tags, wall_time)
+        return response
+
+    def get_profiles_summary():
+        summary = profile_store.summarize(
+            request.args.get("top", 20, type=int),
+            request.args.get("limit", type=int),
+        )
+        summary["error"] = None
+        return jsonify(summary), 200
+
+    app.add_url_rule(
+        "/debug/profiles", "get_profiles_summary", get_profiles_summary, methods=["GET"]
+    )
+    return profile_store
@@ -0,0 +1,46 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Dict, Hashable, Optional
+
+CachedResponse = namedtuple("CachedResponse", ["body", "status_code", "etag"])
+
+
+def make_cached_response(body: bytes, status_code: int) -> CachedResponse:
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return CachedResponse(body, status_code, etag)
+
+
+class ResponseCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self.lock:
+            cached_response = self.entries.get(key)
+            if cached_response is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return cached_response
+
+    def put(self, key: Hashable, cached_response: CachedResponse) -> CachedResponse:
+        with self.lock:
+            self.entries[key] = cached_response
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return cached_response
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self.entries),
+            "maxSize": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,403 @@
+import threading
+import time
+from position import (
+    BISHOP,
+    BLACK,
+    EN_PASSANT,
+    KING,
+    KNIGHT,
+    PAWN,
+    QUEEN,
+    ROOK,
+    WHITE,
+    Position,
+    move_to_uci,
+)
+from transposition import TranspositionTable
+from typing import Callable, List, Optional
+
+MAX_PLY = 64
+MATE_SCORE = 30000
+MATE_THRESHOLD = MATE_SCORE - MAX_PLY
+INFINITY = MATE_SCORE + 1
+# The clock is read every this many nodes, which keeps the overshoot of the
+# deadline to a few milliseconds without paying for a call on every node.
+DEADLINE_CHECK_INTERVAL = 64
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+PIECE_VALUES = {PAWN: 100, KNIGHT: 320, BISHOP: 330, ROOK: 500, QUEEN: 900, KING: 0}
+
+# Piece-square bonuses from white's point of view, written with rank 8 at the
+# top so that they read like a board.
+# fmt: off
+PIECE_SQUARE_TABLES = {
+    PAWN: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ],
+    BISHOP: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ],
+    ROOK: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ],
+    QUEEN: [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ],
+    KING: [
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20,
+    ],
+}
+# fmt: on
+
+
+def generate_square_scores() -> List[List[int]]:
+    # Material plus position for every piece code and square, signed so that
+    # white pieces count up and black pieces count down.
+    square_scores = []
+    for color in (WHITE, BLACK):
+        for piece_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            table = PIECE_SQUARE_TABLES[piece_type]
+            value = PIECE_VALUES[piece_type]
+            if color == WHITE:
+                scores = [
+                    value + table[(7 - square // 8) * 8 + square % 8]
+                    for square in range(64)
+                ]
+            else:
+                scores = [-value - table[square] for square in range(64)]
+            square_scores.append(scores)
+    return square_scores
+
+
+SQUARE_SCORES = generate_square_scores()
+
+
+def evaluate(position: Position) -> int:
+    score = 0
+    for square, piece in enumerate(position.board):
+        if piece is not None:
+            score += SQUARE_SCORES[piece][square]
+    return score if position.side_to_move == WHITE else -score
+
+
+def pack_entry(score: int, bound: int, move: int) -> int:
+    return (score + INFINITY) | bound << 16 | move << 18
+
+
+def unpack_entry(value: int):
+    return (value & 0xFFFF) - INFINITY, value >> 16 & 3, value >> 18
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Searcher:
+    def __init__(
+        self,
+        position: Position,
+        deadline: float,
+        table: Optional[TranspositionTable] = None,
+        cancelled: Optional[threading.Event] = None,
+    ):
+        self.position = position
+        self.deadline = deadline
+        self.cancelled = cancelled
+        self.table = table or TranspositionTable(4)
+        self.nodes = 0
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self.history = [[0] * 4096 for _ in range(2)]
+        self.root_history_length = len(position.history)
+        self.root_move = 0
+
+    def check_deadline(self):
+        self.nodes += 1
+        if not self.nodes % DEADLINE_CHECK_INTERVAL and (
+            time.monotonic() >= self.deadline
+            or self.cancelled is not None
+            and self.cancelled.is_set()
+        ):
+            raise SearchTimeout()
+
+    def is_capture(self, move: int) -> bool:
+        return (
+            self.position.board[move >> 6 & 63] is not None or move >> 16 == EN_PASSANT
+        )
+
+    def order_moves(self, moves: List[int], ply: int, table_move: int) -> List[int]:
+        board = self.position.board
+        killers = self.killers[ply]
+        history = self.history[self.position.side_to_move]
+
+        def score_move(move: int) -> int:
+            if move == table_move:
+                return 1 << 30
+            to_square = move >> 6 & 63
+            victim = board[to_square]
+            if victim is not None or move >> 16 == EN_PASSANT:
+                # MVV-LVA: the most valuable victim first, and of those the
+                # capture by the least valuable attacker.
+                victim_type = PAWN if victim is None else victim % 6
+                attacker_type = board[move & 63] % 6
+                return (1 << 28) + victim_type * 8 - attacker_type
+            if move >> 12 & 7:
+                return 1 << 27
+            if move == killers[0]:
+                return 1 << 26
+            if move == killers[1]:
+                return (1 << 26) - 1
+            return history[move & 4095]
+
+        return sorted(moves, key=score_move, reverse=True)
+
+    def is_repetition(self) -> bool:
+        position = self.position
+        key = position.key
+        history = position.history
+        for index in range(
+            len(history) - 2,
+            max(len(history) - position.halfmove_clock, 0) - 1,
+            -2,
+        ):
+            if history[index][5] == key:
+                return True
+        return False
+
+    def quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        self.check_deadline()
+        position = self.position
+        in_check = position.is_in_check()
+        moves = position.generate_legal_moves()
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+        if ply >= MAX_PLY:
+            return evaluate(position)
+
+        if not in_check:
+            # Standing pat: the side to move may also decline every capture.
+            stand_pat = evaluate(position)
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = [move for move in moves if self.is_capture(move) or move >> 12 & 7]
+
+        for move in self.order_moves(moves, ply, 0):
+            position.make_move(move)
+            score = -self.quiescence(-beta, -alpha, ply + 1)
+            position.unmake_move()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def negamax(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        position = self.position
+        if ply and (position.halfmove_clock >= 100 or self.is_repetition()):
+            return 0
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(alpha, beta, ply)
+        self.check_deadline()
+
+        table_move = 0
+        entry = self.table.probe(position.key)
+        if entry is not None:
+            entry_depth, value = entry
+            score, bound, table_move = unpack_entry(value)
+            if ply and entry_depth >= depth:
+                # Mate scores are stored relative to the node, not the root.
+                if score > MATE_THRESHOLD:
+                    score -= ply
+                elif score < -MATE_THRESHOLD:
+                    score += ply
+                if (
+                    bound == EXACT
+                    or bound == LOWER_BOUND
+                    and score >= beta
+                    or bound == UPPER_BOUND
+                    and score <= alpha
+                ):
+                    return score
+
+        moves = position.generate_legal_moves()
+        if not moves:
+            return -MATE_SCORE + ply if position.is_in_check() else 0
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        for move in self.order_moves(moves, ply, table_move):
+            position.make_move(move)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            position.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if ply == 0:
+                    self.root_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not self.is_capture(move):
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    history = self.history[position.side_to_move]
+                    history[move & 4095] += depth * depth
+                    if history[move & 4095] > 1 << 20:
+                        for index in range(4096):
+                            history[index] >>= 1
+                break
+
+        if best_score >= beta:
+            bound = LOWER_BOUND
+        elif best_score > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER_BOUND
+        stored_score = best_score
+        if stored_score > MATE_THRESHOLD:
+            stored_score += ply
+        elif stored_score < -MATE_THRESHOLD:
+            stored_score -= ply
+        self.table.store(
+            position.key, depth, pack_entry(stored_score, bound, best_move)
+        )
+        return best_score
+
+    def get_principal_variation(self, max_length: int) -> List[int]:
+        position = self.position
+        moves = []
+        while len(moves) < max_length:
+            entry = self.table.probe(position.key)
+            if entry is None:
+                break
+            move = unpack_entry(entry[1])[2]
+            if move not in position.generate_legal_moves():
+                break
+            position.make_move(move)
+            moves.append(move)
+        for _ in moves:
+            position.unmake_move()
+        return moves
+
+    def search(
+        self,
+        max_depth: int = MAX_PLY,
+        on_iteration: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        start = time.monotonic()
+        moves = self.position.generate_legal_moves()
+        result = {
+            "bestMove": None,
+            "score": None,
+            "mate": None,
+            "depth": 0,
+            "pv": [],
+        }
+        if not moves:
+            result["score"] = -MATE_SCORE if self.position.is_in_check() else 0
+            result["mate"] = get_mate_distance(result["score"])
+        else:
+            # Reported if not even the first iteration finishes in time.
+            result["bestMove"] = move_to_uci(self.order_moves(moves, 0, 0)[0])
+            for depth in range(1, min(max_depth, MAX_PLY) + 1):
+                if time.monotonic() >= self.deadline:
+                    break
+                self.root_move = 0
+                try:
+                    score = self.negamax(depth, -INFINITY, INFINITY, 0)
+                except SearchTimeout:
+                    # Only completed iterations are reported; the position is
+                    # unwound to the root before the next use.
+                    while len(self.position.history) > self.root_history_length:
+                        self.position.unmake_move()
+                    break
+                pv = self.get_principal_variation(depth)
+                result.update(
+                    bestMove=move_to_uci(self.root_move),
+                    score=score,
+                    mate=get_mate_distance(score),
+                    depth=depth,
+                    pv=[move_to_uci(move) for move in pv],
+                )
+                if on_iteration is not None:
+                    elapsed = time.monotonic() - start
+                    on_iteration(dict(result, nodes=self.nodes, elapsedSeconds=elapsed))
+                if abs(score) > MATE_THRESHOLD:
+                    break
+        elapsed = time.monotonic() - start
+        result["nodes"] = self.nodes
+        result["elapsedSeconds"] = elapsed
+        result["nodesPerSecond"] = int(self.nodes / elapsed) if elapsed else None
+        return result
+
+
+def get_mate_distance(score: int) -> Optional[int]:
+    # Moves (not plies) until mate, negative when the side to move is mated.
+    if score > MATE_THRESHOLD:
+        return (MATE_SCORE - score + 1) // 2
+    if score < -MATE_THRESHOLD:
+        return -((MATE_SCORE + score) // 2)
+    return None
+
+
+def search_best_move(
+    position: Position,
+    movetime: float,
+    max_depth: int = MAX_PLY,
+    table: Optional[TranspositionTable] = None,
+    cancelled: Optional[threading.Event] = None,
+    on_iteration: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    return Searcher(position, time.monotonic() + movetime, table, cancelled).search(
+        max_depth, on_iteration
+    )
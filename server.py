@@ -0,0 +1,359 @@
+import argparse
+import json
+import os
+import select
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import urllib.request
+from typing import Callable, Dict, List, Optional
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+ROOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_TIMEOUT = 10.0
+GRACEFUL_TIMEOUT = 30.0
+KEEPALIVE_TIMEOUT = 5.0
+
+
+def load_app():
+    from app import app
+
+    return app
+
+
+def report(event: str, **fields):
+    print(json.dumps(dict(event=event, **fields)), flush=True)
+
+
+def get_memory_usage(pid: int) -> Dict[str, int]:
+    # Pss splits shared pages between the processes mapping them, so unlike
+    # Rss it shows what copy-on-write sharing of the tables actually saves.
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps:
+            for line in smaps:
+                name, _, value = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    usage[f"{name.lower()}Kb"] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def create_listening_socket(host: str, port: int, backlog: int = 128) -> socket.socket:
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    return listener
+
+
+class WorkerRequestHandler(WSGIRequestHandler):
+    # Idle keep-alive connections are dropped after this long, so that a
+    # stopping worker does not wait for clients that never close.
+    timeout = KEEPALIVE_TIMEOUT
+
+
+def run_worker(listener: socket.socket, app, heartbeat_fd: int):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    if app is None:
+        app = load_app()
+    host, port = listener.getsockname()
+    server = make_server(
+        host,
+        port,
+        app,
+        threaded=True,
+        request_handler=WorkerRequestHandler,
+        fd=listener.fileno(),
+    )
+    # Requests in flight are joined on server_close instead of being cut off.
+    server.daemon_threads = False
+    server.block_on_close = True
+
+    last_heartbeat = 0.0
+
+    def send_heartbeat():
+        # Called by serve_forever between polls, so heartbeats stop when the
+        # serving loop itself is stuck.
+        nonlocal last_heartbeat
+        now = time.monotonic()
+        if now - last_heartbeat >= HEARTBEAT_INTERVAL:
+            last_heartbeat = now
+            try:
+                os.write(heartbeat_fd, b".")
+            except BlockingIOError:
+                pass
+
+    server.service_actions = send_heartbeat
+    signal.signal(
+        signal.SIGTERM,
+        lambda signum, frame: threading.Thread(target=server.shutdown).start(),
+    )
+    send_heartbeat()
+    server.serve_forever(poll_interval=HEARTBEAT_INTERVAL / 2)
+    server.server_close()
+
+
+class Worker:
+    def __init__(self, pid: int, heartbeat_fd: int):
+        self.pid = pid
+        self.heartbeat_fd = heartbeat_fd
+        self.started = time.monotonic()
+        self.last_heartbeat: Optional[float] = None
+        self.retiring = False
+
+
+class PreforkServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        workers: int = 2,
+        preload: bool = True,
+        app_loader: Callable[[], object] = load_app,
+        heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+        graceful_timeout: float = GRACEFUL_TIMEOUT,
+    ):
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.preload = preload
+        self.app_loader = app_loader
+        self.heartbeat_timeout = heartbeat_timeout
+        self.graceful_timeout = graceful_timeout
+        self.listener: Optional[socket.socket] = None
+        self.app = None
+        self.workers: Dict[int, Worker] = {}
+        self.stopping = False
+        self.reload_requested = False
+        self.ready = False
+
+    def spawn_worker(self):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                os.close(read_fd)
+                for worker in self.workers.values():
+                    os.close(worker.heartbeat_fd)
+                os.set_blocking(write_fd, False)
+                run_worker(self.listener, self.app, write_fd)
+            except BaseException:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        os.close(write_fd)
+        os.set_blocking(read_fd, False)
+        self.workers[pid] = Worker(pid, read_fd)
+
+    def get_active_workers(self) -> List[Worker]:
+        return [worker for worker in self.workers.values() if not worker.retiring]
+
+    def read_heartbeats(self, timeout: float):
+        heartbeat_fds = {
+            worker.heartbeat_fd: worker for worker in self.workers.values()
+        }
+        try:
+            readable, _, _ = select.select(list(heartbeat_fds), [], [], timeout)
+        except InterruptedError:
+            return
+        now = time.monotonic()
+        for heartbeat_fd in readable:
+            try:
+                data = os.read(heartbeat_fd, 4096)
+            except BlockingIOError:
+                continue
+            if data:
+                heartbeat_fds[heartbeat_fd].last_heartbeat = now
+
+    def reap_workers(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            os.close(worker.heartbeat_fd)
+            if not worker.retiring and not self.stopping:
+                report("worker_exited", pid=pid, status=status)
+                self.spawn_worker()
+
+    def check_health(self):
+        now = time.monotonic()
+        for worker in self.get_active_workers():
+            last_seen = worker.last_heartbeat or worker.started
+            if now - last_seen > self.heartbeat_timeout:
+                report("worker_timeout", pid=worker.pid)
+                os.kill(worker.pid, signal.SIGKILL)
+                worker.retiring = True
+                self.spawn_worker()
+
+    def reload(self):
+        # New workers start before the old ones are asked to finish their
+        # requests, so the shared socket always has someone accepting.
+        self.reload_requested = False
+        self.ready = False
+        old_workers = self.get_active_workers()
+        for _ in range(self.worker_count):
+            self.spawn_worker()
+        for worker in old_workers:
+            worker.retiring = True
+            os.kill(worker.pid, signal.SIGTERM)
+        report("reloading", retiring=[worker.pid for worker in old_workers])
+
+    def check_ready(self):
+        active_workers = self.get_active_workers()
+        if self.ready or not all(worker.last_heartbeat for worker in active_workers):
+            return
+        self.ready = True
+        host, port = self.listener.getsockname()
+        report(
+            "ready",
+            url=f"http://{host}:{port}",
+            master=os.getpid(),
+            preload=self.preload,
+            workers={
+                worker.pid: get_memory_usage(worker.pid) for worker in active_workers
+            },
+        )
+
+    def stop(self):
+        for worker in self.workers.values():
+            os.kill(worker.pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.05)
+        for worker in list(self.workers.values()):
+            os.kill(worker.pid, signal.SIGKILL)
+            os.waitpid(worker.pid, 0)
+            os.close(worker.heartbeat_fd)
+        self.workers.clear()
+        self.listener.close()
+        report("stopped")
+
+    def request_stop(self, signum, frame):
+        self.stopping = True
+
+    def request_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def serve_forever(self):
+        self.listener = create_listening_socket(self.host, self.port)
+        if self.preload:
+            # Everything built while importing the app lives in the master and
+            # is shared copy-on-write by every forked worker.
+            self.app = self.app_loader()
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGHUP, self.request_reload)
+        for _ in range(self.worker_count):
+            self.spawn_worker()
+        while not self.stopping:
+            self.read_heartbeats(HEARTBEAT_INTERVAL / 2)
+            self.reap_workers()
+            self.check_health()
+            if self.reload_requested:
+                self.reload()
+            self.check_ready()
+        self.stop()
+
+
+def measure_worker_memory(
+    workers: int, preload: bool, table_store: bool = True, timeout: float = 60.0
+) -> dict:
+    environment = dict(os.environ)
+    if not table_store:
+        environment["CHESS_TABLE_STORE"] = ""
+    command = [sys.executable, "-m", "server", "--port", "0"]
+    command += ["--workers", str(workers)]
+    if not preload:
+        command.append("--no-preload")
+    process = subprocess.Popen(
+        command,
+        cwd=ROOT_DIRECTORY,
+        env=environment,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        ready = None
+        while ready is None:
+            if time.monotonic() > deadline:
+                raise TimeoutError("server did not become ready")
+            line = process.stdout.readline()
+            if not line:
+                raise RuntimeError("server exited before becoming ready")
+            event = json.loads(line)
+            if event["event"] == "ready":
+                ready = event
+        for _ in range(workers * 4):
+            with urllib.request.urlopen(f"{ready['url']}/api/v1/queen/d4") as response:
+                response.read()
+        usages = [get_memory_usage(int(pid)) for pid in ready["workers"]]
+        master_usage = get_memory_usage(ready["master"])
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout)
+    return {
+        "workers": workers,
+        "preload": preload,
+        "tableStore": table_store,
+        "master": master_usage,
+        "meanWorkerRssKb": statistics.mean(usage.get("rssKb", 0) for usage in usages),
+        "meanWorkerPssKb": statistics.mean(usage.get("pssKb", 0) for usage in usages),
+    }
+
+
+def compare_worker_memory(workers: int) -> dict:
+    shared = measure_worker_memory(workers, preload=True)
+    unshared = measure_worker_memory(workers, preload=False, table_store=False)
+    return {
+        "shared": shared,
+        "unshared": unshared,
+        "pssSavedPerWorkerKb": unshared["meanWorkerPssKb"] - shared["meanWorkerPssKb"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-forking server for the app.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--no-preload",
+        dest="preload",
+        action="store_false",
+        help="import the app in every worker instead of once in the master",
+    )
+    parser.add_argument(
+        "--memory-report",
+        action="store_true",
+        help="compare per-worker memory with and without shared tables and exit",
+    )
+    args = parser.parse_args(argv)
+    if args.memory_report:
+        print(json.dumps(compare_worker_memory(args.workers), indent=2))
+        return 0
+    PreforkServer(args.host, args.port, args.workers, args.preload).serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import argparse
+import hashlib
+import itertools
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+FORMAT_MAGIC = b"CHESSTBL"
+FORMAT_VERSION = 1
+# magic, version, section count, source fingerprint, payload checksum
+HEADER = struct.Struct("<8sII16s16s")
+# name, typecode, offset, length in bytes
+SECTION = struct.Struct("<24s8sQQ")
+SECTION_ALIGNMENT = 8
+
+SOURCE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+# The tables are derived from these modules, so editing any of them makes an
+# existing file stale.
+SOURCE_FILES = (
+    "bitboard.py",
+    "move_tables.py",
+    "magic_bitboards.py",
+    "distance_tables.py",
+    "table_store.py",
+)
+# Typecode and item count of every section. The checksum only catches
+# accidental damage, so a file whose sections differ from these is rejected
+# instead of being sliced out of bounds.
+SECTION_SHAPES = {
+    "rook_attacks": ("Q", 102400),
+    "bishop_attacks": ("Q", 5248),
+    **{
+        f"distance_{figure}": ("B", 64 * 64)
+        for figure in ("bishop", "king", "knight", "queen", "rook")
+    },
+    **{f"distance_pawn_{color}": ("B", 64 * 64) for color in ("whites", "blacks")},
+}
+
+
+def get_cache_directory() -> str:
+    # Per user, so that other local users cannot read, replace or pre-seed
+    # the files kept there.
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "chess-api")
+
+
+DEFAULT_PATH = os.path.join(get_cache_directory(), "tables.bin")
+
+_default_table_store = None
+_default_table_store_opened = False
+
+
+def get_source_fingerprint() -> bytes:
+    digest = hashlib.blake2b(struct.pack("<I", FORMAT_VERSION), digest_size=16)
+    digest.update(sys.byteorder.encode())
+    for name in SOURCE_FILES:
+        with open(os.path.join(SOURCE_DIRECTORY, name), "rb") as source:
+            digest.update(source.read())
+    return digest.digest()
+
+
+def write_table_store(path: str, sections: Dict[str, Tuple[str, bytes]]):
+    section_table = []
+    payload = bytearray()
+    offset = HEADER.size + SECTION.size * len(sections)
+    for name, (typecode, data) in sections.items():
+        padding = -(offset + len(payload)) % SECTION_ALIGNMENT
+        payload += bytes(padding)
+        section_table.append(
+            SECTION.pack(
+                name.encode(), typecode.encode(), offset + len(payload), len(data)
+            )
+        )
+        payload += data
+    body = b"".join(section_table) + payload
+    header = HEADER.pack(
+        FORMAT_MAGIC,
+        FORMAT_VERSION,
+        len(sections),
+        get_source_fingerprint(),
+        hashlib.blake2b(body, digest_size=16).digest(),
+    )
+    # Written to a fresh file next to the target and renamed, so that
+    # concurrently starting workers never map a half-written file.
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(header + body)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+class TableStore:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.mmap)
+        if len(view) < HEADER.size:
+            raise ValueError("table store is corrupt")
+        magic, version, section_count, fingerprint, checksum = HEADER.unpack_from(view)
+        if magic != FORMAT_MAGIC:
+            raise ValueError("table store is corrupt")
+        if version != FORMAT_VERSION or fingerprint != get_source_fingerprint():
+            raise ValueError("table store is stale")
+        body = view[HEADER.size :]  # noqa: E203
+        if hashlib.blake2b(body, digest_size=16).digest() != checksum:
+            raise ValueError("table store is corrupt")
+
+        # Sections are handed out as typed views into the mapping, so tables
+        # are never copied and forked workers share the same pages.
+        self.sections: Dict[str, memoryview] = {}
+        if HEADER.size + SECTION.size * section_count > len(view):
+            raise ValueError("table store is corrupt")
+        for index in range(section_count):
+            name, typecode, offset, length = SECTION.unpack_from(
+                view, HEADER.size + SECTION.size * index
+            )
+            name = name.rstrip(b"\0").decode()
+            typecode = typecode.rstrip(b"\0").decode()
+            shape = SECTION_SHAPES.get(name)
+            if (
+                shape is None
+                or shape[0] != typecode
+                or length != shape[1] * struct.calcsize(typecode)
+                or offset < HEADER.size
+                or offset + length > len(view)
+            ):
+                raise ValueError("table store is corrupt")
+            self.sections[name] = view[offset : offset + length].cast(  # noqa: E203
+                typecode
+            )
+        if set(self.sections) != set(SECTION_SHAPES):
+            raise ValueError("table store is corrupt")
+
+    def get_section(self, name: str) -> Optional[memoryview]:
+        return self.sections.get(name)
+
+
+def get_table_store_path() -> str:
+    return os.environ.get("CHESS_TABLE_STORE", DEFAULT_PATH)
+
+
+def get_default_table_store() -> Optional[TableStore]:
+    global _default_table_store, _default_table_store_opened
+    if not _default_table_store_opened:
+        _default_table_store_opened = True
+        path = get_table_store_path()
+        if path:
+            try:
+                _default_table_store = TableStore(path)
+            except (OSError, ValueError):
+                _default_table_store = None
+    return _default_table_store
+
+
+def load_table(name: str) -> Optional[memoryview]:
+    table_store = get_default_table_store()
+    return table_store.get_section(name) if table_store is not None else None
+
+
+def collect_tables() -> Dict[str, Tuple[str, bytes]]:
+    from distance_tables import DISTANCE_TABLES, PAWN_DISTANCE_TABLES
+    from magic_bitboards import BISHOP_ATTACKS, ROOK_ATTACKS
+
+    sections = {}
+    for name, attack_table in (("rook", ROOK_ATTACKS), ("bishop", BISHOP_ATTACKS)):
+        attacks = array("Q", itertools.chain.from_iterable(attack_table.attacks))
+        sections[f"{name}_attacks"] = ("Q", attacks.tobytes())
+    for figure, distance_table in DISTANCE_TABLES.items():
+        sections[f"distance_{figure}"] = ("B", bytes(distance_table.distances))
+    for color, distance_table in PAWN_DISTANCE_TABLES.items():
+        sections[f"distance_pawn_{color}"] = ("B", bytes(distance_table.distances))
+    return sections
+
+
+def ensure_table_store(path: str) -> TableStore:
+    table_store = get_default_table_store()
+    if table_store is not None and table_store.path == path:
+        return table_store
+    try:
+        return TableStore(path)
+    except (OSError, ValueError):
+        write_table_store(path, collect_tables())
+        return TableStore(path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Build the precomputed table file loaded at startup."
+    )
+    parser.add_argument("--path", default=get_table_store_path())
+    args = parser.parse_args(argv)
+    write_table_store(args.path, collect_tables())
+    print(f"{args.path}: {os.path.getsize(args.path)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
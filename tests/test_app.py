@@ -1,5 +1,13 @@
+import json
+import threading
+import time
+
+import move_responses
 import pytest
-from app import app
+from app import app, create_app, get_chess_figure_class
+from figures import Knight
+from job_pool import JobPool
+from jobs import JobManager
 
 
 @pytest.fixture()
@@ -8,6 +16,12 @@ def client():
         yield client
 
 
+def test_get_chess_figure_class():
+    assert get_chess_figure_class("knight") is Knight
+    assert get_chess_figure_class("KNIGHT") is Knight
+    assert get_chess_figure_class("dragon") is None
+
+
 def test_get_list_available_moves_invalid_figure(client):
     response = client.get("/api/v1/non_existing_figure/a4")
     data = response.json
@@ -200,3 +214,615 @@ def test_validate_move_invalid_for_both_color_pawn(client):
     assert "current move is not permitted" in data["error"]["forBlacks"]
     assert "current move is not permitted" in data["error"]["forWhites"]
     assert response.status_code == 200
+
+
+def test_batch_mixed_queries(client):
+    response = client.post(
+        "/api/v1/batch",
+        json={
+            "queries": [
+                {"figure": "knight", "currentField": "d4"},
+                {"figure": "queen", "currentField": "d4", "destField": "e5"},
+                {"figure": "pawn", "currentField": "a2", "destField": "a4"},
+            ]
+        },
+    )
+    data = response.json
+    assert response.status_code == 200
+    assert [result["status"] for result in data["results"]] == [200, 200, 200]
+    assert data["results"][0]["response"] == client.get("/api/v1/knight/d4").json
+    assert data["results"][1]["response"]["move"] == "valid"
+    assert data["results"][2]["response"]["move"]["forWhites"] == "valid"
+
+
+def test_batch_per_item_errors(client):
+    response = client.post(
+        "/api/v1/batch",
+        json={
+            "queries": [
+                {"figure": "dragon", "currentField": "a4"},
+                {"figure": "king", "currentField": "a9", "destField": "b5"},
+                {"figure": "king"},
+            ]
+        },
+    )
+    results = response.json["results"]
+    assert response.status_code == 200
+    assert results[0]["status"] == 404
+    assert results[0]["response"]["error"] == "invalid figure"
+    assert results[1]["status"] == 409
+    assert results[1]["response"] == client.get("/api/v1/king/a9/b5").json
+    assert results[2]["status"] == 400
+
+
+def test_batch_resolves_each_figure_class_once(client, monkeypatch):
+    figure_names = []
+
+    def get_figure_class(chess_figure):
+        figure_names.append(chess_figure)
+        return get_chess_figure_class(chess_figure)
+
+    monkeypatch.setattr(move_responses, "get_figure_class", get_figure_class)
+    queries = [
+        {"figure": "knight", "currentField": "d4"},
+        {"figure": "Knight", "currentField": "a1", "destField": "b3"},
+        {"figure": "rook", "currentField": "a1"},
+        {"figure": "KNIGHT", "currentField": "h8"},
+    ]
+    response = client.post("/api/v1/batch", json={"queries": queries})
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json["results"]] == [200] * 4
+    assert figure_names == ["knight", "rook"]
+
+
+def test_batch_invalid_body(client):
+    response = client.post("/api/v1/batch", json={"query": []})
+    assert response.status_code == 400
+    assert response.json["error"] == "invalid batch"
+
+
+def test_batch_size_limit(client):
+    batch_max_size = client.application.config["BATCH_MAX_SIZE"]
+    queries = [{"figure": "rook", "currentField": "a1"}] * (batch_max_size + 1)
+    response = client.post("/api/v1/batch", json={"queries": queries})
+    assert response.status_code == 413
+    assert response.json["results"] == []
+
+
+def test_create_app_serves_the_routes_with_its_own_settings():
+    new_client = create_app({"BATCH_MAX_SIZE": 1}).test_client()
+    assert new_client.get("/api/v1/queen/d4").json["availableMoves"]
+    queries = [{"figure": "rook", "currentField": "a1"}] * 2
+    response = new_client.post("/api/v1/batch", json={"queries": queries})
+    assert response.status_code == 413
+    response = app.test_client().post("/api/v1/batch", json={"queries": queries})
+    assert response.status_code == 200
+
+
+def test_get_list_available_moves_on_board_occupied_fields(client):
+    response = client.get("/api/v1/rook/a1/board/occupancy?occupied=a4,d1")
+    data = response.json
+    assert data["availableMoves"] == ["A2", "A3", "A4", "B1", "C1", "D1"]
+    assert data["error"] is None
+    assert response.status_code == 200
+
+
+def test_get_list_available_moves_on_board_fen_own_pieces(client):
+    fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    response = client.get(
+        "/api/v1/knight/b1/board/occupancy", query_string={"fen": fen}
+    )
+    assert response.json["availableMoves"] == ["A3", "C3"]
+    response = client.get("/api/v1/rook/a1/board/occupancy", query_string={"fen": fen})
+    assert response.json["availableMoves"] == []
+
+
+def test_get_list_available_moves_on_board_pawn(client):
+    response = client.get("/api/v1/pawn/e2/board/occupancy?occupied=e4,d3")
+    data = response.json
+    assert data["availableMoves"]["forWhites"] == ["D3", "E3"]
+    assert data["availableMoves"]["forBlacks"] == ["E1"]
+
+
+def test_get_list_available_moves_on_board_invalid_occupancy(client):
+    response = client.get("/api/v1/queen/d4/board/occupancy?fen=invalid")
+    assert response.json["error"] == "invalid fen"
+    assert response.status_code == 400
+    response = client.get("/api/v1/queen/d4/board/occupancy?occupied=z9")
+    assert response.json["error"] == "invalid occupied fields"
+    assert response.status_code == 400
+
+
+def test_validate_move_to_occupancy_segment_is_not_on_board_route(client):
+    response = client.get("/api/v1/rook/a1/occupancy?occupied=a4")
+    assert response.json["error"] == "destination field does not exist"
+    assert response.status_code == 409
+
+
+def test_validate_move_to_reachable_segment_is_not_reachable_route(client):
+    response = client.get("/api/v1/king/a1/reachable?moves=1")
+    assert response.json["error"] == "destination field does not exist"
+    assert response.status_code == 409
+
+
+def test_get_list_available_moves_on_board_invalid_field(client):
+    response = client.get("/api/v1/queen/d9/board/occupancy?occupied=a1")
+    assert "current field does not exist" in response.json["error"]
+    assert response.status_code == 409
+
+
+def test_get_position_moves_starting_position(client):
+    response = client.get("/api/v1/position/moves")
+    data = response.json
+    assert data["count"] == 20
+    assert "e2e4" in data["moves"]
+    assert data["check"] is False
+    assert data["error"] is None
+    assert response.status_code == 200
+
+
+def test_get_position_moves_invalid_fen(client):
+    response = client.get("/api/v1/position/moves?fen=8/8/8")
+    assert response.json["error"] == "invalid fen"
+    assert response.json["moves"] == []
+    assert response.status_code == 400
+
+
+def test_get_perft(client):
+    response = client.get("/api/v1/perft?depth=2")
+    data = response.json
+    assert data["nodes"] == 400
+    assert data["divide"]["e2e4"] == 20
+    assert data["error"] is None
+    assert response.status_code == 200
+
+
+def test_get_perft_invalid_depth(client):
+    response = client.get("/api/v1/perft?depth=x")
+    assert response.json["error"] == "invalid depth"
+    assert response.status_code == 400
+    response = client.get("/api/v1/perft?depth=99")
+    assert "depth exceeds limit" in response.json["error"]
+    assert response.status_code == 400
+
+
+def test_get_perft_parallel_with_comparison(client):
+    response = client.get("/api/v1/perft?depth=2&workers=2&compare=true")
+    data = response.json
+    assert data["nodes"] == 400
+    assert data["comparison"]["nodes"] == 400
+    assert "speedup" in data["comparison"]
+    assert response.status_code == 200
+
+
+def test_get_perft_comparison_depth_limit(client):
+    response = client.get("/api/v1/perft?depth=5&workers=2&compare=true")
+    assert response.json["error"] == "compare depth exceeds limit of 4"
+    assert response.status_code == 400
+
+
+def test_get_perft_invalid_workers(client):
+    response = client.get("/api/v1/perft?depth=2&workers=0")
+    assert response.json["error"] == "invalid workers"
+    assert response.status_code == 400
+
+
+def test_get_perft_with_hash_table(client):
+    response = client.get("/api/v1/perft?depth=3&hash=1")
+    data = response.json
+    assert data["nodes"] == 8902
+    assert data["hashTable"]["stores"] > 0
+    response = client.get("/api/v1/perft?depth=3&hash=0")
+    assert response.json["error"] == "invalid hash size"
+    assert response.status_code == 400
+
+
+def test_get_bestmove_mate_in_one(client):
+    response = client.get(
+        "/api/v1/position/bestmove?fen=6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+        "&movetime=2000"
+    )
+    data = response.json
+    assert data["bestMove"] == "a1a8"
+    assert data["mate"] == 1
+    assert data["pv"] == ["a1a8"]
+    assert data["depth"] >= 1
+    assert data["movetime"] == 2000
+    assert data["error"] is None
+    assert response.status_code == 200
+
+
+def test_get_bestmove_respects_movetime(client):
+    response = client.get("/api/v1/position/bestmove?movetime=200")
+    data = response.json
+    assert data["bestMove"] in client.get("/api/v1/position/moves").json["moves"]
+    assert data["elapsedSeconds"] < 0.4
+    assert data["nodesPerSecond"] > 0
+    assert response.status_code == 200
+
+
+def test_get_bestmove_invalid_arguments(client):
+    response = client.get("/api/v1/position/bestmove?movetime=x")
+    assert response.json["error"] == "invalid movetime"
+    assert response.status_code == 400
+    response = client.get("/api/v1/position/bestmove?movetime=100000")
+    assert "movetime exceeds limit" in response.json["error"]
+    assert response.status_code == 400
+    response = client.get("/api/v1/position/bestmove?depth=0")
+    assert response.json["error"] == "invalid depth"
+    assert response.status_code == 400
+    response = client.get("/api/v1/position/bestmove?fen=8/8/8")
+    assert response.json["error"] == "invalid fen"
+    assert response.status_code == 400
+
+
+def test_get_bestmove_with_capturable_king_is_rejected(client):
+    response = client.get(
+        "/api/v1/position/bestmove",
+        query_string={"movetime": 50, "fen": "4k3/4Q3/8/8/8/8/8/4K3 w - - 0 1"},
+    )
+    assert response.json["error"] == "invalid fen"
+    assert response.status_code == 400
+
+
+def test_expensive_routes_return_503_when_the_job_pool_is_full(client, monkeypatch):
+    pool = JobPool(1, 0)
+    monkeypatch.setitem(app.extensions, "job_pool", pool)
+    release = threading.Event()
+    pool.submit("block", lambda cancelled: release.wait(), time.monotonic() + 5)
+    response = client.get("/api/v1/perft?depth=1")
+    assert response.json["error"] == "server busy"
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.status_code == 503
+    response = client.get("/api/v1/position/bestmove?movetime=100")
+    assert response.status_code == 503
+    # Cheap routes do not go through the pool.
+    assert client.get("/api/v1/queen/d4").status_code == 200
+    release.set()
+    pool.shutdown()
+
+
+def test_expensive_routes_return_503_after_the_job_timeout(client, monkeypatch):
+    monkeypatch.setitem(app.extensions, "job_pool", JobPool(1, 0))
+    monkeypatch.setitem(app.config, "JOB_TIMEOUT", 0.1)
+    response = client.get("/api/v1/position/bestmove?movetime=5000")
+    assert response.json["error"] == "job deadline exceeded"
+    assert response.status_code == 503
+
+
+def test_identical_expensive_requests_are_coalesced(client):
+    coalescer = app.extensions["coalescer"]
+    cached = coalescer.outcomes.get(("perft", "cached"))
+    fen = "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+    first = client.get(f"/api/v1/perft?depth=2&fen={fen}")
+    second = client.get(f"/api/v1/perft?fen={fen.replace(' ', '  ')}&depth=2")
+    assert second.json == first.json
+    assert coalescer.outcomes.get(("perft", "cached")) == cached + 1
+    assert 'chess_coalescing_requests_total{job="perft"' in client.get(
+        "/metrics"
+    ).get_data(as_text=True)
+
+
+def test_jobs_api(client, monkeypatch, tmp_path):
+    job_manager = JobManager(str(tmp_path / "jobs.sqlite3"), 1, 60, 60, 1)
+    monkeypatch.setitem(app.extensions, "job_manager", job_manager)
+    response = client.post("/api/v1/jobs", json={"type": "perft", "depth": 2})
+    data = response.json
+    assert data["status"] == "queued"
+    assert data["deduplicated"] is False
+    assert response.headers["Location"] == f"/api/v1/jobs/{data['id']}"
+    assert response.status_code == 202
+
+    response = client.post("/api/v1/jobs", json={"type": "perft", "depth": 2})
+    assert response.json["id"] == data["id"]
+    assert response.json["deduplicated"] is True
+    assert response.status_code == 200
+
+    deadline = time.monotonic() + 10
+    while client.get(data["statusUrl"]).json["status"] != "done":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert client.get(data["statusUrl"]).json["progress"] == 1
+    response = client.get(data["resultUrl"])
+    assert response.json["result"]["nodes"] == 400
+    assert response.status_code == 200
+    job_manager.shutdown()
+
+
+def test_jobs_api_errors(client, monkeypatch, tmp_path):
+    job_manager = JobManager(str(tmp_path / "jobs.sqlite3"), 1, 60, 60, 1)
+    monkeypatch.setitem(app.extensions, "job_manager", job_manager)
+    response = client.post("/api/v1/jobs", json={"type": "perft", "depth": 99})
+    assert response.json["error"] == "depth exceeds limit of 8"
+    assert response.status_code == 400
+    response = client.get("/api/v1/jobs/unknown")
+    assert response.json["error"] == "job not found"
+    assert response.status_code == 404
+    response = client.get("/api/v1/jobs/unknown/result")
+    assert response.status_code == 404
+
+    job, _ = job_manager.get_store().create("perft", {"depth": 1}, 60)
+    response = client.get(f"/api/v1/jobs/{job['id']}/result")
+    assert response.json["error"] == "job is not finished"
+    assert response.status_code == 409
+    job_manager.shutdown()
+
+
+def parse_events(response):
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if block:
+            event, data = block.split("\n")
+            events.append(
+                (event.partition(": ")[2], json.loads(data.partition(": ")[2]))
+            )
+    return events
+
+
+def test_stream_perft(client):
+    response = client.get("/api/v1/perft/stream?depth=2")
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    events = parse_events(response)
+    assert len(events) == 21
+    assert all(event == "move" for event, _ in events[:20])
+    assert {"move": "e2e4", "nodes": 20} in [data for _, data in events]
+    assert events[-1][0] == "done"
+    assert events[-1][1]["nodes"] == 400
+
+
+def test_stream_bestmove(client):
+    response = client.get("/api/v1/position/bestmove/stream?movetime=5000&depth=3")
+    events = parse_events(response)
+    assert [data["depth"] for event, data in events if event == "depth"] == [1, 2, 3]
+    assert events[-1][0] == "done"
+    assert events[-1][1]["bestMove"] == events[-2][1]["bestMove"]
+
+
+def test_stream_batch(client):
+    queries = [
+        {"figure": "knight", "currentField": "a1"},
+        {"figure": "rook", "currentField": "a1", "destField": "b2"},
+        "invalid",
+    ]
+    response = client.post("/api/v1/batch/stream", json={"queries": queries})
+    events = parse_events(response)
+    assert [(event, data.get("index")) for event, data in events] == [
+        ("result", 0),
+        ("result", 1),
+        ("result", 2),
+        ("done", None),
+    ]
+    assert events[1][1]["status"] == 200
+    assert events[2][1]["response"] == {"error": "invalid query"}
+    assert events[-1][1] == {"count": 3, "error": None}
+
+
+def test_stalled_streams_leave_workers_for_plain_jobs():
+    stream_app = create_app(
+        {"JOB_POOL_WORKERS": 2, "JOB_QUEUE_SIZE": 0, "STREAM_MAX_JOBS": 1}
+    )
+    stream_client = stream_app.test_client()
+    # Nothing is read from the first stream, which keeps its job running.
+    stalled = stream_client.get("/api/v1/perft/stream?depth=5", buffered=False)
+    assert stalled.status_code == 200
+    response = stream_client.get("/api/v1/perft/stream?depth=2")
+    assert response.json == {"error": "server busy"}
+    assert response.status_code == 503
+    response = stream_client.get("/api/v1/perft?depth=2")
+    assert response.json["nodes"] == 400
+    stalled.close()
+    stream_app.extensions["job_pool"].shutdown()
+
+
+def test_stream_batch_runs_off_the_job_pool(monkeypatch):
+    stream_app = create_app({"JOB_POOL_WORKERS": 1, "JOB_QUEUE_SIZE": 0})
+    monkeypatch.setattr(stream_app.extensions["job_pool"], "max_streams", 0)
+    queries = [{"figure": "knight", "currentField": "a1"}]
+    response = stream_app.test_client().post(
+        "/api/v1/batch/stream", json={"queries": queries}
+    )
+    assert [event for event, _ in parse_events(response)] == ["result", "done"]
+
+
+def test_stream_batch_size_is_capped():
+    stream_client = create_app({"BATCH_STREAM_MAX_SIZE": 1000000}).test_client()
+    queries = [{"figure": "rook", "currentField": "a1"}] * 10001
+    response = stream_client.post("/api/v1/batch/stream", json={"queries": queries})
+    assert response.json == {"count": 0, "error": "batch size exceeds limit of 10000"}
+    assert response.status_code == 413
+
+
+def test_stream_invalid_requests_get_plain_errors(client):
+    response = client.get("/api/v1/perft/stream?depth=x")
+    assert response.json["error"] == "invalid depth"
+    assert response.status_code == 400
+    response = client.get("/api/v1/position/bestmove/stream?movetime=0")
+    assert response.json["error"] == "invalid movetime"
+    assert response.status_code == 400
+    response = client.post("/api/v1/batch/stream", json={"queries": {}})
+    assert response.json["error"] == "invalid batch"
+    assert response.status_code == 400
+
+
+def test_stream_validate(client):
+    lines = [
+        {"figure": "queen", "currentField": "d4", "destField": "e5"},
+        {"figure": "pawn", "currentField": "e2", "destField": "e4"},
+        {"figure": "dragon", "currentField": "d4", "destField": "e5"},
+        {"figure": "rook", "currentField": "a9", "destField": "b5"},
+    ]
+    body = "".join(json.dumps(line) + "\n\n" for line in lines)
+    response = client.post("/api/v1/validate/stream", data=body)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    results = [json.loads(line) for line in response.get_data().splitlines()]
+    assert len(results) == len(lines)
+    for line, result in zip(lines, results):
+        single = client.get(
+            f"/api/v1/{line['figure']}/{line['currentField']}/{line['destField']}"
+        )
+        assert result == {"status": single.status_code, "response": single.json}
+
+
+def test_stream_validate_invalid_lines(client):
+    body = (
+        b"not json\n"
+        b'{"figure": "queen", "currentField": "d4"}\n'
+        + b'{"figure": "%s"}\n' % (b"x" * 5000)
+        + b'{"figure": "knight", "currentField": "b1", "destField": "c3"}'
+    )
+    response = client.post("/api/v1/validate/stream", data=body)
+    results = [json.loads(line) for line in response.get_data().splitlines()]
+    assert results[:3] == [
+        {"status": 400, "response": {"error": "invalid query"}},
+        {"status": 400, "response": {"error": "invalid query"}},
+        {"status": 413, "response": {"error": "line exceeds limit of 4096 bytes"}},
+    ]
+    assert results[3]["response"]["move"] == "valid"
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'chess_validate_stream_lines_total{status="413"}' in text
+    assert "chess_validate_stream_lines_per_second_count" in text
+
+
+def test_get_list_available_moves_etag_and_not_modified(client):
+    response = client.get("/api/v1/rook/h4")
+    etag = response.headers["ETag"]
+    assert not etag.startswith("W/")
+    assert "max-age" in response.headers["Cache-Control"]
+    response = client.get("/api/v1/rook/h4", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_validate_move_cached_response_identical(client):
+    first = client.get("/api/v1/Queen/d4/E5")
+    second = client.get("/api/v1/Queen/d4/E5")
+    assert first.data == second.data
+    assert first.headers["ETag"] == second.headers["ETag"]
+
+
+def test_error_responses_without_etag(client):
+    response = client.get("/api/v1/king/a9/b5")
+    assert response.status_code == 409
+    assert "ETag" not in response.headers
+
+
+def test_get_metrics_records_routes_figures_and_status(client):
+    client.get("/api/v1/knight/d4")
+    client.get("/api/v1/dragon/d4")
+    client.get("/api/v1/rook/a1/a8")
+    response = client.get("/metrics")
+    text = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert (
+        'chess_http_request_duration_seconds_count{route="/api/v1/<chess_figure>'
+        '/<current_field>",figure="knight"}' in text
+    )
+    assert 'figure="invalid"' in text
+    assert 'figure="dragon"' not in text
+    assert (
+        'chess_http_responses_total{route="/api/v1/<chess_figure>/<current_field>'
+        '/<dest_field>",status="200"}' in text
+    )
+    assert "# TYPE chess_move_generation_seconds histogram" in text
+    assert "chess_serialization_seconds_count" in text
+    assert "chess_response_cache_entries" in text
+
+
+def test_metrics_are_kept_per_app():
+    other_app = create_app()
+    other_metrics = other_app.extensions["app_metrics"]
+    app_metrics = app.extensions["app_metrics"]
+    assert other_metrics.request_duration is not app_metrics.request_duration
+    label_values = ("/api/v1/<chess_figure>/<current_field>", "200")
+    responses = app_metrics.responses.get(label_values)
+    assert other_app.test_client().get("/api/v1/bishop/c1").status_code == 200
+    assert other_metrics.responses.get(label_values) == 1
+    assert other_metrics.move_generation_duration.get_count(("bishop",)) == 1
+    assert app_metrics.responses.get(label_values) == responses
+    other_app.extensions["job_pool"].shutdown()
+
+
+def test_post_attacks(client):
+    response = client.post(
+        "/api/v1/attacks",
+        json={
+            "pieces": [
+                {"figure": "rook", "field": "a1"},
+                {"figure": "pawn", "field": "b2", "color": "white"},
+            ],
+            "blockers": ["a2"],
+        },
+    )
+    data = response.json
+    assert response.status_code == 200
+    assert data["error"] is None
+    assert len(data["attacks"]) == 64
+    assert data["attacks"]["B1"] == 1
+    assert data["attacks"]["A3"] == 1
+    assert data["attacks"]["A4"] == 0
+    assert data["controlledFields"][:3] == ["A2", "A3", "B1"]
+    assert data["mask"] == "0x00000000000501fe"
+
+
+def test_post_attacks_invalid_query(client):
+    response = client.post("/api/v1/attacks", json={"pieces": "rook"})
+    assert response.status_code == 400
+    assert response.json["error"] == "invalid attacks query"
+    response = client.post("/api/v1/attacks", json={"pieces": [{"figure": "rook"}]})
+    assert response.json["error"] == "invalid piece"
+    response = client.post(
+        "/api/v1/attacks", json={"pieces": [{"figure": "pawn", "field": "e4"}]}
+    )
+    assert response.status_code == 400
+    assert response.json["error"] == "pawn requires color"
+
+
+def test_post_attacks_too_many_pieces(client):
+    pieces = [{"figure": "king", "field": "e1"}] * 65
+    response = client.post("/api/v1/attacks", json={"pieces": pieces})
+    assert response.status_code == 413
+
+
+def test_get_path_knight(client):
+    response = client.get("/api/v1/knight/a1/path/h8")
+    data = response.json
+    assert response.status_code == 200
+    assert data["distance"] == 6
+    assert data["path"][0] == "A1" and data["path"][-1] == "H8"
+    assert data["error"] is None
+
+
+def test_get_path_unreachable_and_invalid(client):
+    data = client.get("/api/v1/bishop/a1/path/a2").json
+    assert data["distance"] is None
+    assert data["error"] == "destination field is not reachable"
+    assert client.get("/api/v1/dragon/a1/path/a2").status_code == 404
+    response = client.get("/api/v1/rook/a1/path/a9")
+    assert response.status_code == 409
+    assert response.json["error"] == "destination field does not exist"
+
+
+def test_get_path_pawn(client):
+    data = client.get("/api/v1/pawn/e2/path/e4").json
+    assert data["distance"] == {"forWhites": 1, "forBlacks": None}
+    assert data["path"]["forWhites"] == ["E2", "E4"]
+    assert data["error"]["forBlacks"] == "destination field is not reachable"
+
+
+def test_get_reachable(client):
+    data = client.get("/api/v1/king/a1/board/reachable?moves=1").json
+    assert data["reachableFields"] == ["A2", "B1", "B2"]
+    assert data["moves"] == 1
+    data = client.get("/api/v1/pawn/e7/board/reachable?moves=2").json
+    assert data["reachableFields"] == {
+        "forWhites": ["E8"],
+        "forBlacks": ["E4", "E5", "E6"],
+    }
+    data = client.get("/api/v1/pawn/e1/board/reachable?moves=2").json
+    assert data["error"]["forWhites"] == "invalid field for figure"
+    response = client.get("/api/v1/king/a1/board/reachable?moves=-1")
+    assert response.status_code == 400
+    assert response.json["error"] == "invalid moves"
@@ -0,0 +1,282 @@
+import asyncio
+import http.client
+import json
+import threading
+import time
+
+import asgi
+import pytest
+from app import app
+from asgi import AsgiApp, serve
+from coalescing import Coalescer
+from job_pool import JobPool
+from jobs import JobManager
+
+URLS = [
+    "/api/v1/knight/d4",
+    "/api/v1/Knight/a1",
+    "/api/v1/pawn/e2",
+    "/api/v1/pawn/a9",
+    "/api/v1/dragon/d4",
+    "/api/v1/queen/d4/h8",
+    "/api/v1/pawn/e2/e4",
+    "/api/v1/pawn/e1/e2",
+    "/api/v1/rook/a1/b2",
+    "/api/v1/rook/a1/z9",
+    "/api/v1/rook/a1/occupancy",
+    "/api/v1/rook/a1/board/occupancy?occupied=a4,d1",
+    "/api/v1/pawn/e2/board/occupancy?fen=8/8/8/8/8/4p3/4P3/8%20w%20-%20-%200%201",
+    "/api/v1/knight/a1/path/h8",
+    "/api/v1/pawn/a2/path/a5",
+    "/api/v1/king/a1/reachable?moves=1",
+    "/api/v1/king/a1/board/reachable?moves=1",
+    "/api/v1/king/a1/board/reachable?moves=x",
+    "/api/v1/position/moves",
+    "/api/v1/position/moves?fen=invalid",
+    "/api/v1/perft?depth=2",
+    "/api/v1/perft?depth=9",
+    "/api/v1/position/bestmove?movetime=0",
+    "/api/v1/position/bestmove?movetime=99999",
+    "/api/v1/unknown/path/a/b/c",
+]
+
+
+def call_asgi(asgi_app, method, path, body=b"", headers=()):
+    path, _, query_string = path.partition("?")
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path.replace("%20", " "),
+        "query_string": query_string.encode(),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    start, response_body = messages
+    return start["status"], dict(start["headers"]), response_body["body"]
+
+
+@pytest.fixture(scope="module")
+def asgi_app():
+    return AsgiApp()
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_asgi_responses_match_flask(asgi_app, url):
+    flask_response = app.test_client().get(url)
+    status_code, headers, body = call_asgi(asgi_app, "GET", url)
+    assert status_code == flask_response.status_code
+    assert headers[b"content-type"] == b"application/json"
+    if "perft" in url and status_code == 200:
+        flask_payload = flask_response.json
+        payload = json.loads(body)
+        for timing in ("elapsedSeconds", "nodesPerSecond"):
+            del flask_payload[timing], payload[timing]
+        assert payload == flask_payload
+    else:
+        assert body == flask_response.data
+
+
+@pytest.mark.parametrize(
+    "url, data",
+    [
+        ("/api/v1/batch", {"queries": [{"figure": "rook", "currentField": "a1"}]}),
+        ("/api/v1/batch", {"queries": "none"}),
+        ("/api/v1/attacks", {"pieces": [{"figure": "king", "field": "e1"}]}),
+    ],
+)
+def test_asgi_post_responses_match_flask(asgi_app, url, data):
+    flask_response = app.test_client().post(url, json=data)
+    status_code, _, body = call_asgi(asgi_app, "POST", url, json.dumps(data).encode())
+    assert status_code == flask_response.status_code
+    assert body == flask_response.data
+
+
+def test_asgi_internal_errors_match_flask(asgi_app, monkeypatch):
+    def fail(fen):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr("app.build_position_moves_response", fail)
+    monkeypatch.setattr("asgi.build_position_moves_response", fail)
+    flask_response = app.test_client().get("/api/v1/position/moves")
+    status_code, _, body = call_asgi(asgi_app, "GET", "/api/v1/position/moves")
+    assert status_code == flask_response.status_code == 500
+    assert body == flask_response.data
+
+
+def test_asgi_bestmove(asgi_app):
+    status_code, _, body = call_asgi(
+        asgi_app,
+        "GET",
+        "/api/v1/position/bestmove?fen=6k1/5ppp/8/8/8/8/8/R5K1%20w%20-%20-%200%201"
+        "&movetime=2000",
+    )
+    data = json.loads(body)
+    assert data["bestMove"] == "a1a8"
+    assert data["mate"] == 1
+    assert status_code == 200
+
+
+def test_asgi_expensive_routes_use_the_job_pool(monkeypatch):
+    pool = JobPool(1, 0)
+    monkeypatch.setitem(app.extensions, "job_pool", pool)
+    asgi_app = AsgiApp()
+    release = threading.Event()
+    pool.submit("block", lambda cancelled: release.wait(), time.monotonic() + 5)
+    status_code, headers, body = call_asgi(asgi_app, "GET", "/api/v1/perft?depth=1")
+    assert status_code == 503
+    assert json.loads(body) == {"error": "server busy"}
+    assert int(headers[b"retry-after"]) >= 1
+    release.set()
+    pool.shutdown()
+
+    monkeypatch.setitem(app.extensions, "job_pool", JobPool(1, 0))
+    asgi_app = AsgiApp({"JOB_TIMEOUT": 0.1})
+    status_code, _, body = call_asgi(
+        asgi_app, "GET", "/api/v1/position/bestmove?movetime=5000"
+    )
+    assert status_code == 503
+    assert json.loads(body) == {"error": "job deadline exceeded"}
+
+
+def test_asgi_full_pool_still_answers_cached_and_joined_requests(monkeypatch):
+    release = threading.Event()
+    build_perft_args_response = asgi.build_perft_args_response
+
+    def blocking_build(query, config, cancelled):
+        if query.get("depth") == "3":
+            release.wait(5)
+        return build_perft_args_response(query, config, cancelled)
+
+    monkeypatch.setattr(asgi, "build_perft_args_response", blocking_build)
+    monkeypatch.setitem(app.extensions, "job_pool", JobPool(1, 0))
+    monkeypatch.setitem(app.extensions, "coalescer", Coalescer(16, 60))
+    asgi_app = AsgiApp()
+    assert call_asgi(asgi_app, "GET", "/api/v1/perft?depth=2")[0] == 200
+
+    # The only worker is held by a job that a second identical request joins.
+    responses = []
+    requests = [
+        threading.Thread(
+            target=lambda: responses.append(
+                call_asgi(asgi_app, "GET", "/api/v1/perft?depth=3")
+            )
+        )
+        for _ in range(2)
+    ]
+    requests[0].start()
+    deadline = time.monotonic() + 5
+    while not asgi_app.coalescer.flights and time.monotonic() < deadline:
+        time.sleep(0.01)
+    requests[1].start()
+    assert call_asgi(asgi_app, "GET", "/api/v1/perft?depth=2")[0] == 200
+    assert call_asgi(asgi_app, "GET", "/api/v1/perft?depth=1")[0] == 503
+    release.set()
+    for request in requests:
+        request.join()
+    assert [response[0] for response in responses] == [200, 200]
+    app.extensions["job_pool"].shutdown()
+
+
+def test_asgi_jobs(asgi_app, monkeypatch, tmp_path):
+    job_manager = JobManager(str(tmp_path / "jobs.sqlite3"), 1, 60, 60, 1)
+    monkeypatch.setattr(asgi_app, "job_manager", job_manager)
+    status_code, headers, body = call_asgi(
+        asgi_app, "POST", "/api/v1/jobs", b'{"type": "perft", "depth": 1}'
+    )
+    job = json.loads(body)
+    assert headers[b"location"] == job["statusUrl"].encode()
+    assert status_code == 202
+    deadline = time.monotonic() + 10
+    while json.loads(call_asgi(asgi_app, "GET", job["statusUrl"])[2])["status"] != (
+        "done"
+    ):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    status_code, _, body = call_asgi(asgi_app, "GET", job["resultUrl"])
+    assert json.loads(body)["result"]["nodes"] == 20
+    assert call_asgi(asgi_app, "GET", "/api/v1/jobs/unknown")[0] == 404
+    assert call_asgi(asgi_app, "GET", "/api/v1")[0] == 404
+    job_manager.shutdown()
+
+
+def test_asgi_etag_and_not_modified(asgi_app):
+    _, headers, _ = call_asgi(asgi_app, "GET", "/api/v1/queen/a1")
+    etag = headers[b"etag"].decode()
+    assert etag == app.test_client().get("/api/v1/queen/a1").headers["ETag"]
+    status_code, headers, body = call_asgi(
+        asgi_app, "GET", "/api/v1/queen/a1", headers=[("If-None-Match", etag)]
+    )
+    assert status_code == 304
+    assert body == b""
+    assert headers[b"cache-control"] == b"public, max-age=86400"
+
+
+def test_asgi_method_not_allowed(asgi_app):
+    status_code, _, _ = call_asgi(asgi_app, "DELETE", "/api/v1/queen/a1")
+    assert status_code == 405
+
+
+def run_server(asgi_app):
+    started = threading.Event()
+    address = []
+    loop = asyncio.new_event_loop()
+
+    def ready(sockname):
+        address.extend(sockname[:2])
+        started.set()
+
+    thread = threading.Thread(
+        target=lambda: loop.run_until_complete(serve(asgi_app, "127.0.0.1", 0, ready)),
+        daemon=True,
+    )
+    thread.start()
+    started.wait(5)
+    return address
+
+
+def test_bundled_server_keeps_connections_alive(asgi_app):
+    host, port = run_server(asgi_app)
+    connection = http.client.HTTPConnection(host, port, timeout=5)
+    for url in ("/api/v1/knight/d4", "/api/v1/queen/d4/h8"):
+        connection.request("GET", url)
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.read() == app.test_client().get(url).data
+    connection.close()
+
+
+def test_bundled_server_streams_chunked_bodies():
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for chunk in (b"first\n", b"second\n"):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    host, port = run_server(streaming_app)
+    connection = http.client.HTTPConnection(host, port, timeout=5)
+    connection.request("GET", "/")
+    response = connection.getresponse()
+    assert response.getheader("Transfer-Encoding") == "chunked"
+    assert response.read() == b"first\nsecond\n"
+    connection.close()
+
+
+def test_bundled_server_answers_failing_apps_with_500():
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    host, port = run_server(failing_app)
+    connection = http.client.HTTPConnection(host, port, timeout=5)
+    connection.request("GET", "/")
+    response = connection.getresponse()
+    assert response.status == 500
+    assert response.read() == b""
+    connection.close()
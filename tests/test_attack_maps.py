@@ -0,0 +1,58 @@
+import random
+
+import pytest
+from attack_maps import add_to_counters, build_attack_map, counts_from_counters
+from bitboard import FIELDS, bitboard_from_fields
+
+
+def test_bit_sliced_counters_match_naive_sums():
+    rng = random.Random(7)
+    bitboards = [rng.getrandbits(64) for _ in range(40)]
+    counters = []
+    for attacks in bitboards:
+        add_to_counters(counters, attacks)
+    expected = [
+        sum(attacks >> square & 1 for attacks in bitboards) for square in range(64)
+    ]
+    assert counts_from_counters(counters) == expected
+
+
+def test_build_attack_map_counts_and_union():
+    counts, union = build_attack_map(
+        [("knight", "b1", None), ("knight", "g1", None), ("pawn", "e2", "white")]
+    )
+    assert counts[FIELDS.index("D2")] == 1
+    assert counts[FIELDS.index("F3")] == 2
+    assert counts[FIELDS.index("E2")] == 1
+    assert union == bitboard_from_fields(["A3", "C3", "D2", "D3", "E2", "F3", "H3"])
+
+
+def test_build_attack_map_pawn_attacks_diagonals_per_color():
+    _, white_union = build_attack_map([("pawn", "d4", "white")])
+    _, black_union = build_attack_map([("pawn", "d4", "BLACK")])
+    assert white_union == bitboard_from_fields(["C5", "E5"])
+    assert black_union == bitboard_from_fields(["C3", "E3"])
+
+
+def test_build_attack_map_blockers_and_pieces_stop_rays():
+    _, union = build_attack_map([("rook", "a1", None)], ["a3"])
+    assert union == bitboard_from_fields(["A2", "A3"] + [f"{c}1" for c in "BCDEFGH"])
+    counts, _ = build_attack_map([("rook", "a1", None), ("rook", "c1", None)])
+    assert counts[FIELDS.index("B1")] == 2
+    assert counts[FIELDS.index("D1")] == 1
+    assert counts[FIELDS.index("C1")] == 1
+
+
+@pytest.mark.parametrize(
+    "pieces, blockers, error",
+    [
+        ([("dragon", "a1", None)], [], "invalid figure"),
+        ([("rook", "a9", None)], [], "current field does not exist"),
+        ([("pawn", "a2", None)], [], "pawn requires color"),
+        ([("pawn", "a2", "green")], [], "invalid color"),
+        ([("rook", "a1", None)], ["z1"], "invalid blockers"),
+    ],
+)
+def test_build_attack_map_errors(pieces, blockers, error):
+    with pytest.raises(ValueError, match=error):
+        build_attack_map(pieces, blockers)
@@ -0,0 +1,45 @@
+import json
+from benchmarks.bench import compare_results, main, percentile, time_benchmark
+
+
+def test_percentile():
+    values = [4.0, 1.0, 3.0, 2.0, 5.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 100) == 5.0
+    assert percentile(values, 90) == 4.6
+
+
+def test_time_benchmark_stats():
+    stats = time_benchmark(lambda: None, warmup=1, repetitions=3, number=5)
+    assert stats["repetitions"] == 3
+    assert stats["min"] <= stats["median"] <= stats["max"]
+
+
+def test_compare_results_flags_regressions():
+    baseline = {"results": {"a": {"median": 1.0}, "b": {"median": 1.0}}}
+    current = {"results": {"a": {"median": 1.05}, "b": {"median": 1.5}, "c": {}}}
+    comparison = compare_results(baseline, current, threshold=0.1)
+    assert [row["name"] for row in comparison] == ["a", "b"]
+    assert [row["regression"] for row in comparison] == [False, True]
+
+
+def test_main_run_writes_baseline(tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    arguments = ["--baseline", str(baseline_path), "--warmup", "1"]
+    arguments += ["--repetitions", "2", "--number", "1", "--only", "chessboard"]
+    assert main(["run"] + arguments) == 0
+    baseline = json.loads(baseline_path.read_text())
+    assert set(baseline["results"]) == {
+        "chessboard.check_if_field_in_chessboard",
+        "chessboard.get_field_after_move",
+    }
+    assert main(["compare", "--threshold", "1000"] + arguments) == 0
+
+
+def test_measure_cold_start_without_table_store():
+    from benchmarks.cold_start import measure_cold_start
+
+    stats = measure_cold_start("", runs=1)
+    assert stats["runs"] == 1
+    assert 0 < stats["importToFirstResponseSeconds"] < stats["processSeconds"]
@@ -0,0 +1,39 @@
+import pytest
+import bitboard
+
+
+def test_fields_and_squares():
+    assert len(bitboard.FIELDS) == 64
+    assert bitboard.square_from_field("A1") == 0
+    assert bitboard.square_from_field("h8") == 63
+    assert bitboard.square_from_field("E4") == 28
+    assert bitboard.square_from_field("Z9") is None
+    assert bitboard.field_from_square(28) == "E4"
+
+
+def test_shift_does_not_wrap_around_board_edges():
+    h4 = bitboard.square_bitboard(bitboard.square_from_field("H4"))
+    a4 = bitboard.square_bitboard(bitboard.square_from_field("A4"))
+    a8 = bitboard.square_bitboard(bitboard.square_from_field("A8"))
+    assert bitboard.shift(h4, bitboard.RIGHT) == bitboard.EMPTY
+    assert bitboard.shift(a4, bitboard.LEFT) == bitboard.EMPTY
+    assert bitboard.shift(a8, bitboard.UP_RIGHT) == bitboard.EMPTY
+    assert bitboard.shift(a4, bitboard.DOWN_RIGHT) == bitboard.bitboard_from_fields(
+        ["B3"]
+    )
+
+
+def test_iterate_and_count_squares():
+    squares = bitboard.bitboard_from_fields(["A1", "C3", "H8"])
+    assert list(bitboard.iterate_squares(squares)) == [0, 18, 63]
+    assert bitboard.count_squares(squares) == 3
+
+
+def test_bitboard_from_fields_invalid_field():
+    with pytest.raises(ValueError):
+        bitboard.bitboard_from_fields(["A1", "I9"])
+
+
+def test_fields_from_bitboard_sorted_by_name():
+    squares = bitboard.bitboard_from_fields(["B1", "A2", "A1"])
+    assert bitboard.fields_from_bitboard(squares) == ["A1", "A2", "B1"]
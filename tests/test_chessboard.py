@@ -89,3 +89,10 @@ def test_get_field_after_move():
     assert Chessboard.get_field_after_move("B2", 2, 2) == "D4"
     assert Chessboard.get_field_after_move("C8", -1, -1) == "B7"
     assert Chessboard.get_field_after_move("C3", -1, 2) == "B5"
+
+
+def test_get_square_from_field_and_back():
+    assert Chessboard.get_square_from_field("b3") == 17
+    assert Chessboard.get_square_from_field("B9") is None
+    assert Chessboard.get_field_from_square(17) == "B3"
+    assert Chessboard.get_fields_from_bitboard((1 << 17) | 1) == ["A1", "B3"]
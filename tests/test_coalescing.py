@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+from coalescing import Coalescer
+from job_pool import JobCancelled
+from metrics import MetricsRegistry
+
+
+def test_coalescer_shares_one_computation():
+    coalescer = Coalescer(16, 60)
+    release = threading.Event()
+    calls = []
+
+    def compute(is_abandoned):
+        calls.append(1)
+        release.wait()
+        return "result"
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(coalescer.run("job", "key", compute))
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    while coalescer.outcomes.get(("job", "coalesced")) < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert coalescer.outcomes.get(("job", "computed")) == 1
+
+
+def test_coalescer_caches_results_until_the_ttl():
+    registry = MetricsRegistry()
+    coalescer = Coalescer(16, 0.1, registry)
+    calls = []
+
+    def compute(is_abandoned):
+        calls.append(1)
+        return len(calls)
+
+    assert coalescer.run("job", "key", compute) == 1
+    assert coalescer.run("job", "key", compute) == 1
+    assert 'chess_coalescing_requests_total{job="job",outcome="cached"} 1' in (
+        registry.render()
+    )
+    time.sleep(0.15)
+    assert coalescer.run("job", "key", compute) == 2
+
+
+def test_coalescer_evicts_least_recently_used_results():
+    coalescer = Coalescer(2, 60)
+    coalescer.run("job", "a", lambda is_abandoned: "a")
+    coalescer.run("job", "b", lambda is_abandoned: "b")
+    coalescer.run("job", "a", lambda is_abandoned: "new a")
+    coalescer.run("job", "c", lambda is_abandoned: "c")
+    assert list(coalescer.results) == ["a", "c"]
+
+
+def test_coalescer_does_not_cache_exceptions():
+    coalescer = Coalescer(16, 60)
+
+    def fail(is_abandoned):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        coalescer.run("job", "key", fail)
+    assert coalescer.run("job", "key", lambda is_abandoned: "ok") == "ok"
+
+
+def test_coalescer_without_ttl_only_coalesces():
+    coalescer = Coalescer(16, 0)
+    coalescer.run("job", "key", lambda is_abandoned: "result")
+    assert not coalescer.results
+
+
+def test_coalescer_abandons_only_when_every_client_left():
+    coalescer = Coalescer(16, 60)
+    leader_disconnected = threading.Event()
+    follower_disconnected = threading.Event()
+    abandoned = threading.Event()
+
+    def compute(is_abandoned):
+        while not is_abandoned():
+            time.sleep(0.01)
+        abandoned.set()
+        raise JobCancelled("client disconnected")
+
+    follower_errors = []
+
+    def follow():
+        try:
+            coalescer.run("job", "key", compute, follower_disconnected.is_set)
+        except JobCancelled as e:
+            follower_errors.append(e)
+
+    leader = threading.Thread(
+        target=follow_leader, args=(coalescer, compute, leader_disconnected.is_set)
+    )
+    leader.start()
+    while "key" not in coalescer.flights:
+        time.sleep(0.01)
+    follower = threading.Thread(target=follow)
+    follower.start()
+    while coalescer.flights["key"].waiters < 2:
+        time.sleep(0.01)
+    leader_disconnected.set()
+    assert not abandoned.wait(0.2)
+    follower_disconnected.set()
+    assert abandoned.wait(1)
+    leader.join()
+    follower.join()
+    assert len(follower_errors) == 1
+
+
+def follow_leader(coalescer, compute, is_disconnected):
+    with pytest.raises(JobCancelled):
+        coalescer.run("job", "key", compute, is_disconnected)
@@ -0,0 +1,58 @@
+from bitboard import get_column, get_row
+from distance_tables import DISTANCE_TABLES, PAWN_DISTANCE_TABLES, UNREACHABLE
+
+
+def test_king_distance_is_chebyshev_distance():
+    for source in range(64):
+        for dest in range(64):
+            assert DISTANCE_TABLES["king"].get_distance(source, dest) == max(
+                abs(get_column(source) - get_column(dest)),
+                abs(get_row(source) - get_row(dest)),
+            )
+
+
+def test_bishop_never_changes_square_color():
+    for source in range(64):
+        for dest in range(64):
+            distance = DISTANCE_TABLES["bishop"].get_distance(source, dest)
+            same_color = (get_column(source) + get_row(source)) % 2 == (
+                get_column(dest) + get_row(dest)
+            ) % 2
+            assert (distance is not None) == same_color
+            assert distance is None or distance <= 2
+
+
+def test_knight_corner_to_corner():
+    assert DISTANCE_TABLES["knight"].get_distance(0, 63) == 6
+    assert DISTANCE_TABLES["knight"].get_distance(0, 9) == 4
+
+
+def test_paths_are_legal_and_shortest():
+    for figure, distance_table in DISTANCE_TABLES.items():
+        for source in range(0, 64, 5):
+            for dest in range(64):
+                path = distance_table.get_path(source, dest)
+                if path is None:
+                    assert distance_table.get_distance(source, dest) is None
+                    continue
+                assert path[0] == source and path[-1] == dest
+                assert len(path) - 1 == distance_table.get_distance(source, dest)
+                for square, next_square in zip(path, path[1:]):
+                    assert distance_table.get_moves(square) >> next_square & 1
+
+
+def test_pawn_distances_per_color():
+    whites = PAWN_DISTANCE_TABLES["whites"]
+    blacks = PAWN_DISTANCE_TABLES["blacks"]
+    assert whites.get_distance(8, 56) == 5
+    assert whites.get_distance(8, 0) is None
+    assert blacks.get_distance(48, 0) == 5
+    assert not whites.is_valid_source(0)
+    assert whites.distances[0:64] == bytearray([UNREACHABLE]) * 64
+
+
+def test_get_reachable():
+    knight = DISTANCE_TABLES["knight"]
+    assert knight.get_reachable(0, 0) == 0
+    assert knight.get_reachable(0, 1) == 1 << 10 | 1 << 17
+    assert bin(knight.get_reachable(0, 6)).count("1") == 63
@@ -0,0 +1,23 @@
+import pytest
+from fen import STARTING_POSITION, get_occupancy_from_fen, parse_piece_placement
+
+
+def test_parse_piece_placement_starting_position():
+    pieces = parse_piece_placement(STARTING_POSITION)
+    assert len(pieces) == 32
+    assert pieces[0] == "R"
+    assert pieces[4] == "K"
+    assert pieces[60] == "k"
+
+
+def test_parse_piece_placement_invalid_fen():
+    for fen in ["", "8/8/8", "9/8/8/8/8/8/8/8", "8/8/8/8/8/8/8/7X", "8/8/8/8/8/8/8/7"]:
+        with pytest.raises(ValueError):
+            parse_piece_placement(fen)
+
+
+def test_get_occupancy_from_fen():
+    occupied, whites, blacks = get_occupancy_from_fen("8/8/8/8/8/8/8/R6k")
+    assert whites == 1
+    assert blacks == 1 << 7
+    assert occupied == whites | blacks
@@ -1,5 +1,6 @@
 import pytest
 from figures import Bishop, King, Knight, Pawn, Queen, Rook
+from figures import FIGURE_REGISTRY, get_figure, get_figure_class
 
 
 def test_bishop_list_available_moves_invalid_current_field():
@@ -224,3 +225,72 @@ def test_pawn_validate_move_valid_fields_eight_first():
     result = pawn.validate_move("H6")
     assert result.white is False
     assert result.black is None
+
+
+def test_rook_list_available_moves_on_board_with_blockers():
+    rook = Rook("A1")
+    occupied = (1 << 24) | (1 << 3)
+    assert rook.list_available_moves_on_board(occupied) == [
+        "A2",
+        "A3",
+        "A4",
+        "B1",
+        "C1",
+        "D1",
+    ]
+    assert rook.list_available_moves_on_board(occupied, own_pieces=1 << 3) == [
+        "A2",
+        "A3",
+        "A4",
+        "B1",
+        "C1",
+    ]
+
+
+def test_knight_list_available_moves_on_board_skips_own_pieces():
+    knight = Knight("B1")
+    assert knight.list_available_moves_on_board(1 << 16, own_pieces=1 << 16) == [
+        "C3",
+        "D2",
+    ]
+
+
+def test_pawn_list_available_moves_on_board_blocked_and_captures():
+    pawn = Pawn("E2")
+    occupied = (1 << 28) | (1 << 19)
+    available_moves = pawn.list_available_moves_on_board(occupied)[0]
+    assert available_moves["whites"] == ["D3", "E3"]
+    assert available_moves["blacks"] == ["E1"]
+
+
+def test_figures_are_slotted_and_immutable():
+    rook = Rook("a1")
+    assert not hasattr(rook, "__dict__")
+    with pytest.raises(AttributeError):
+        rook.current_field = "B2"
+    with pytest.raises(AttributeError):
+        rook.color = "white"
+
+
+def test_get_figure_class_normalizes_names():
+    assert get_figure_class("knight") is Knight
+    assert get_figure_class("Knight") is Knight
+    assert get_figure_class("kNiGhT") is Knight
+    assert get_figure_class("dragon") is None
+
+
+def test_get_figure_interns_instances_per_square():
+    queen = get_figure(Queen, "d4")
+    assert queen is get_figure(Queen, "D4")
+    assert queen is FIGURE_REGISTRY[Queen, 27]
+    assert queen.current_field == "D4"
+    assert get_figure(Pawn, "d4") is not get_figure(Queen, "d4")
+    assert len(FIGURE_REGISTRY) == 6 * 64
+
+
+def test_get_figure_off_board_is_not_interned():
+    king = get_figure(King, "z9")
+    assert king.current_square is None
+    assert king is not get_figure(King, "z9")
+    with pytest.raises(ValueError):
+        king.list_available_moves()
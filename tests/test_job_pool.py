@@ -0,0 +1,206 @@
+import socket
+import threading
+import time
+
+import pytest
+from job_pool import (
+    STREAM_BUFFER_SIZE,
+    JobCancelled,
+    JobPool,
+    JobRejected,
+    is_client_disconnected,
+)
+from metrics import MetricsRegistry
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_job_pool_runs_jobs():
+    pool = JobPool(2, 4)
+    assert pool.run("square", lambda cancelled: 7 * 7, 1) == 49
+    pool.shutdown()
+
+
+def test_job_pool_propagates_exceptions():
+    pool = JobPool(1, 0)
+
+    def fail(cancelled):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        pool.run("fail", fail, 1)
+    pool.shutdown()
+
+
+def test_job_pool_rejects_when_full():
+    registry = MetricsRegistry()
+    pool = JobPool(1, 1, registry)
+    release = threading.Event()
+    deadline = time.monotonic() + 5
+    running = pool.submit("block", lambda cancelled: release.wait(), deadline)
+    queued = pool.submit("block", lambda cancelled: "queued", deadline)
+    with pytest.raises(JobRejected) as e:
+        pool.submit("block", lambda cancelled: "rejected", deadline)
+    assert e.value.retry_after >= 1
+    release.set()
+    assert running.done.wait(1) and queued.done.wait(1)
+    assert queued.get_result() == "queued"
+    wait_for(lambda: pool.outcomes.get(("block", "completed")) == 2)
+    assert pool.outcomes.get(("block", "rejected")) == 1
+    rendered = registry.render()
+    assert 'chess_job_queue_wait_seconds_count{job="block"} 2' in rendered
+    assert 'chess_job_run_seconds_count{job="block"} 2' in rendered
+    pool.shutdown()
+
+
+def test_job_pool_cancels_at_the_deadline():
+    pool = JobPool(1, 0)
+    stopped = threading.Event()
+
+    def loop_until_cancelled(cancelled):
+        cancelled.wait()
+        stopped.set()
+
+    start = time.monotonic()
+    with pytest.raises(JobCancelled, match="deadline"):
+        pool.run("loop", loop_until_cancelled, 0.1)
+    assert time.monotonic() - start < 0.5
+    assert stopped.wait(1)
+    pool.shutdown()
+
+
+def test_job_pool_cancels_when_the_client_disconnects():
+    pool = JobPool(1, 0)
+    with pytest.raises(JobCancelled, match="disconnected"):
+        pool.run("loop", lambda cancelled: cancelled.wait(), 5, lambda: True)
+    pool.shutdown()
+
+
+def test_job_pool_skips_expired_jobs():
+    pool = JobPool(1, 1)
+    release = threading.Event()
+    pool.submit("block", lambda cancelled: release.wait(), time.monotonic() + 5)
+    expired = pool.submit("late", lambda cancelled: "ran", time.monotonic())
+    release.set()
+    assert expired.done.wait(1)
+    with pytest.raises(JobCancelled):
+        expired.get_result()
+    wait_for(lambda: pool.outcomes.get(("late", "expired")) == 1)
+    pool.shutdown()
+
+
+def test_job_pool_invalid_size():
+    with pytest.raises(ValueError):
+        JobPool(0, 1)
+
+
+def test_is_client_disconnected():
+    assert is_client_disconnected({}) is False
+    server_side, client_side = socket.socketpair()
+    environ = {"werkzeug.socket": server_side}
+    assert is_client_disconnected(environ) is False
+    client_side.close()
+    assert is_client_disconnected(environ) is True
+    server_side.close()
+
+
+def test_job_pool_iterate_streams_items_then_the_result():
+    pool = JobPool(1, 0)
+
+    def produce(cancelled, emit):
+        for item in range(3):
+            emit(item)
+        return "result"
+
+    assert list(pool.iterate("stream", produce, 5)) == [
+        ("item", 0),
+        ("item", 1),
+        ("item", 2),
+        ("result", "result"),
+    ]
+    pool.shutdown()
+
+
+def test_job_pool_iterate_applies_back_pressure_and_cancels_on_close():
+    pool = JobPool(1, 0)
+    produced = []
+    stopped = threading.Event()
+
+    def produce(cancelled, emit):
+        try:
+            for item in range(10 * STREAM_BUFFER_SIZE):
+                emit(item)
+                produced.append(item)
+        finally:
+            stopped.set()
+
+    events = pool.iterate("stream", produce, 5)
+    assert next(events) == ("item", 0)
+    time.sleep(0.2)
+    assert len(produced) <= STREAM_BUFFER_SIZE + 2
+    events.close()
+    assert stopped.wait(1)
+    wait_for(lambda: pool.outcomes.get(("stream", "cancelled")) == 1)
+    pool.shutdown()
+
+
+def test_job_pool_iterate_raises_job_errors():
+    pool = JobPool(1, 0)
+
+    def produce(cancelled, emit):
+        emit("first")
+        raise ValueError("boom")
+
+    events = pool.iterate("stream", produce, 5)
+    assert next(events) == ("item", "first")
+    with pytest.raises(ValueError):
+        next(events)
+    pool.shutdown()
+
+
+def test_job_pool_limits_streams_and_keeps_workers_for_plain_jobs():
+    pool = JobPool(2, 4, max_streams=1)
+    release = threading.Event()
+
+    def produce(cancelled, emit):
+        emit("first")
+        release.wait(5)
+        return "result"
+
+    events = pool.iterate("stream", produce, 5)
+    assert next(events) == ("item", "first")
+    with pytest.raises(JobRejected):
+        pool.iterate("stream", produce, 5)
+    assert pool.run("square", lambda cancelled: 7 * 7, 1) == 49
+    release.set()
+    assert list(events) == [("result", "result")]
+    wait_for(lambda: pool.streams == 0)
+    events = pool.iterate("stream", produce, 5)
+    assert list(events) == [("item", "first"), ("result", "result")]
+    pool.shutdown()
+
+
+def test_job_pool_iterate_cancels_jobs_of_stalled_consumers():
+    pool = JobPool(1, 0)
+    stopped = threading.Event()
+
+    def produce(cancelled, emit):
+        try:
+            while True:
+                emit("item")
+        finally:
+            stopped.set()
+
+    events = pool.iterate("stream", produce, 5, idle_timeout=0.1)
+    assert next(events) == ("item", "item")
+    assert stopped.wait(2)
+    wait_for(lambda: pool.outcomes.get(("stream", "cancelled")) == 1)
+    with pytest.raises(JobCancelled, match="stream consumer stalled"):
+        list(events)
+    assert pool.run("square", lambda cancelled: 7 * 7, 1) == 49
+    pool.shutdown()
@@ -0,0 +1,194 @@
+import json
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+from app import app
+from fen import STARTING_POSITION
+from jobs import (
+    DONE,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    JobManager,
+    JobStore,
+    execute_job,
+    get_dedup_key,
+    parse_job_request,
+)
+
+
+@pytest.fixture()
+def store_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+def wait_for_job(manager, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = manager.get(job_id)
+        if job["status"] in (DONE, FAILED):
+            return job
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_parse_job_request_normalizes_perft():
+    job_type, params = parse_job_request(
+        {"type": "perft", "fen": STARTING_POSITION.replace(" ", "  "), "depth": 3},
+        8,
+        10,
+    )
+    assert job_type == "perft"
+    assert params == {"fen": STARTING_POSITION, "depth": 3, "hash": None}
+    assert get_dedup_key(job_type, params) == get_dedup_key(
+        *parse_job_request({"type": "perft", "depth": 3}, 8, 10)
+    )
+
+
+@pytest.mark.parametrize(
+    "data, error",
+    [
+        (None, "invalid job type"),
+        ({"type": "tablebase"}, "invalid job type"),
+        ({"type": "perft", "depth": "3"}, "invalid depth"),
+        ({"type": "perft", "depth": 9}, "depth exceeds limit of 8"),
+        ({"type": "perft", "depth": 3, "fen": "8/8/8"}, "invalid fen"),
+        ({"type": "perft", "depth": 3, "hash": 0}, "invalid hash size"),
+        ({"type": "batch", "queries": {}}, "invalid batch"),
+        ({"type": "batch", "queries": [{}] * 11}, "batch size exceeds limit of 10"),
+    ],
+)
+def test_parse_job_request_errors(data, error):
+    with pytest.raises(ValueError, match=error):
+        parse_job_request(data, 8, 10)
+
+
+def test_job_store_deduplicates_and_claims_once(store_path):
+    store = JobStore(store_path)
+    job, created = store.create("perft", {"depth": 1}, 60)
+    assert created and job["status"] == QUEUED
+    duplicate, created = store.create("perft", {"depth": 1}, 60)
+    assert not created and duplicate["id"] == job["id"]
+    assert store.claim(job["id"])["status"] == RUNNING
+    assert store.claim(job["id"]) is None
+
+
+def test_job_store_expires_finished_jobs(store_path):
+    store = JobStore(store_path)
+    job, _ = store.create("perft", {"depth": 1}, -1)
+    store.claim(job["id"])
+    store.finish(job["id"], {"nodes": 20})
+    assert store.get(job["id"]) is None
+    assert store.create("perft", {"depth": 1}, 60)[1]
+    assert store.delete_expired() == 1
+
+
+def test_job_store_keeps_jobs_that_outlive_their_ttl(store_path):
+    store = JobStore(store_path)
+    job, _ = store.create("perft", {"depth": 1}, 0.1)
+    store.claim(job["id"])
+    time.sleep(0.2)
+    assert store.delete_expired() == 0
+    assert store.get(job["id"])["status"] == RUNNING
+    assert store.create("perft", {"depth": 1}, 0.1)[0]["id"] == job["id"]
+    store.finish(job["id"], {"nodes": 20})
+    job = store.get(job["id"])
+    assert job["status"] == DONE
+    assert job["expires_at"] == pytest.approx(job["finished_at"] + 0.1)
+
+
+def test_job_store_creates_a_private_directory(tmp_path):
+    path = tmp_path / "instance" / "jobs.sqlite3"
+    JobStore(str(path))
+    assert path.exists()
+    assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+
+
+def test_job_database_defaults_to_the_instance_path():
+    assert app.config["JOBS_DATABASE_PATH"] == os.path.join(
+        app.instance_path, "jobs.sqlite3"
+    )
+    assert not app.config["JOBS_DATABASE_PATH"].startswith(tempfile.gettempdir())
+
+
+def test_job_store_requeues_stale_jobs(store_path):
+    store = JobStore(store_path)
+    job, _ = store.create("perft", {"depth": 1}, 60)
+    store.claim(job["id"])
+    assert store.requeue_stale(60) == 0
+    assert store.requeue_stale(-1) == 1
+    assert store.get(job["id"])["status"] == QUEUED
+    assert store.get_queued_ids() == [job["id"]]
+
+
+def test_execute_perft_job(store_path):
+    store = JobStore(store_path)
+    job, _ = store.create(
+        "perft", {"fen": STARTING_POSITION, "depth": 3, "hash": None}, 60
+    )
+    execute_job(store_path, job["id"], 1)
+    job = store.get(job["id"])
+    assert job["status"] == DONE
+    assert job["progress"] == 1
+    result = json.loads(job["result"])
+    assert result["nodes"] == 8902
+    assert result["divide"]["e2e4"] == 600
+
+
+def test_execute_batch_job(store_path):
+    store = JobStore(store_path)
+    queries = [
+        {"figure": "knight", "currentField": "a1"},
+        {"figure": "rook", "currentField": "a1", "destField": "a8"},
+        "invalid",
+    ]
+    job, _ = store.create("batch", {"queries": queries}, 60)
+    execute_job(store_path, job["id"], 1)
+    results = json.loads(store.get(job["id"])["result"])["results"]
+    assert [result["status"] for result in results] == [200, 200, 400]
+
+
+def test_execute_failing_job(store_path):
+    store = JobStore(store_path)
+    job, _ = store.create("perft", {"fen": "8/8/8", "depth": 1, "hash": None}, 60)
+    execute_job(store_path, job["id"], 1)
+    job = store.get(job["id"])
+    assert job["status"] == FAILED
+    assert job["error"] == "invalid fen"
+    # A failed job is not reused for an identical submission.
+    assert store.create("perft", {"fen": "8/8/8", "depth": 1, "hash": None}, 60)[1]
+
+
+def test_job_manager_runs_jobs_in_worker_processes(store_path):
+    manager = JobManager(store_path, 1, 60, 60, 1)
+    job, created = manager.submit(
+        "perft", {"fen": STARTING_POSITION, "depth": 2, "hash": 1}
+    )
+    assert created
+    job = wait_for_job(manager, job["id"])
+    assert json.loads(job["result"])["nodes"] == 400
+    manager.shutdown()
+
+
+def test_job_manager_resumes_queued_jobs_after_restart(store_path):
+    store = JobStore(store_path)
+    job, _ = store.create(
+        "perft", {"fen": STARTING_POSITION, "depth": 1, "hash": None}, 60
+    )
+    store.claim(job["id"])
+    manager = JobManager(store_path, 1, 60, -1, 1)
+    job = wait_for_job(manager, job["id"])
+    assert json.loads(job["result"])["nodes"] == 20
+    manager.shutdown()
+
+
+def test_jobs_module_does_not_import_the_app():
+    # Worker processes import jobs; with the spawn start method importing
+    # the app would run create_app in every one of them.
+    code = "import sys, jobs; sys.exit('app' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
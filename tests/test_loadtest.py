@@ -0,0 +1,20 @@
+import random
+from benchmarks.loadtest import generate_path, run_load, start_local_server
+
+
+def test_generate_path_mix():
+    rng = random.Random(0)
+    assert generate_path(rng, 0.0).count("/") == 4
+    assert generate_path(rng, 1.0).count("/") == 5
+
+
+def test_run_load_against_local_server():
+    server, url = start_local_server()
+    try:
+        report = run_load(url, concurrency=2, duration=0.3, validate_ratio=0.5)
+    finally:
+        server.shutdown()
+    assert report["requests"] > 0
+    assert report["errors"] == 0
+    assert report["statusCodes"] == {"200": report["requests"]}
+    assert report["latencyMs"]["p50"] <= report["latencyMs"]["max"]
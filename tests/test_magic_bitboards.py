@@ -0,0 +1,41 @@
+import random
+from bitboard import BISHOP_DIRECTIONS, ROOK_DIRECTIONS, bitboard_from_fields
+from bitboard import fields_from_bitboard, square_from_field
+from magic_bitboards import (
+    generate_ray_attacks,
+    generate_relevant_occupancy_mask,
+    get_bishop_attacks,
+    get_queen_attacks,
+    get_rook_attacks,
+)
+
+
+def test_generate_relevant_occupancy_mask_skips_board_edges():
+    mask = generate_relevant_occupancy_mask(square_from_field("A1"), ROOK_DIRECTIONS)
+    assert fields_from_bitboard(mask) == [
+        "A2", "A3", "A4", "A5", "A6", "A7", "B1", "C1", "D1", "E1", "F1", "G1",
+    ]  # fmt: skip
+
+
+def test_get_rook_attacks_stops_at_blockers():
+    occupied = bitboard_from_fields(["A4", "D1"])
+    attacks = get_rook_attacks(square_from_field("A1"), occupied)
+    assert fields_from_bitboard(attacks) == ["A2", "A3", "A4", "B1", "C1", "D1"]
+
+
+def test_get_queen_attacks_on_empty_board():
+    attacks = get_queen_attacks(square_from_field("E3"), 0)
+    assert len(fields_from_bitboard(attacks)) == 25
+
+
+def test_magic_attacks_match_ray_walking():
+    rng = random.Random(7)
+    for _ in range(2000):
+        square = rng.randrange(64)
+        occupied = rng.getrandbits(64) & rng.getrandbits(64)
+        assert get_rook_attacks(square, occupied) == generate_ray_attacks(
+            square, occupied, ROOK_DIRECTIONS
+        )
+        assert get_bishop_attacks(square, occupied) == generate_ray_attacks(
+            square, occupied, BISHOP_DIRECTIONS
+        )
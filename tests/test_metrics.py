@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+from metrics import Histogram, MetricsRegistry
+
+
+def test_counter_increments_per_label_values():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", ("route",))
+    counter.inc(("/a",))
+    counter.inc(("/a",), 2)
+    counter.inc(("/b",))
+    assert counter.get(("/a",)) == 3
+    assert counter.get(("/b",)) == 1
+    assert counter.get(("/c",)) == 0
+
+
+def test_counter_is_thread_safe():
+    counter = MetricsRegistry().counter("requests_total", "Requests.")
+
+    def increment():
+        for _ in range(10000):
+            counter.inc()
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.get() == 40000
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), (0.1, 1.0))
+    histogram.observe(0.05, ("/a",))
+    histogram.observe(0.5, ("/a",))
+    histogram.observe(5, ("/a",))
+    lines = histogram.collect()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+    assert histogram.get_count(("/a",)) == 3
+
+
+def test_registry_renders_help_and_type():
+    registry = MetricsRegistry()
+    registry.gauge("cache_entries", "Cache entries.").set(value=7)
+    assert registry.render() == (
+        "# HELP cache_entries Cache entries.\n"
+        "# TYPE cache_entries gauge\n"
+        "cache_entries 7\n"
+    )
+
+
+def test_registry_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.counter("paths_total", "Paths.", ("path",)).inc(('a"b\\c',))
+    assert 'paths_total{path="a\\"b\\\\c"} 1' in registry.render()
+
+
+def test_registry_rejects_duplicate_names():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests.")
+    with pytest.raises(ValueError):
+        registry.histogram("requests_total", "Requests.")
@@ -0,0 +1,48 @@
+from bitboard import fields_from_bitboard, square_from_field
+from move_tables import MOVE_TABLES, PAWN_MOVE_TABLES, generate_knight_moves
+
+
+def test_move_tables_cover_every_field():
+    for move_table in list(MOVE_TABLES.values()) + list(PAWN_MOVE_TABLES.values()):
+        assert len(move_table.available_moves) == 64
+        assert len(move_table.available_fields) == 64
+
+
+def test_move_table_moves_are_sorted_tuples():
+    moves = MOVE_TABLES["queen"].get_available_moves("E3")
+    assert isinstance(moves, tuple)
+    assert list(moves) == sorted(moves)
+    assert len(moves) == 25
+
+
+def test_move_table_is_move_available():
+    assert MOVE_TABLES["rook"].is_move_available("B2", "B5") is True
+    assert MOVE_TABLES["rook"].is_move_available("B2", "E6") is False
+
+
+def test_move_table_has_field():
+    assert MOVE_TABLES["king"].has_field("A1") is True
+    assert MOVE_TABLES["king"].has_field("a1") is False
+    assert MOVE_TABLES["king"].has_field("Z9") is False
+
+
+def test_pawn_move_tables_invalid_field_for_color():
+    assert PAWN_MOVE_TABLES["whites"].get_available_moves("E1") is None
+    assert PAWN_MOVE_TABLES["blacks"].get_available_moves("E1") == ()
+    assert PAWN_MOVE_TABLES["whites"].is_move_available("E1", "E2") is None
+    assert PAWN_MOVE_TABLES["blacks"].get_available_moves("B7") == ("B6", "B5")
+
+
+def test_generate_knight_moves_edge_rows():
+    d1_moves = generate_knight_moves(square_from_field("D1"))
+    d8_moves = generate_knight_moves(square_from_field("D8"))
+    assert fields_from_bitboard(d1_moves) == ["B2", "C3", "E3", "F2"]
+    assert fields_from_bitboard(d8_moves) == ["B7", "C6", "E6", "F7"]
+
+
+def test_move_table_is_square_available():
+    e4 = square_from_field("E4")
+    assert MOVE_TABLES["knight"].is_square_available(e4, square_from_field("F6"))
+    assert not MOVE_TABLES["knight"].is_square_available(e4, square_from_field("F5"))
+    assert PAWN_MOVE_TABLES["blacks"].is_square_available(0, 8) is False
+    assert PAWN_MOVE_TABLES["whites"].is_square_available(0, 8) is None
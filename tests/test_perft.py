@@ -0,0 +1,134 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import perft as perft_module
+import pytest
+from fen import STARTING_POSITION
+from perft import (
+    compare_perft_speedup,
+    get_executor,
+    perft,
+    perft_divide,
+    perft_divide_parallel,
+)
+from job_pool import JobCancelled
+from position import Position
+from transposition import TranspositionTable
+
+PERFT_POSITIONS = [
+    (STARTING_POSITION, [20, 400, 8902]),
+    (
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039],
+    ),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238]),
+    (
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467],
+    ),
+    ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486]),
+    (
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079],
+    ),
+]
+
+
+@pytest.mark.parametrize("fen, node_counts", PERFT_POSITIONS)
+def test_perft_published_node_counts(fen, node_counts):
+    position = Position(fen)
+    for depth, node_count in enumerate(node_counts, start=1):
+        assert perft(position, depth) == node_count
+    assert position.get_fen() == fen
+
+
+def test_perft_depth_zero():
+    assert perft(Position(), 0) == 1
+
+
+def test_perft_divide_cancelled():
+    cancelled = threading.Event()
+    cancelled.set()
+    position = Position()
+    with pytest.raises(JobCancelled):
+        perft_divide(position, 3, cancelled=cancelled)
+    assert position.get_fen() == STARTING_POSITION
+
+
+def test_perft_divide():
+    divide = perft_divide(Position(), 2)
+    assert len(divide) == 20
+    assert divide["e2e4"] == 20
+    assert sum(divide.values()) == 400
+
+
+def test_perft_divide_parallel_matches_serial():
+    fen = "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+    serial_divide = perft_divide(Position(fen), 3)
+    assert perft_divide_parallel(Position(fen), 3, workers=2) == serial_divide
+    assert (
+        perft_divide_parallel(Position(fen), 3, workers=2, split_depth=2)
+        == serial_divide
+    )
+
+
+def test_perft_divide_parallel_shares_one_pool():
+    fen = "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+    perft_divide_parallel(Position(fen), 2, workers=2)
+    executor = get_executor()
+    perft_divide_parallel(Position(fen), 2, workers=3)
+    assert get_executor() is executor
+
+
+def test_perft_divide_parallel_limits_subtrees_in_flight(monkeypatch):
+    lock = threading.Lock()
+    running = [0]
+    most_running = [0]
+
+    def perft_subtree(fen, moves, depth, hash_size_mb=None):
+        with lock:
+            running[0] += 1
+            most_running[0] = max(most_running[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return 1
+
+    executor = ThreadPoolExecutor(8)
+    monkeypatch.setattr(perft_module, "get_executor", lambda pool_size=None: executor)
+    monkeypatch.setattr(perft_module, "perft_subtree", perft_subtree)
+    divide = perft_divide_parallel(Position(), 3, workers=2, split_depth=1)
+    assert sum(divide.values()) == 20
+    assert most_running[0] == 2
+    executor.shutdown()
+
+
+def test_perft_divide_parallel_cancels_queued_subtrees(monkeypatch):
+    started = []
+    executor = ThreadPoolExecutor(8)
+    monkeypatch.setattr(perft_module, "get_executor", lambda pool_size=None: executor)
+    monkeypatch.setattr(
+        perft_module, "perft_subtree", lambda *args: started.append(args) or 1
+    )
+    cancelled = threading.Event()
+    cancelled.set()
+    with pytest.raises(JobCancelled):
+        perft_divide_parallel(Position(), 3, workers=2, cancelled=cancelled)
+    executor.shutdown()
+    assert len(started) <= 2
+
+
+def test_compare_perft_speedup():
+    comparison = compare_perft_speedup(STARTING_POSITION, 2, workers=2)
+    assert comparison["nodes"] == 400
+    assert comparison["speedup"] > 0
+
+
+def test_perft_divide_with_transposition_table():
+    table = TranspositionTable(1)
+    divide = perft_divide(Position(), 4, table)
+    assert sum(divide.values()) == 197281
+    assert table.get_stats()["stores"] > 0
+    fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+    assert sum(perft_divide(Position(fen), 3, table).values()) == 97862
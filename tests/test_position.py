@@ -0,0 +1,158 @@
+import pytest
+from fen import STARTING_POSITION
+from position import Position, move_to_uci
+
+
+def legal_moves(fen: str) -> list:
+    return sorted(move_to_uci(move) for move in Position(fen).generate_legal_moves())
+
+
+def test_position_fen_round_trip():
+    fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+    assert Position(fen).get_fen() == fen
+    assert Position().get_fen() == STARTING_POSITION
+
+
+def test_position_missing_fen_fields_use_defaults():
+    position = Position("8/8/8/8/8/8/8/K6k")
+    assert position.get_fen() == "8/8/8/8/8/8/8/K6k w - - 0 1"
+
+
+def test_position_invalid_fen():
+    for fen in [
+        "8/8/8/8/8/8/8/8 w - - 0 1",
+        "8/8/8/8/8/8/8/K6k x - - 0 1",
+        "8/8/8/8/8/8/8/K6k w X - 0 1",
+        "8/8/8/8/8/8/8/K6k w - e5 0 1",
+        "8/8/8/8/8/8/8/K6k w - - a 1",
+    ]:
+        with pytest.raises(ValueError):
+            Position(fen)
+
+
+def test_generate_legal_moves_starting_position():
+    assert len(legal_moves(STARTING_POSITION)) == 20
+
+
+def test_generate_legal_moves_pinned_piece():
+    moves = legal_moves("4k3/4r3/8/8/8/8/4B3/4K3 w - - 0 1")
+    assert not [move for move in moves if move.startswith("e2")]
+
+
+def test_generate_legal_moves_double_check_only_king_moves():
+    moves = legal_moves("4k3/8/8/8/1b6/8/4r3/R2NK3 w - - 0 1")
+    assert all(move.startswith("e1") for move in moves)
+
+
+def test_generate_legal_moves_castling():
+    moves = legal_moves("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    assert "e1g1" in moves
+    assert "e1c1" in moves
+    moves = legal_moves("r3k2r/8/8/8/8/8/3r1r2/R3K2R w KQkq - 0 1")
+    assert "e1g1" not in moves
+    assert "e1c1" not in moves
+
+
+def test_castling_rights_need_king_and_rook_on_home_squares():
+    position = Position("4k3/8/8/8/8/8/8/R2K3R w KQ - 0 1")
+    assert position.castling_rights == 0
+    assert "d1g1" not in legal_moves("4k3/8/8/8/8/8/8/R2K3R w KQ - 0 1")
+    position = Position("r3k3/8/8/8/8/8/8/4K2R w KQkq - 0 1")
+    assert position.get_fen() == "r3k3/8/8/8/8/8/8/4K2R w Kq - 0 1"
+
+
+def test_generate_legal_moves_en_passant_and_promotion():
+    moves = legal_moves("4k3/1P6/8/3pP3/8/8/8/4K3 w - d6 0 1")
+    assert "e5d6" in moves
+    assert {"b7b8q", "b7b8r", "b7b8b", "b7b8n"} <= set(moves)
+
+
+def test_generate_legal_moves_en_passant_discovered_check():
+    moves = legal_moves("8/8/8/K2pP2r/8/8/8/7k w - d6 0 1")
+    assert "e5d6" not in moves
+
+
+def test_make_and_unmake_move_restore_position():
+    position = Position("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    fen = position.get_fen()
+    for move in position.generate_legal_moves():
+        position.make_move(move)
+        position.unmake_move()
+        assert position.get_fen() == fen
+
+
+def test_make_move_updates_state():
+    position = Position()
+    position.make_move(position.parse_uci_move("e2e4"))
+    assert position.get_fen() == (
+        "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    )
+
+
+def test_position_rejects_side_not_to_move_in_check():
+    with pytest.raises(ValueError, match="invalid fen"):
+        Position("4k3/4Q3/8/8/8/8/8/4K3 w - - 0 1")
+    assert Position("4k3/4Q3/8/8/8/8/8/4K3 b - - 0 1").is_in_check()
+
+
+def test_position_rejects_pawns_on_back_ranks():
+    for fen in ["4k2P/8/8/8/8/8/8/4K3 w - - 0 1", "4k3/8/8/8/8/8/8/p3K3 w - - 0 1"]:
+        with pytest.raises(ValueError, match="invalid fen"):
+            Position(fen)
+
+
+def test_position_rejects_en_passant_squares_without_a_double_step():
+    for fen in [
+        # Rank 3 squares only follow a white double step, so black moves next.
+        "4k3/8/8/8/4P3/8/8/4K3 w - e3 0 1",
+        "4k3/8/8/8/8/8/3PN3/4K3 w - e3 0 1",
+        # No enemy pawn right behind the square.
+        "4k3/8/8/4P3/8/8/8/4K3 w - d6 0 1",
+        "4k3/8/8/8/8/8/3PN3/4K3 b - e3 0 1",
+        # The square itself is occupied.
+        "4k3/8/3n4/3pP3/8/8/8/4K3 w - d6 0 1",
+    ]:
+        with pytest.raises(ValueError, match="invalid fen"):
+            Position(fen)
+
+
+def test_parse_uci_move_illegal():
+    with pytest.raises(ValueError):
+        Position().parse_uci_move("e2e5")
+
+
+def test_zobrist_key_updated_incrementally():
+    position = Position(
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+    )
+    initial_key = position.key
+    for uci in ["e1g1", "h3g2", "a2a4", "b4a3", "e5f7"]:
+        position.make_move(position.parse_uci_move(uci))
+        assert position.key == Position(position.get_fen()).key
+    for _ in range(5):
+        position.unmake_move()
+    assert position.key == initial_key
+
+
+def test_zobrist_key_transposition():
+    first = Position()
+    second = Position()
+    for uci in ["g1f3", "g8f6", "b1c3"]:
+        first.make_move(first.parse_uci_move(uci))
+    for uci in ["b1c3", "g8f6", "g1f3"]:
+        second.make_move(second.parse_uci_move(uci))
+    assert first.key == second.key
+
+
+def test_zobrist_key_from_fen_matches_key_reached_by_moves():
+    position = Position()
+    position.make_move(position.parse_uci_move("e2e4"))
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+    assert Position(fen).key == position.key
+    assert Position(fen).get_fen() == position.get_fen()
+    position.make_move(position.parse_uci_move("d7d5"))
+    position.make_move(position.parse_uci_move("e4e5"))
+    position.make_move(position.parse_uci_move("f7f5"))
+    fen = "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3"
+    assert Position(fen).key == position.key
+    assert Position(fen).en_passant_square is not None
@@ -0,0 +1,76 @@
+import os
+import stat
+
+import pytest
+from app import app, create_app
+from profiling import PROFILE_HEADER
+
+
+@pytest.fixture()
+def profiled_app(tmp_path):
+    return create_app(
+        {
+            "PROFILING_ENABLED": True,
+            "PROFILING_DIRECTORY": str(tmp_path),
+            "PROFILING_MAX_FILES": 3,
+        }
+    )
+
+
+def test_profiling_disabled_installs_no_hooks():
+    assert not app.config["PROFILING_ENABLED"]
+    assert "profile_store" not in app.extensions
+    hooks = app.before_request_funcs[None] + app.after_request_funcs[None]
+    assert hooks
+    assert all(hook.__module__ != "profiling" for hook in hooks)
+    assert app.test_client().get("/debug/profiles").status_code == 404
+
+
+def test_profiles_kept_in_the_instance_folder(tmp_path):
+    assert app.config["PROFILING_DIRECTORY"] == os.path.join(
+        app.instance_path, "profiles"
+    )
+    directory = tmp_path / "profiles"
+    create_app({"PROFILING_ENABLED": True, "PROFILING_DIRECTORY": str(directory)})
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+
+def test_profile_written_only_with_header(profiled_app, tmp_path):
+    client = profiled_app.test_client()
+    client.get("/api/v1/queen/d4")
+    assert os.listdir(tmp_path) == []
+
+    response = client.get("/api/v1/queen/d4", headers={PROFILE_HEADER: "1"})
+    assert response.json == app.test_client().get("/api/v1/queen/d4").json
+    (name,) = os.listdir(tmp_path)
+    assert "-api_get_list_available_moves-queen-d4-" in name
+    assert name.endswith("ms.prof")
+
+
+def test_profiles_rotated(profiled_app, tmp_path):
+    client = profiled_app.test_client()
+    for field in ("a1", "b2", "c3", "d4", "e5"):
+        client.get(f"/api/v1/rook/{field}", headers={PROFILE_HEADER: "true"})
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) == 3
+    assert "-c3-" in names[0] and "-e5-" in names[-1]
+
+
+def test_profiles_summary(profiled_app):
+    client = profiled_app.test_client()
+    for _ in range(2):
+        client.get("/api/v1/queen/h8", headers={PROFILE_HEADER: "1"})
+    data = client.get("/debug/profiles?top=5").json
+    assert data["profiles"] == 2
+    assert data["error"] is None
+    assert 0 < len(data["functions"]) <= 5
+    total_times = [function["totalTime"] for function in data["functions"]]
+    assert total_times == sorted(total_times, reverse=True)
+    data = client.get("/debug/profiles?top=1000").json
+    functions = [function["function"] for function in data["functions"]]
+    assert any("get_list_available_moves" in function for function in functions)
+
+
+def test_profiles_summary_empty(profiled_app):
+    data = profiled_app.test_client().get("/debug/profiles").json
+    assert data == {"profiles": 0, "functions": [], "error": None}
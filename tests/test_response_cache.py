@@ -0,0 +1,28 @@
+from response_cache import ResponseCache, make_cached_response
+
+
+def test_make_cached_response_strong_etag():
+    first = make_cached_response(b'{"a":1}\n', 200)
+    second = make_cached_response(b'{"a":2}\n', 200)
+    assert first.etag == make_cached_response(b'{"a":1}\n', 200).etag
+    assert first.etag != second.etag
+
+
+def test_response_cache_get_and_put():
+    response_cache = ResponseCache(2)
+    assert response_cache.get("a") is None
+    cached_response = response_cache.put("a", make_cached_response(b"a", 200))
+    assert response_cache.get("a") is cached_response
+    assert response_cache.get_stats()["hits"] == 1
+    assert response_cache.get_stats()["misses"] == 1
+
+
+def test_response_cache_evicts_least_recently_used():
+    response_cache = ResponseCache(2)
+    response_cache.put("a", make_cached_response(b"a", 200))
+    response_cache.put("b", make_cached_response(b"b", 200))
+    response_cache.get("a")
+    response_cache.put("c", make_cached_response(b"c", 200))
+    assert response_cache.get("b") is None
+    assert response_cache.get("a") is not None
+    assert response_cache.get("c") is not None
@@ -0,0 +1,112 @@
+import threading
+import time
+
+from position import Position
+from search import (
+    MATE_SCORE,
+    evaluate,
+    get_mate_distance,
+    pack_entry,
+    search_best_move,
+    unpack_entry,
+)
+
+
+def test_evaluate_is_symmetric():
+    assert evaluate(Position()) == 0
+    position = Position("4k3/8/8/8/8/8/8/3QK3 w - - 0 1")
+    assert evaluate(position) > 800
+    position = Position("4k3/8/8/8/8/8/8/3QK3 b - - 0 1")
+    assert evaluate(position) < -800
+
+
+def test_pack_and_unpack_entry():
+    for score in (-MATE_SCORE, -1, 0, 35, MATE_SCORE):
+        assert unpack_entry(pack_entry(score, 2, 0x3FFFF)) == (score, 2, 0x3FFFF)
+
+
+def test_get_mate_distance():
+    assert get_mate_distance(MATE_SCORE - 1) == 1
+    assert get_mate_distance(MATE_SCORE - 3) == 2
+    assert get_mate_distance(-MATE_SCORE + 2) == -1
+    assert get_mate_distance(150) is None
+
+
+def test_search_finds_mate_in_one():
+    position = Position("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+    result = search_best_move(position, 5)
+    assert result["bestMove"] == "a1a8"
+    assert result["mate"] == 1
+    assert position.get_fen() == "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+
+
+def test_search_finds_mate_in_two():
+    position = Position("k7/8/2K5/8/8/8/8/7R w - - 0 1")
+    result = search_best_move(position, 10)
+    assert result["mate"] == 2
+    assert result["depth"] >= 3
+
+
+def test_search_wins_material_with_a_fork():
+    result = search_best_move(Position("4k3/8/8/3q4/4N3/8/8/4K3 w - - 0 1"), 10, 4)
+    assert result["bestMove"] == "e4f6"
+    assert result["depth"] == 4
+    assert result["score"] > 0
+
+
+def test_search_avoids_hanging_the_queen():
+    # Qxd5 loses the queen to the pawn on e6.
+    position = Position("4k3/8/4p3/3p4/8/8/8/3QK3 w - - 0 1")
+    result = search_best_move(position, 10, 3)
+    assert result["bestMove"] != "d1d5"
+
+
+def test_search_reports_mate_and_stalemate_without_moves():
+    result = search_best_move(Position("R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1"), 1)
+    assert result["bestMove"] is None
+    assert result["score"] == -MATE_SCORE
+    assert result["mate"] == 0
+    result = search_best_move(Position("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"), 1)
+    assert result["bestMove"] is None
+    assert result["score"] == 0
+
+
+def test_search_stops_at_the_deadline():
+    position = Position()
+    start = time.monotonic()
+    result = search_best_move(position, 0.1)
+    assert time.monotonic() - start < 0.2
+    assert result["bestMove"] is not None
+    assert position.get_fen() == Position().get_fen()
+
+
+def test_search_stops_when_cancelled():
+    cancelled = threading.Event()
+    cancelled.set()
+    start = time.monotonic()
+    result = search_best_move(Position(), 5, cancelled=cancelled)
+    assert time.monotonic() - start < 0.5
+    assert result["bestMove"] is not None
+
+
+def test_search_returns_a_move_without_time():
+    result = search_best_move(Position(), 0)
+    assert result["bestMove"] is not None
+    assert result["depth"] == 0
+
+
+def test_concurrent_searches_stay_within_the_deadline():
+    elapsed = []
+
+    def run_search():
+        start = time.monotonic()
+        search_best_move(Position(), 0.2)
+        elapsed.append(time.monotonic() - start)
+
+    threads = [threading.Thread(target=run_search) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(elapsed) == 8
+    assert max(elapsed) < 0.5
@@ -0,0 +1,82 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import urllib.request
+
+import pytest
+from server import (
+    ROOT_DIRECTORY,
+    create_listening_socket,
+    get_memory_usage,
+    measure_worker_memory,
+)
+
+requires_smaps = pytest.mark.skipif(
+    not os.path.exists(f"/proc/{os.getpid()}/smaps_rollup"),
+    reason="needs /proc/<pid>/smaps_rollup",
+)
+requires_fork = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+
+
+def read_event(process, name: str) -> dict:
+    for line in process.stdout:
+        event = json.loads(line)
+        if event["event"] == name:
+            return event
+    raise AssertionError(f"server exited before {name}")
+
+
+@requires_smaps
+def test_get_memory_usage():
+    usage = get_memory_usage(os.getpid())
+    assert 0 < usage["pssKb"] <= usage["rssKb"]
+
+
+def test_create_listening_socket():
+    listener = create_listening_socket("127.0.0.1", 0)
+    try:
+        assert listener.getsockname()[1] > 0
+    finally:
+        listener.close()
+
+
+@requires_fork
+def test_prefork_server_serves_reloads_and_stops():
+    process = subprocess.Popen(
+        [sys.executable, "-m", "server", "--port", "0", "--workers", "2"],
+        cwd=ROOT_DIRECTORY,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        ready = read_event(process, "ready")
+        assert len(ready["workers"]) == 2
+        with urllib.request.urlopen(f"{ready['url']}/api/v1/knight/a1") as response:
+            assert json.load(response)["availableMoves"] == ["B3", "C2"]
+
+        process.send_signal(signal.SIGHUP)
+        reloading = read_event(process, "reloading")
+        assert sorted(reloading["retiring"]) == sorted(map(int, ready["workers"]))
+        reloaded = read_event(process, "ready")
+        assert not set(reloaded["workers"]) & set(ready["workers"])
+        with urllib.request.urlopen(f"{ready['url']}/api/v1/knight/b1") as response:
+            assert response.status == 200
+
+        process.send_signal(signal.SIGTERM)
+        read_event(process, "stopped")
+        assert process.wait(10) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+@requires_fork
+@requires_smaps
+def test_measure_worker_memory():
+    usage = measure_worker_memory(1, preload=True)
+    assert usage["workers"] == 1
+    assert 0 < usage["meanWorkerPssKb"] <= usage["meanWorkerRssKb"]
@@ -0,0 +1,150 @@
+import os
+import tempfile
+
+import pytest
+import table_store
+from app import create_app
+from bitboard import ROOK_DIRECTIONS
+from distance_tables import DISTANCE_TABLES, DistanceTable
+from magic_bitboards import ROOK_ATTACKS, ROOK_MAGICS, MagicAttackTable
+from move_tables import MOVE_TABLES
+from table_store import (
+    TableStore,
+    collect_tables,
+    ensure_table_store,
+    write_table_store,
+)
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return collect_tables()
+
+
+@pytest.fixture()
+def table_store_path(tmp_path, tables):
+    path = str(tmp_path / "tables.bin")
+    write_table_store(path, tables)
+    return path
+
+
+def test_table_store_round_trip(table_store_path, tables):
+    loaded = TableStore(table_store_path)
+    assert set(loaded.sections) == set(tables)
+    for name, (typecode, data) in tables.items():
+        section = loaded.get_section(name)
+        assert section.format == typecode
+        assert section.tobytes() == data
+    assert loaded.get_section("missing") is None
+
+
+def test_table_store_sections_are_views_into_the_mapping(table_store_path):
+    loaded = TableStore(table_store_path)
+    for section in loaded.sections.values():
+        assert section.obj is loaded.mmap
+
+
+def test_table_store_rejects_corrupt_file(table_store_path):
+    with open(table_store_path, "r+b") as file:
+        file.seek(-1, 2)
+        last_byte = file.read(1)
+        file.seek(-1, 2)
+        file.write(bytes([last_byte[0] ^ 1]))
+    with pytest.raises(ValueError, match="corrupt"):
+        TableStore(table_store_path)
+
+
+def test_table_store_rejects_stale_file(table_store_path, monkeypatch):
+    monkeypatch.setattr(table_store, "FORMAT_VERSION", table_store.FORMAT_VERSION + 1)
+    with pytest.raises(ValueError, match="stale"):
+        TableStore(table_store_path)
+
+
+def test_ensure_table_store_rebuilds_missing_file(tmp_path, tables):
+    path = str(tmp_path / "missing.bin")
+    loaded = ensure_table_store(path)
+    assert loaded.path == path
+    assert loaded.get_section("rook_attacks").tobytes() == tables["rook_attacks"][1]
+
+
+def test_create_app_writes_table_store(tmp_path):
+    path = str(tmp_path / "tables.bin")
+    new_app = create_app({"TABLE_STORE_PATH": path})
+    assert os.path.exists(path)
+    assert new_app.extensions["table_store"].path == path
+
+
+def test_table_store_path_defaults_to_the_user_cache(monkeypatch, tmp_path):
+    monkeypatch.delenv("CHESS_TABLE_STORE", raising=False)
+    path = table_store.get_table_store_path()
+    assert path == os.path.join(table_store.get_cache_directory(), "tables.bin")
+    assert not path.startswith(table_store.SOURCE_DIRECTORY + os.sep)
+    assert not path.startswith(tempfile.gettempdir() + os.sep)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert table_store.get_cache_directory() == str(tmp_path / "chess-api")
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert table_store.get_cache_directory() == str(tmp_path / ".cache" / "chess-api")
+    monkeypatch.setenv("CHESS_TABLE_STORE", "/data/tables.bin")
+    assert table_store.get_table_store_path() == "/data/tables.bin"
+
+
+def test_write_table_store_does_not_follow_planted_links(tmp_path, tables):
+    path = tmp_path / "cache" / "tables.bin"
+    victim = tmp_path / "victim"
+    victim.write_bytes(b"keep")
+    path.parent.mkdir()
+    os.symlink(victim, f"{path}.{os.getpid()}.tmp")
+    write_table_store(str(path), tables)
+    assert victim.read_bytes() == b"keep"
+    assert TableStore(str(path)).get_section("rook_attacks") is not None
+    assert sorted(os.listdir(path.parent)) == sorted(
+        ["tables.bin", f"tables.bin.{os.getpid()}.tmp"]
+    )
+
+
+def test_write_table_store_creates_missing_directories(tmp_path, tables):
+    path = tmp_path / "a" / "b" / "tables.bin"
+    write_table_store(str(path), tables)
+    assert TableStore(str(path)).path == str(path)
+
+
+def test_table_store_rejects_unexpected_section_shapes(tmp_path, tables):
+    path = str(tmp_path / "tables.bin")
+    for name, section in [
+        ("rook_attacks", ("Q", tables["rook_attacks"][1][:-8])),
+        ("distance_king", ("Q", tables["distance_king"][1])),
+        ("extra", ("B", b"\0")),
+    ]:
+        write_table_store(path, dict(tables, **{name: section}))
+        with pytest.raises(ValueError, match="corrupt"):
+            TableStore(path)
+    sections = dict(tables)
+    del sections["bishop_attacks"]
+    write_table_store(path, sections)
+    with pytest.raises(ValueError, match="corrupt"):
+        TableStore(path)
+
+
+def test_tables_loaded_from_store_match_generated(table_store_path):
+    loaded = TableStore(table_store_path)
+    rook_attacks = MagicAttackTable(
+        ROOK_DIRECTIONS, ROOK_MAGICS, loaded.get_section("rook_attacks")
+    )
+    assert [list(attacks) for attacks in rook_attacks.attacks] == [
+        list(attacks) for attacks in ROOK_ATTACKS.attacks
+    ]
+    generated = MagicAttackTable(ROOK_DIRECTIONS, ROOK_MAGICS)
+    for square in range(0, 64, 9):
+        for occupied in (0, 0x00FF00000000FF00, 0x8142241818244281):
+            assert rook_attacks.get_attacks(square, occupied) == generated.get_attacks(
+                square, occupied
+            )
+
+    knight_distances = DistanceTable(
+        MOVE_TABLES["knight"], loaded.get_section("distance_knight")
+    )
+    assert knight_distances.get_path(0, 63) == DISTANCE_TABLES["knight"].get_path(0, 63)
+    assert bytes(knight_distances.distances) == bytes(
+        DistanceTable(MOVE_TABLES["knight"]).distances
+    )
@@ -0,0 +1,37 @@
+import pytest
+from transposition import TranspositionTable
+
+
+def test_transposition_table_store_and_probe():
+    table = TranspositionTable(1)
+    assert table.probe(12345) is None
+    table.store(12345, 3, 8902)
+    assert table.probe(12345) == (3, 8902)
+    assert table.get_stats()["hits"] == 1
+    assert table.get_stats()["misses"] == 1
+    assert table.get_stats()["stores"] == 1
+
+
+def test_transposition_table_replacement_policy():
+    table = TranspositionTable(0.0001)
+    bucket_count = table.bucket_count
+    deep_key, shallow_key, newest_key = 1, 1 + bucket_count, 1 + 2 * bucket_count
+    table.store(deep_key, 5, 100)
+    table.store(shallow_key, 2, 200)
+    table.store(newest_key, 1, 300)
+    assert table.probe(deep_key) == (5, 100)
+    assert table.probe(shallow_key) is None
+    assert table.probe(newest_key) == (1, 300)
+
+
+def test_transposition_table_invalid_size():
+    with pytest.raises(ValueError):
+        TranspositionTable(0)
+
+
+def test_transposition_table_clear():
+    table = TranspositionTable(1)
+    table.store(42, 1, 1)
+    table.clear()
+    assert table.probe(42) is None
+    assert table.get_stats()["stores"] == 0
@@ -0,0 +1,18 @@
+from benchmarks.loadtest import start_local_server
+from benchmarks.validate_stream import generate_lines, run_stream
+
+
+def test_generate_lines_is_repeatable():
+    assert list(generate_lines(5, 1)) == list(generate_lines(5, 1))
+    assert len(list(generate_lines(5, 1))) == 5
+
+
+def test_run_stream_against_local_server():
+    server, url = start_local_server()
+    try:
+        report = run_stream(url, 3000)
+    finally:
+        server.shutdown()
+    assert report["status"] == 200
+    assert report["lines"] == 3000
+    assert report["linesPerSecond"] > 0
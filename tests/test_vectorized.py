@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from bitboard import FIELDS
+from figures import Bishop, King, Knight, Pawn, Queen, Rook
+from position import BISHOP, BLACK, KING, KNIGHT, PAWN, QUEEN, ROOK, WHITE
+from vectorized import validate_many, validate_many_pawns
+
+FIGURE_CLASSES = {
+    KNIGHT: Knight,
+    BISHOP: Bishop,
+    ROOK: Rook,
+    QUEEN: Queen,
+    KING: King,
+}
+
+
+def test_validate_many_agrees_with_figures():
+    figures, sources, destinations = (
+        grid.ravel()
+        for grid in np.meshgrid(
+            list(FIGURE_CLASSES), range(64), range(64), indexing="ij"
+        )
+    )
+    expected = [
+        FIGURE_CLASSES[figure](FIELDS[source]).validate_move(FIELDS[destination])
+        for figure, source, destination in zip(figures, sources, destinations)
+    ]
+    assert validate_many(figures, sources, destinations).tolist() == expected
+
+
+def test_validate_many_pawns_agrees_with_figures():
+    sources, destinations = (
+        grid.ravel() for grid in np.meshgrid(range(64), range(64), indexing="ij")
+    )
+    whites, blacks = validate_many_pawns(sources, destinations)
+    expected = [
+        Pawn(FIELDS[source]).validate_move(FIELDS[destination])
+        for source, destination in zip(sources, destinations)
+    ]
+    assert whites.tolist() == [valid.white for valid in expected]
+    assert blacks.tolist() == [valid.black for valid in expected]
+
+
+def test_validate_many_keeps_shape():
+    result = validate_many([[ROOK, KNIGHT]], [[0, 27]], [[56, 44]])
+    assert result.dtype == bool
+    assert result.tolist() == [[True, True]]
+
+
+def test_validate_many_mixed_batch_with_pawns():
+    result = validate_many(
+        [PAWN, ROOK, PAWN, PAWN, KNIGHT, PAWN],
+        [8, 0, 52, 8, 1, 0],
+        [24, 56, 36, 0, 18, 8],
+        [WHITE, WHITE, BLACK, BLACK, BLACK, WHITE],
+    )
+    assert result.tolist() == [True, True, True, True, True, None]
+    assert validate_many([PAWN, PAWN], [12, 12], [20, 20], [WHITE, BLACK]).tolist() == [
+        True,
+        False,
+    ]
+
+
+def test_validate_many_pawns_need_a_valid_color():
+    with pytest.raises(ValueError, match="pawns need a color"):
+        validate_many([PAWN], [8], [16])
+    with pytest.raises(ValueError, match="invalid color"):
+        validate_many([PAWN], [8], [16], [2])
+
+
+@pytest.mark.parametrize(
+    "figures, sources, destinations",
+    [([6], [0], [1]), ([-1], [0], [1]), ([ROOK], [64], [1]), ([ROOK], [0], [-1])],
+)
+def test_validate_many_rejects_out_of_range(figures, sources, destinations):
+    with pytest.raises(ValueError):
+        validate_many(figures, sources, destinations)
+
+
+def test_validate_many_pawns_rejects_non_integer_squares():
+    with pytest.raises(ValueError):
+        validate_many_pawns([0.5], [8])
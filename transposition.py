@@ -0,0 +1,63 @@
+from array import array
+from typing import Dict, Optional, Tuple
+
+# Bytes per entry: 8-byte key, 8-byte value and 1-byte depth.
+ENTRY_SIZE = 17
+MAX_DEPTH = 255
+
+
+class TranspositionTable:
+    # Entries are grouped in buckets of two slots: the first keeps the
+    # deepest result seen for its bucket, the second always takes the newest.
+    def __init__(self, size_mb: float = 16):
+        if size_mb <= 0:
+            raise ValueError("transposition table size must be positive")
+        self.size_mb = size_mb
+        self.bucket_count = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_SIZE))
+        self.keys = array("Q", bytes(16 * self.bucket_count))
+        self.values = array("Q", bytes(16 * self.bucket_count))
+        self.depths = bytearray(2 * self.bucket_count)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int]]:
+        index = key % self.bucket_count * 2
+        keys = self.keys
+        if keys[index] == key:
+            self.hits += 1
+            return self.depths[index], self.values[index]
+        if keys[index + 1] == key:
+            self.hits += 1
+            return self.depths[index + 1], self.values[index + 1]
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, value: int):
+        index = key % self.bucket_count * 2
+        depth = min(depth, MAX_DEPTH)
+        if self.keys[index] != key and self.depths[index] > depth:
+            index += 1
+        self.keys[index] = key
+        self.values[index] = value
+        self.depths[index] = depth
+        self.stores += 1
+
+    def clear(self):
+        self.keys = array("Q", bytes(16 * self.bucket_count))
+        self.values = array("Q", bytes(16 * self.bucket_count))
+        self.depths = bytearray(2 * self.bucket_count)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def get_stats(self) -> Dict[str, float]:
+        probes = self.hits + self.misses
+        return {
+            "sizeMb": self.size_mb,
+            "entries": 2 * self.bucket_count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hitRate": self.hits / probes if probes else 0.0,
+        }
@@ -0,0 +1,93 @@
+import numpy as np
+from move_tables import MOVE_TABLES, PAWN_MOVE_TABLES, MoveTable
+from position import BISHOP, BLACK, KING, KNIGHT, PAWN, QUEEN, ROOK, WHITE
+from typing import Tuple
+
+FIGURE_CODES = {
+    "pawn": PAWN,
+    "knight": KNIGHT,
+    "bishop": BISHOP,
+    "rook": ROOK,
+    "queen": QUEEN,
+    "king": KING,
+}
+
+
+def build_move_matrix(move_table: MoveTable) -> np.ndarray:
+    # Row s holds the destination squares of a figure on square s; squares a
+    # figure cannot stand on (pawns on their own back rank) get an empty row.
+    bitboards = np.array([moves or 0 for moves in move_table.bitboards], dtype="<u8")
+    return np.unpackbits(
+        bitboards.view(np.uint8).reshape(64, 8), axis=1, bitorder="little"
+    ).astype(bool)
+
+
+# Indexed by [figure code, source square, destination square]. The pawn slice
+# stays empty since pawn moves depend on the color, see PAWN_MOVE_MATRICES.
+MOVE_MATRICES = np.zeros((6, 64, 64), dtype=bool)
+for figure_name, figure_code in FIGURE_CODES.items():
+    if figure_code != PAWN:
+        MOVE_MATRICES[figure_code] = build_move_matrix(MOVE_TABLES[figure_name])
+
+# Indexed by [color, source square, destination square], whites first.
+PAWN_MOVE_MATRICES = np.stack(
+    [
+        build_move_matrix(PAWN_MOVE_TABLES["whites"]),
+        build_move_matrix(PAWN_MOVE_TABLES["blacks"]),
+    ]
+)
+# Indexed by [color, square]: False where a pawn of that color cannot stand,
+# for which figures.py answers None rather than a boolean.
+PAWN_SQUARES = np.array(
+    [
+        [moves is not None for moves in PAWN_MOVE_TABLES[color].bitboards]
+        for color in ("whites", "blacks")
+    ]
+)
+
+
+def as_square_array(squares, name: str) -> np.ndarray:
+    squares = np.asarray(squares)
+    if squares.dtype.kind not in "iu":
+        raise ValueError(f"{name} must be integer squares")
+    if squares.size and (squares.min() < 0 or squares.max() > 63):
+        raise ValueError(f"{name} field does not exist")
+    return squares
+
+
+def validate_many(figures, sources, destinations, colors=None) -> np.ma.MaskedArray:
+    # Pawn rows are looked up by their color (WHITE or BLACK). Moves of a
+    # pawn standing on its own back rank are masked, so tolist() gives the
+    # None figures.py returns for them.
+    figures = np.asarray(figures)
+    sources = as_square_array(sources, "current")
+    destinations = as_square_array(destinations, "destination")
+    if figures.dtype.kind not in "iu":
+        raise ValueError("figures must be integer figure codes")
+    if figures.size and (figures.min() < 0 or figures.max() > KING):
+        raise ValueError("invalid figure")
+    valid = np.array(MOVE_MATRICES[figures, sources, destinations])
+    invalid_source = np.zeros(valid.shape, dtype=bool)
+    pawns = np.broadcast_to(figures == PAWN, valid.shape)
+    if np.any(pawns):
+        if colors is None:
+            raise ValueError("pawns need a color")
+        colors = np.asarray(colors)
+        if colors.dtype.kind not in "iu" or not np.isin(colors, (WHITE, BLACK)).all():
+            raise ValueError("invalid color")
+        pawn_colors = np.broadcast_to(colors, valid.shape)[pawns]
+        pawn_sources = np.broadcast_to(sources, valid.shape)[pawns]
+        valid[pawns] = PAWN_MOVE_MATRICES[
+            pawn_colors, pawn_sources, np.broadcast_to(destinations, valid.shape)[pawns]
+        ]
+        invalid_source[pawns] = ~PAWN_SQUARES[pawn_colors, pawn_sources]
+    return np.ma.MaskedArray(valid, invalid_source)
+
+
+def validate_many_pawns(
+    sources, destinations
+) -> Tuple[np.ma.MaskedArray, np.ma.MaskedArray]:
+    return (
+        validate_many(PAWN, sources, destinations, WHITE),
+        validate_many(PAWN, sources, destinations, BLACK),
+    )
@@ -0,0 +1,24 @@
+import random
+
+# Fixed seed so keys, and anything persisted with them, are stable across runs.
+_random = random.Random(0x5EED)
+
+PIECE_KEYS = [[_random.getrandbits(64) for _ in range(64)] for _ in range(12)]
+CASTLING_KEYS = [_random.getrandbits(64) for _ in range(16)]
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]
+SIDE_KEY = _random.getrandbits(64)
+# Mixed into a position key to keep per-depth results (e.g. perft counts) apart.
+DEPTH_KEYS = [_random.getrandbits(64) for _ in range(64)]
+
+
+def compute_key(board, side_to_move: int, castling_rights: int, en_passant_square):
+    key = 0
+    for square, piece in enumerate(board):
+        if piece is not None:
+            key ^= PIECE_KEYS[piece][square]
+    key ^= CASTLING_KEYS[castling_rights]
+    if en_passant_square is not None:
+        key ^= EN_PASSANT_KEYS[en_passant_square & 7]
+    if side_to_move:
+        key ^= SIDE_KEY
+    return key